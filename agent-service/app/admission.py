@@ -0,0 +1,156 @@
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Optional
+
+from app.metrics import LLM_QUEUE_WAIT_SECONDS, LLM_REJECTIONS
+
+# LLM admission control configuration
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 2))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", 16))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", 10))
+
+# Weight of the newest sample in the moving average of generation time
+SERVICE_TIME_SMOOTHING = 0.2
+
+
+class AdmissionRejected(Exception):
+    """No generation slot can be had within the queue deadline"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"LLM admission rejected ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Slot:
+    """A held generation slot; release() is safe to call more than once"""
+
+    def __init__(self, controller: "AdmissionController"):
+        self._controller = controller
+        self._acquired_at = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._controller._release(time.monotonic() - self._acquired_at)
+
+
+class AdmissionController:
+    """Bounded FIFO admission queue in front of the LLM.
+
+    At most max_concurrency generations run at once and at most max_queue
+    callers wait for a slot. A caller is turned away at once when the queue
+    is full or its expected wait already exceeds the deadline, and otherwise
+    after waiting queue_timeout seconds without getting a slot.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._service_time: Optional[float] = None
+        self.admitted = 0
+        self.rejected = {"queue_full": 0, "deadline": 0, "timeout": 0}
+
+    def estimated_wait(self) -> float:
+        """Expected seconds until a new caller gets a slot"""
+        if self._service_time is None:
+            return 0.0
+        queued = len(self._waiters) + 1
+        return queued / self.max_concurrency * self._service_time
+
+    def _reject(self, reason: str):
+        self.rejected[reason] += 1
+        LLM_REJECTIONS.inc(reason=reason)
+        retry_after = max(1, math.ceil(self.estimated_wait()))
+        raise AdmissionRejected(reason, retry_after)
+
+    async def acquire(self) -> Slot:
+        """Take a slot, waiting in line if needed; raises AdmissionRejected"""
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            self.admitted += 1
+            LLM_QUEUE_WAIT_SECONDS.observe(0.0)
+            return Slot(self)
+
+        if len(self._waiters) >= self.max_queue:
+            self._reject("queue_full")
+        if self.estimated_wait() > self.queue_timeout:
+            self._reject("deadline")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        started = time.monotonic()
+        try:
+            # asyncio.wait leaves the waiter alone on timeout, unlike wait_for
+            await asyncio.wait({waiter}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+
+        if not waiter.done():
+            self._abandon(waiter)
+            self._reject("timeout")
+
+        # _release handed its slot straight to this waiter
+        self.admitted += 1
+        LLM_QUEUE_WAIT_SECONDS.observe(time.monotonic() - started)
+        return Slot(self)
+
+    def _abandon(self, waiter: asyncio.Future):
+        """Leave the queue, passing on a slot that was handed over meanwhile"""
+        if waiter.done():
+            self._release(None)
+        else:
+            self._waiters.remove(waiter)
+            waiter.cancel()
+
+    def _release(self, held_for: Optional[float]):
+        if held_for is not None:
+            if self._service_time is None:
+                self._service_time = held_for
+            else:
+                self._service_time += SERVICE_TIME_SMOOTHING * (
+                    held_for - self._service_time
+                )
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold a slot for the duration of the with-block"""
+        slot = await self.acquire()
+        try:
+            yield slot
+        finally:
+            slot.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "active": self._active,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "avg_generation_seconds": (
+                round(self._service_time, 3) if self._service_time is not None else None
+            ),
+        }
+
+
+llm_admission = AdmissionController(
+    LLM_MAX_CONCURRENCY, LLM_MAX_QUEUE, LLM_QUEUE_TIMEOUT
+)
@@ -0,0 +1,169 @@
+import os
+import time
+from collections import Counter
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.change_feed import ChangeFeed
+
+# Booking availability index configuration
+AVAILABILITY_INDEX_ENABLED = (
+    os.getenv("AVAILABILITY_INDEX_ENABLED", "true").lower() == "true"
+)
+AVAILABILITY_REFRESH_SECONDS = float(os.getenv("AVAILABILITY_REFRESH_SECONDS", 15))
+AVAILABILITY_FULL_RELOAD_SECONDS = float(
+    os.getenv("AVAILABILITY_FULL_RELOAD_SECONDS", 600)
+)
+AVAILABILITY_MAX_STALENESS = float(os.getenv("AVAILABILITY_MAX_STALENESS", 60))
+# Booking statuses that hold the dates (the booking service's enum is
+# PENDING, ACCEPTED and CANCELLED)
+BLOCKING_STATUSES = [
+    status.strip()
+    for status in os.getenv("AVAILABILITY_BLOCKING_STATUSES", "ACCEPTED").split(",")
+    if status.strip()
+]
+
+BOOKING_PROJECTION = {
+    "property_id": 1,
+    "check_in_date": 1,
+    "check_out_date": 1,
+    "status": 1,
+    "updated_at": 1,
+}
+
+# (property_id, first night, night after the last) as date ordinals
+Stay = Tuple[object, int, int]
+
+
+def _night(value) -> Optional[int]:
+    if isinstance(value, datetime):
+        return value.date().toordinal()
+    if isinstance(value, date):
+        return value.toordinal()
+    return None
+
+
+def overlap_filter(check_in: date, check_out: date) -> dict:
+    """Bookings holding any night from check_in up to check_out"""
+    # A booking holds the nights from its check-in day up to its check-out day
+    return {
+        "status": {"$in": BLOCKING_STATUSES},
+        "check_in_date": {"$lt": datetime.combine(check_out, dt_time.min)},
+        "check_out_date": {
+            "$gte": datetime.combine(check_in + timedelta(days=1), dt_time.min)
+        },
+    }
+
+
+class AvailabilityIndex:
+    """Which properties are booked on which nights, from blocking bookings.
+
+    Kept per night rather than per property, so the properties booked during
+    a stay are the union of a handful of per-night sets, whatever the number
+    of candidates. Each booking's nights are remembered so a status change or
+    cancellation only moves that booking's counts.
+    """
+
+    def __init__(self):
+        self._nights: Dict[int, Counter] = {}  # night -> property_id -> bookings
+        self._stays: Dict[object, Stay] = {}  # booking _id -> the nights it holds
+        self._synced_at: Optional[float] = None
+        self.projection = BOOKING_PROJECTION
+        self.mode = "disabled"
+        self.lookups = 0
+
+    def _count(self, stay: Stay, delta: int):
+        property_id, first, end = stay
+        for night in range(first, end):
+            booked = self._nights.setdefault(night, Counter())
+            booked[property_id] += delta
+            if booked[property_id] <= 0:
+                del booked[property_id]
+                if not booked:
+                    del self._nights[night]
+
+    def apply(self, booking: dict):
+        """Move one booking's nights to its current state"""
+        old = self._stays.pop(booking["_id"], None)
+        if old is not None:
+            self._count(old, -1)
+
+        if booking.get("status") not in BLOCKING_STATUSES:
+            return
+        first = _night(booking.get("check_in_date"))
+        end = _night(booking.get("check_out_date"))
+        if first is None or end is None or booking.get("property_id") is None:
+            return
+        # Past nights can't be searched for
+        first = max(first, date.today().toordinal())
+        if end <= first:
+            return
+        stay = (booking["property_id"], first, end)
+        self._stays[booking["_id"]] = stay
+        self._count(stay, 1)
+
+    def is_ready(self) -> bool:
+        return (
+            self._synced_at is not None
+            and time.monotonic() - self._synced_at <= AVAILABILITY_MAX_STALENESS
+        )
+
+    def booked(self, check_in: date, check_out: date) -> Optional[Set]:
+        """Properties booked on any night of the stay; None when not ready"""
+        if not self.is_ready():
+            return None
+        self.lookups += 1
+        booked = set()
+        for night in range(check_in.toordinal(), check_out.toordinal()):
+            properties = self._nights.get(night)
+            if properties:
+                booked.update(properties)
+        return booked
+
+    async def load(self, bookings: List[dict]):
+        """Rebuild from every blocking booking that hasn't ended (change feed)"""
+        self._nights = {}
+        self._stays = {}
+        for booking in bookings:
+            self.apply(booking)
+        self._synced_at = time.monotonic()
+        print(f"✅ Availability index holds {len(self._stays)} upcoming bookings")
+
+    async def apply_changes(self, bookings: List[dict], deleted):
+        """Apply bookings created, changed, cancelled or deleted (change feed)"""
+        for booking in bookings:
+            self.apply(booking)
+        for booking_id in deleted:
+            old = self._stays.pop(booking_id, None)
+            if old is not None:
+                self._count(old, -1)
+        self._synced_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": AVAILABILITY_INDEX_ENABLED,
+            "mode": self.mode,
+            "ready": self.is_ready(),
+            "bookings": len(self._stays),
+            "nights": len(self._nights),
+            "lookups": self.lookups,
+        }
+
+
+availability_index = AvailabilityIndex()
+
+
+def upcoming_bookings_filter() -> dict:
+    """Blocking bookings that haven't ended, for a full reload"""
+    today = datetime.combine(date.today(), dt_time.min)
+    return {"status": {"$in": BLOCKING_STATUSES}, "check_out_date": {"$gt": today}}
+
+
+booking_feed = ChangeFeed(
+    "bookings",
+    "updated_at",
+    upcoming_bookings_filter,
+    AVAILABILITY_REFRESH_SECONDS,
+    AVAILABILITY_FULL_RELOAD_SECONDS,
+)
+booking_feed.subscribe(availability_index)
@@ -0,0 +1,46 @@
+from datetime import datetime
+from typing import List, Optional, Union
+
+from pydantic import BaseModel
+
+# Dates come back from Mongo as datetimes, or as strings in older documents
+DateValue = Union[datetime, str]
+
+
+class PropertyCard(BaseModel):
+    """A property as the chat widget renders it"""
+
+    property_id: str
+    property_name: str
+    city: Optional[str] = None
+    country: Optional[str] = None
+    price_per_night: Optional[float] = None
+    bedrooms: Optional[int] = None
+    bathrooms: Optional[float] = None
+    property_type: Optional[str] = None
+    is_available: bool = True
+    amenities: Optional[List[str]] = None
+
+
+class BookingCard(BaseModel):
+    """A booking as the chat widget renders it"""
+
+    booking_id: str
+    property_name: Optional[str] = None
+    city: Optional[str] = None
+    country: Optional[str] = None
+    check_in_date: Optional[DateValue] = None
+    check_out_date: Optional[DateValue] = None
+    num_guests: Optional[int] = None
+    total_price: Optional[float] = None
+    status: Optional[str] = None
+
+
+def property_cards(properties: List[dict]) -> List[PropertyCard]:
+    """Cards for a page of properties; fields the card doesn't know are ignored"""
+    return [PropertyCard.model_validate(prop) for prop in properties]
+
+
+def booking_cards(bookings: List[dict]) -> List[BookingCard]:
+    """Cards for a page of bookings"""
+    return [BookingCard.model_validate(booking) for booking in bookings]
@@ -0,0 +1,282 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+# Shared property feed configuration (property index, semantic index, facets)
+PROPERTY_FEED_REFRESH_SECONDS = float(os.getenv("PROPERTY_FEED_REFRESH_SECONDS", 30))
+PROPERTY_FEED_FULL_RELOAD_SECONDS = float(
+    os.getenv("PROPERTY_FEED_FULL_RELOAD_SECONDS", 600)
+)
+# A subscriber that fails is reloaded on its own after this, doubling with
+# each failure in a row up to the maximum
+CHANGE_FEED_RETRY_SECONDS = float(os.getenv("CHANGE_FEED_RETRY_SECONDS", 1))
+CHANGE_FEED_MAX_RETRY_SECONDS = float(os.getenv("CHANGE_FEED_MAX_RETRY_SECONDS", 300))
+# Longest a change stream's writes are held back to be applied as one batch
+CHANGE_BATCH_SECONDS = 1.0
+
+
+def _merge_changes(earlier: tuple, later: tuple) -> tuple:
+    """One apply_changes call with the effect of two in a row"""
+    changed = {doc["_id"]: doc for doc in earlier[0]}
+    deleted = set(earlier[1])
+    for document_id in later[1]:
+        changed.pop(document_id, None)
+        deleted.add(document_id)
+    for doc in later[0]:
+        deleted.discard(doc["_id"])
+        changed[doc["_id"]] = doc
+    return list(changed.values()), list(deleted)
+
+
+class ChangeFeed:
+    """Keeps in-memory indexes of one collection in step with the database.
+
+    Every subscriber is fed from the same reads: a full reload of the
+    documents full_filter() selects, then either a change stream or polls for
+    documents whose change_field moved on, with a periodic full reload to
+    pick up deletions a poll can't see. A subscriber provides:
+
+        projection                   fields it reads from each document
+        mode                         set to "polling" or "change_stream"
+        async load(docs)             replace its contents with these documents
+        async apply_changes(docs, deleted)
+                                     apply changed documents and deleted _ids;
+                                     called with nothing when it is up to date
+
+    Both calls mark the subscriber as synced. Each subscriber works through
+    its calls in its own task, so a slow one (the semantic index embedding
+    new text) doesn't hold back the others; calls that pile up meanwhile are
+    folded into one. A subscriber that fails gets no more changes and is
+    reloaded on its own, backing off while it keeps failing.
+    """
+
+    def __init__(
+        self,
+        collection: str,
+        change_field: str,
+        full_filter: Callable[[], dict],
+        refresh_seconds: float,
+        full_reload_seconds: float,
+        change_stream: bool = False,
+    ):
+        self.collection = collection
+        self.change_field = change_field
+        self.full_filter = full_filter
+        self.refresh_seconds = refresh_seconds
+        self.full_reload_seconds = full_reload_seconds
+        self.change_stream = change_stream
+        self.subscribers = []
+        self.projection = {change_field: 1}
+        self.mode = "disabled"
+        self.full_reloads = 0
+        self.delta_refreshes = 0
+        self.errors = 0
+        self.resyncs = 0
+        self._last_full_reload: Optional[float] = None
+        self._last_change: Optional[datetime] = None
+        self._pending: Dict[object, List[tuple]] = {}
+        self._workers: Dict[object, asyncio.Task] = {}
+        self._failures: Dict[object, int] = {}
+        self._retry_at: Dict[object, float] = {}
+
+    def subscribe(self, index):
+        """Feed an index from this collection's reads"""
+        if index in self.subscribers:
+            return
+        self.subscribers.append(index)
+        self.projection.update(index.projection)
+
+    def _set_mode(self, mode: str):
+        self.mode = mode
+        for index in self.subscribers:
+            index.mode = mode
+
+    def _track_change(self, doc: dict):
+        changed_at = doc.get(self.change_field)
+        if isinstance(changed_at, datetime) and (
+            self._last_change is None or changed_at > self._last_change
+        ):
+            self._last_change = changed_at
+
+    def _queue(self, index, method: str, *args):
+        """Hand one call to a subscriber's task, folded into any still waiting"""
+        calls = self._pending.setdefault(index, [])
+        if method == "load":
+            calls.clear()  # Supersedes everything before it
+        elif calls and calls[-1][0] == "apply_changes":
+            args = _merge_changes(calls.pop()[1:], args)
+        calls.append((method, *args))
+        if index not in self._workers:
+            self._workers[index] = asyncio.create_task(self._drain(index))
+
+    async def _drain(self, index):
+        """Make one subscriber's calls in order"""
+        calls = self._pending[index]
+        try:
+            while calls:
+                method, *args = calls.pop(0)
+                try:
+                    await getattr(index, method)(*args)
+                except Exception as e:
+                    self.errors += 1
+                    failures = self._failures.get(index, 0) + 1
+                    self._failures[index] = failures
+                    delay = min(
+                        CHANGE_FEED_RETRY_SECONDS * 2 ** (failures - 1),
+                        CHANGE_FEED_MAX_RETRY_SECONDS,
+                    )
+                    self._retry_at[index] = time.monotonic() + delay
+                    calls.clear()  # Its reload replaces them
+                    print(
+                        f"{type(index).__name__} {self.collection} sync error: {e}; "
+                        f"reloading it in {delay:g}s"
+                    )
+                else:
+                    if method == "load":
+                        self._failures.pop(index, None)
+                        self._retry_at.pop(index, None)
+        finally:
+            del self._workers[index]
+
+    def _dispatch(self, method: str, *args, subscribers=None):
+        """Hand one read to every subscriber that isn't waiting for a reload"""
+        for index in self.subscribers if subscribers is None else subscribers:
+            if method == "apply_changes" and index in self._retry_at:
+                continue
+            self._queue(index, method, *args)
+
+    def _due_reloads(self) -> list:
+        """Failed subscribers whose backoff is over"""
+        now = time.monotonic()
+        return [index for index, at in self._retry_at.items() if at <= now]
+
+    async def full_reload(self, db, subscribers=None):
+        """Read every selected document once and load it into each subscriber,
+        or only into the given ones"""
+        docs = (
+            await db[self.collection]
+            .find(self.full_filter(), self.projection)
+            .to_list()
+        )
+        for doc in docs:
+            self._track_change(doc)
+        if subscribers is None:
+            self._last_full_reload = time.monotonic()
+            self.full_reloads += 1
+        else:
+            self.resyncs += 1
+        self._dispatch("load", docs, subscribers=subscribers)
+
+    async def delta_refresh(self, db):
+        """Read documents changed since the last sync, once for every subscriber.
+
+        Deletions are not visible to a change_field query; the periodic full
+        reload picks those up.
+        """
+        query = {}
+        if self._last_change is not None:
+            query[self.change_field] = {"$gte": self._last_change}
+        docs = await db[self.collection].find(query, self.projection).to_list()
+        for doc in docs:
+            self._track_change(doc)
+        self.delta_refreshes += 1
+        self._dispatch("apply_changes", docs, [])
+
+    async def watch(self, db):
+        """Follow the collection's change stream (requires a replica set)"""
+        async with await db[self.collection].watch(
+            full_document="updateLookup", max_await_time_ms=1000
+        ) as stream:
+            self._set_mode("change_stream")
+            await self.full_reload(db)
+            changed, deleted = {}, set()
+            last_batch = time.monotonic()
+            while True:
+                change = await stream.try_next()
+                if change is not None:
+                    if change["operationType"] == "delete":
+                        document_id = change["documentKey"]["_id"]
+                        changed.pop(document_id, None)
+                        deleted.add(document_id)
+                    elif change.get("fullDocument"):
+                        doc = change["fullDocument"]
+                        deleted.discard(doc["_id"])
+                        changed[doc["_id"]] = doc
+
+                due = self._due_reloads()
+                if due:
+                    await self.full_reload(db, due)
+                # Batch bursts of writes, but apply them within a second
+                if (
+                    change is None
+                    or time.monotonic() - last_batch >= CHANGE_BATCH_SECONDS
+                ):
+                    self._dispatch(
+                        "apply_changes", list(changed.values()), list(deleted)
+                    )
+                    changed, deleted = {}, set()
+                    last_batch = time.monotonic()
+
+    async def poll(self, db):
+        """Periodically apply deltas, with a less frequent full reload"""
+        self._set_mode("polling")
+        while True:
+            try:
+                if (
+                    self._last_full_reload is None
+                    or time.monotonic() - self._last_full_reload
+                    >= self.full_reload_seconds
+                ):
+                    await self.full_reload(db)
+                else:
+                    due = self._due_reloads()
+                    if due:
+                        await self.full_reload(db, due)
+                    await self.delta_refresh(db)
+            except Exception as e:
+                # Leave the indexes to go stale; each has its own fallback
+                self.errors += 1
+                print(f"{self.collection} change feed error: {e}")
+            await asyncio.sleep(self.refresh_seconds)
+
+    async def run(self, db):
+        """Keep the subscribers fresh, preferring a change stream over polling"""
+        try:
+            if self.change_stream:
+                try:
+                    await self.watch(db)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(
+                        f"{self.collection} change stream unavailable ({e}); "
+                        "polling instead"
+                    )
+            await self.poll(db)
+        finally:
+            for task in list(self._workers.values()):
+                task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "subscribers": [type(index).__name__ for index in self.subscribers],
+            "full_reloads": self.full_reloads,
+            "delta_refreshes": self.delta_refreshes,
+            "errors": self.errors,
+            "resyncs": self.resyncs,
+            "reloading": [type(index).__name__ for index in self._retry_at],
+        }
+
+
+# The available properties; the property, semantic and facet indexes share it
+property_feed = ChangeFeed(
+    "properties",
+    "updatedAt",
+    lambda: {"is_available": True},
+    PROPERTY_FEED_REFRESH_SECONDS,
+    PROPERTY_FEED_FULL_RELOAD_SECONDS,
+    change_stream=True,
+)
@@ -1,8 +1,8 @@
-import mysql.connector
-from mysql.connector import pooling
 import os
 from dotenv import load_dotenv
 
+from app.pools import mysql_pool
+
 load_dotenv()
 
 # Database configuration
@@ -14,23 +14,17 @@ db_config = {
     "port": int(os.getenv("DB_PORT", 3306))
 }
 
-# Create connection pool
-try:
-    connection_pool = pooling.MySQLConnectionPool(
-        pool_name="airbnb_pool",
-        pool_size=5,
-        **db_config
-    )
-    print("✅ Successfully created MySQL connection pool")
-except mysql.connector.Error as err:
-    print(f"❌ Error creating connection pool: {err}")
-    connection_pool = None
+def get_pool():
+    """Get this process's connection pool, sized and created by app.pools"""
+    return mysql_pool.get_pool(db_config)
 
 def get_db_connection():
     """Get a connection from the pool"""
-    if connection_pool:
-        return connection_pool.get_connection()
-    return None
+    return mysql_pool.get_connection(db_config)
+
+async def get_db_connection_async():
+    """Get a connection from the pool without blocking the event loop"""
+    return await mysql_pool.get_connection_async(db_config)
 
 def test_connection():
     """Test database connection"""
@@ -0,0 +1,293 @@
+import os
+import re
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+# Search facet configuration
+FACETS_ENABLED = os.getenv("FACETS_ENABLED", "true").lower() == "true"
+FACETS_MAX_STALENESS = float(os.getenv("FACETS_MAX_STALENESS", 300))
+
+# Upper bounds of the price buckets; a price goes in the first bound it fits
+PRICE_BOUNDS = (50, 100, 150, 200, 300, 500, 1000)
+FACET_PROJECTION = {
+    "city": 1,
+    "country": 1,
+    "price_per_night": 1,
+    "bedrooms": 1,
+    "is_available": 1,
+    "updatedAt": 1,
+}
+
+# (city, country, price bucket, bedrooms) one available property counts under
+Contribution = Tuple[Optional[str], Optional[str], Optional[int], Optional[int]]
+
+
+def price_bucket(price) -> Optional[int]:
+    """Index of the first bound the price fits under, len(PRICE_BOUNDS) above all"""
+    if isinstance(price, bool) or not isinstance(price, (int, float)):
+        return None
+    for i, bound in enumerate(PRICE_BOUNDS):
+        if price <= bound:
+            return i
+    return len(PRICE_BOUNDS)
+
+
+def _contribution(doc: dict) -> Optional[Contribution]:
+    if doc.get("is_available") is not True:
+        return None
+    city = doc.get("city")
+    country = doc.get("country")
+    bedrooms = doc.get("bedrooms")
+    return (
+        city if isinstance(city, str) else None,
+        country if isinstance(country, str) else None,
+        price_bucket(doc.get("price_per_night")),
+        (
+            bedrooms
+            if isinstance(bedrooms, int) and not isinstance(bedrooms, bool)
+            else None
+        ),
+    )
+
+
+@dataclass
+class Alternative:
+    """A search that is known to have results"""
+
+    count: int
+    city: str
+    max_price: Optional[int] = None
+    bedrooms: Optional[int] = None
+
+    def describe(self) -> str:
+        """How it reads in a reply, e.g. 12 places in Lisbon under $150"""
+        places = "place" if self.count == 1 else "places"
+        text = f"{self.count} {places} in {self.city}"
+        if self.bedrooms is not None:
+            bedrooms = "bedroom" if self.bedrooms == 1 else "bedrooms"
+            text += f" with {self.bedrooms} {bedrooms}"
+        if self.max_price is not None:
+            text += f" under ${self.max_price}"
+        return text
+
+    def query(self) -> str:
+        """A chat message that runs this search"""
+        text = "Find"
+        if self.bedrooms is not None:
+            text += f" {self.bedrooms} bedroom"
+        text += " properties"
+        if self.max_price is not None:
+            text += f" under ${self.max_price}"
+        return f"{text} in {self.city}"
+
+
+class FacetIndex:
+    """Counts of available properties by city, country, price and bedrooms.
+
+    Every property's contribution is remembered, so an update subtracts the
+    old counts and adds the new ones without rescanning the collection.
+    """
+
+    def __init__(self):
+        self._contributions = {}  # _id -> Contribution
+        self._reset_counts()
+        self._synced_at: Optional[float] = None
+        self.projection = FACET_PROJECTION
+        self.mode = "disabled"
+
+    def _reset_counts(self):
+        self.cities = Counter()
+        self.countries = Counter()
+        self.prices = Counter()
+        self.bedrooms = Counter()
+        # city -> listings per price bucket, and city -> bedrooms -> listings
+        self.city_prices = defaultdict(lambda: [0] * (len(PRICE_BOUNDS) + 1))
+        self.city_bedrooms = defaultdict(Counter)
+
+    def _count(self, contribution: Contribution, delta: int):
+        city, country, bucket, bedrooms = contribution
+        for counter, key in (
+            (self.cities, city),
+            (self.countries, country),
+            (self.prices, bucket),
+            (self.bedrooms, bedrooms),
+        ):
+            if key is not None:
+                counter[key] += delta
+                if counter[key] <= 0:
+                    del counter[key]
+
+        if city is None:
+            return
+        if bucket is not None:
+            self.city_prices[city][bucket] += delta
+        if bedrooms is not None:
+            by_bedrooms = self.city_bedrooms[city]
+            by_bedrooms[bedrooms] += delta
+            if by_bedrooms[bedrooms] <= 0:
+                del by_bedrooms[bedrooms]
+        if city not in self.cities:
+            self.city_prices.pop(city, None)
+            self.city_bedrooms.pop(city, None)
+
+    def apply(self, doc: dict):
+        """Move one property's counts to its current state"""
+        old = self._contributions.pop(doc["_id"], None)
+        if old is not None:
+            self._count(old, -1)
+        new = _contribution(doc)
+        if new is not None:
+            self._contributions[doc["_id"]] = new
+            self._count(new, 1)
+
+    def remove(self, property_id):
+        old = self._contributions.pop(property_id, None)
+        if old is not None:
+            self._count(old, -1)
+
+    def is_ready(self) -> bool:
+        return (
+            self._synced_at is not None
+            and time.monotonic() - self._synced_at <= FACETS_MAX_STALENESS
+        )
+
+    def _matching_cities(self, city: str) -> List[str]:
+        """Cities the searched text names or is part of"""
+        return [name for name in self.cities if _names(city, name)]
+
+    def places(self, text: str) -> Optional[List[str]]:
+        """Known cities and countries the text names; None until loaded"""
+        if not self.is_ready():
+            return None
+        return [
+            name
+            for counter in (self.cities, self.countries)
+            for name in counter
+            if _names(text, name)
+        ]
+
+    def _count_under(self, city: str, bucket: int) -> int:
+        """Listings in a city priced within a bucket's bound"""
+        counts = self.city_prices.get(city)
+        return sum(counts[: bucket + 1]) if counts else 0
+
+    def alternatives(
+        self,
+        city: str = None,
+        max_price: float = None,
+        bedrooms: int = None,
+        limit: int = 3,
+    ) -> List[Alternative]:
+        """Nearby searches with inventory, for a search that found nothing"""
+        if not self.is_ready():
+            return []
+
+        found = []
+        matched = sorted(
+            self._matching_cities(city) if city else [],
+            key=lambda name: -self.cities[name],
+        )
+        for name in matched:
+            # Same place, one filter relaxed at a time
+            if max_price is not None:
+                for bucket, bound in enumerate(PRICE_BOUNDS):
+                    count = self._count_under(name, bucket)
+                    if bound > max_price and count:
+                        found.append(Alternative(count, name, max_price=bound))
+                        break
+            if bedrooms is not None:
+                by_bedrooms = self.city_bedrooms.get(name, {})
+                nearest = sorted(
+                    (n for n in by_bedrooms if n != bedrooms),
+                    key=lambda n: (abs(n - bedrooms), n),
+                )
+                if nearest:
+                    found.append(
+                        Alternative(by_bedrooms[nearest[0]], name, bedrooms=nearest[0])
+                    )
+            if max_price is None and bedrooms is None:
+                found.append(Alternative(self.cities[name], name))
+
+        if len(found) < limit:
+            # Elsewhere, keeping the budget or else the bedroom count
+            others = []
+            budget = _bucket_within(max_price) if max_price is not None else None
+            for name, total in self.cities.items():
+                if name in matched:
+                    continue
+                if max_price is None and bedrooms is not None:
+                    count = self.city_bedrooms.get(name, {}).get(bedrooms)
+                    if count:
+                        others.append(Alternative(count, name, bedrooms=bedrooms))
+                elif max_price is None:
+                    others.append(Alternative(total, name))
+                elif budget is not None:
+                    count = self._count_under(name, budget)
+                    if count:
+                        others.append(
+                            Alternative(count, name, max_price=PRICE_BOUNDS[budget])
+                        )
+            others.sort(key=lambda alternative: (-alternative.count, alternative.city))
+            found.extend(others)
+
+        return found[:limit]
+
+    async def load(self, docs: List[dict]):
+        """Recount from every available property (change feed)"""
+        self._contributions = {}
+        self._reset_counts()
+        for doc in docs:
+            self.apply(doc)
+        self._synced_at = time.monotonic()
+        print(f"✅ Search facets cover {len(self._contributions)} properties")
+
+    async def apply_changes(self, docs: List[dict], deleted):
+        """Apply changed and deleted properties (change feed)"""
+        for doc in docs:
+            self.apply(doc)
+        for property_id in deleted:
+            self.remove(property_id)
+        self._synced_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": FACETS_ENABLED,
+            "mode": self.mode,
+            "ready": self.is_ready(),
+            "properties": len(self._contributions),
+            "cities": len(self.cities),
+            "countries": len(self.countries),
+            "price_buckets": {
+                (
+                    f"<= {PRICE_BOUNDS[bucket]}"
+                    if bucket < len(PRICE_BOUNDS)
+                    else f"> {PRICE_BOUNDS[-1]}"
+                ): count
+                for bucket, count in sorted(self.prices.items())
+            },
+            "bedrooms": dict(sorted(self.bedrooms.items())),
+        }
+
+
+def _names(text: str, name: str) -> bool:
+    """Whether searched text names a place, word for word.
+
+    The extracted city can carry trailing words ("paris under $45") or name
+    part of a place ("york"), but "me" in "near me" is not Rome.
+    """
+    text, name = text.lower(), name.lower()
+    return bool(
+        re.search(rf"\b{re.escape(name)}\b", text)
+        or re.search(rf"\b{re.escape(text)}\b", name)
+    )
+
+
+def _bucket_within(max_price: float) -> Optional[int]:
+    """Last price bucket whose bound doesn't exceed the budget"""
+    buckets = [i for i, bound in enumerate(PRICE_BOUNDS) if bound <= max_price]
+    return buckets[-1] if buckets else None
+
+
+facet_index = FacetIndex()
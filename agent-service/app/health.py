@@ -0,0 +1,121 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, List, Optional
+
+from app import llm_client
+from app.mongo import ping as mongo_ping
+
+# Dependency health probe configuration
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", 10))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", 5))
+
+
+class ProbeResult:
+    """Outcome of the latest check of one dependency"""
+
+    def __init__(self):
+        self.status = "unknown"
+        self.latency: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def as_dict(self) -> dict:
+        return {
+            "status": self.status,
+            "latency_ms": (
+                round(self.latency * 1000, 1) if self.latency is not None else None
+            ),
+            "error": self.error,
+        }
+
+
+class HealthProber:
+    """Checks Ollama and MongoDB in the background so /health never waits.
+
+    Both dependencies are probed concurrently every HEALTH_CHECK_INTERVAL
+    seconds, each bounded by HEALTH_CHECK_TIMEOUT; /health only reads the
+    cached results.
+    """
+
+    def __init__(self):
+        self.ollama = ProbeResult()
+        self.database = ProbeResult()
+        self.available_models: List[str] = []
+        self.checked_at: Optional[datetime] = None
+        self._checked_monotonic: Optional[float] = None
+        self.checks = 0
+
+    async def _probe(
+        self, name: str, result: ProbeResult, check: Callable[[], Awaitable]
+    ):
+        previous = result.status
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(check(), HEALTH_CHECK_TIMEOUT)
+            result.status = "connected"
+            result.error = None
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            result.status = "disconnected"
+            result.error = f"No answer within {HEALTH_CHECK_TIMEOUT}s"
+        except Exception as e:
+            result.status = "disconnected"
+            result.error = str(e) or type(e).__name__
+        result.latency = time.perf_counter() - started
+        if result.status != previous and result.error:
+            # Log transitions only, not every failed probe
+            print(f"{name} health check error: {result.error}")
+
+    async def _check_ollama(self):
+        response = await llm_client.get_tags()
+        response.raise_for_status()
+        self.available_models = [
+            model.get("name") for model in response.json().get("models", [])
+        ]
+
+    async def check(self):
+        """Probe every dependency once and cache the results"""
+        await asyncio.gather(
+            self._probe("Ollama", self.ollama, self._check_ollama),
+            self._probe("MongoDB", self.database, mongo_ping),
+        )
+        self.checked_at = datetime.now(timezone.utc)
+        self._checked_monotonic = time.monotonic()
+        self.checks += 1
+
+    async def run(self):
+        """Refresh the cached status until cancelled"""
+        while True:
+            await self.check()
+            await asyncio.sleep(HEALTH_CHECK_INTERVAL)
+
+    def status(self) -> str:
+        if self.checked_at is None:
+            return "starting"
+        if self.ollama.status == "connected" and self.database.status == "connected":
+            return "healthy"
+        return "degraded"
+
+    def snapshot(self) -> dict:
+        """The cached dependency status, as /health reports it"""
+        return {
+            "status": self.status(),
+            "ollama": self.ollama.status,
+            "database": self.database.status,
+            "available_models": list(self.available_models),
+            "checked_at": self.checked_at.isoformat() if self.checked_at else None,
+            "age_seconds": (
+                round(time.monotonic() - self._checked_monotonic, 3)
+                if self._checked_monotonic is not None
+                else None
+            ),
+            "probes": {
+                "ollama": self.ollama.as_dict(),
+                "database": self.database.as_dict(),
+            },
+        }
+
+
+health_prober = HealthProber()
@@ -0,0 +1,325 @@
+import asyncio
+import os
+import socket
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from app.queries import (
+    AVAILABLE_PROPERTIES_PROJECTION,
+    OWNER_PROPERTIES_PROJECTION,
+    PROPERTIES_LIMIT,
+    PROPERTIES_SORT,
+    SEARCH_PROJECTION,
+    available_properties_filter,
+    bookings_pipeline,
+    favorites_pipeline,
+    owner_properties_filter,
+    paged,
+    search_filter,
+    search_terms,
+)
+
+# Index bootstrap configuration
+INDEX_BOOTSTRAP_ENABLED = os.getenv("INDEX_BOOTSTRAP_ENABLED", "true").lower() == "true"
+SEARCH_NORMALIZE_INTERVAL = float(os.getenv("SEARCH_NORMALIZE_INTERVAL", 60))
+NORMALIZE_BATCH_SIZE = 500
+# Only the worker holding this lease bootstraps and normalizes
+INDEX_LEASE_SECONDS = float(
+    os.getenv("INDEX_LEASE_SECONDS", max(180, 3 * SEARCH_NORMALIZE_INTERVAL))
+)
+LEASE_COLLECTION = "service_leases"
+LEASE_ID = "index_bootstrap"
+
+# Compound indexes backing the chat helper queries
+REQUIRED_INDEXES = {
+    "properties": [
+        [("is_available", 1), ("created_at", -1), ("_id", -1)],
+        [("owner_id", 1), ("created_at", -1), ("_id", -1)],
+        [("is_available", 1), ("city_norm", 1)],
+        [("is_available", 1), ("country_norm", 1)],
+        [("is_available", 1), ("amenities_norm", 1)],
+        [("search_normalized_at", 1)],
+        [("updatedAt", 1)],
+    ],
+    "favorites": [[("user_id", 1), ("created_at", -1), ("_id", -1)]],
+    "bookings": [[("traveler_id", 1), ("booking_date", -1), ("_id", -1)]],
+    "users": [[("email", 1)]],
+}
+
+NORMALIZE_PROJECTION = {"city": 1, "country": 1, "amenities": 1}
+
+
+def normalized_fields(doc: dict) -> dict:
+    """Lowercase search fields for one property document"""
+    amenities = doc.get("amenities") or []
+    if isinstance(amenities, str):
+        amenities = [amenities]
+
+    amenities_norm = []
+    for amenity in amenities:
+        for term in search_terms(amenity):
+            if term not in amenities_norm:
+                amenities_norm.append(term)
+
+    return {
+        "city_norm": search_terms(doc.get("city")),
+        "country_norm": search_terms(doc.get("country")),
+        "amenities_norm": amenities_norm,
+    }
+
+
+def helper_queries() -> List[dict]:
+    """Explain commands for every query the chat helpers issue"""
+    sample_id = ObjectId()
+    sample_after = (datetime(2025, 1, 1), sample_id)
+    search_find = {
+        "find": "properties",
+        "filter": search_filter(
+            city="paris", amenity="wifi", max_price=200, normalized=True
+        ),
+        "projection": SEARCH_PROJECTION,
+        "sort": PROPERTIES_SORT,
+        "limit": PROPERTIES_LIMIT,
+    }
+    return [
+        {
+            "name": "user lookup by email",
+            "command": {
+                "find": "users",
+                "filter": {"email": "explain@example.com"},
+                "limit": 1,
+            },
+        },
+        {
+            "name": "get_user_properties (owner)",
+            "command": {
+                "find": "properties",
+                "filter": owner_properties_filter(sample_id),
+                "projection": OWNER_PROPERTIES_PROJECTION,
+                "sort": PROPERTIES_SORT,
+                "limit": PROPERTIES_LIMIT,
+            },
+        },
+        {
+            "name": "get_user_properties (available)",
+            "command": {
+                "find": "properties",
+                "filter": available_properties_filter(),
+                "projection": AVAILABLE_PROPERTIES_PROJECTION,
+                "sort": PROPERTIES_SORT,
+                "limit": PROPERTIES_LIMIT,
+            },
+        },
+        {"name": "search_properties", "command": search_find},
+        {
+            "name": "get_user_properties (available, next page)",
+            "command": {
+                "find": "properties",
+                "filter": paged(available_properties_filter(), sample_after),
+                "projection": AVAILABLE_PROPERTIES_PROJECTION,
+                "sort": PROPERTIES_SORT,
+                "limit": PROPERTIES_LIMIT,
+            },
+        },
+        {
+            "name": "get_user_favorites",
+            "command": {
+                "aggregate": "favorites",
+                "pipeline": favorites_pipeline(sample_id),
+                "cursor": {},
+            },
+        },
+        {
+            "name": "get_user_bookings",
+            "command": {
+                "aggregate": "bookings",
+                "pipeline": bookings_pipeline(sample_id),
+                "cursor": {},
+            },
+        },
+        {
+            "name": "get_user_bookings (next page)",
+            "command": {
+                "aggregate": "bookings",
+                "pipeline": bookings_pipeline(sample_id, sample_after),
+                "cursor": {},
+            },
+        },
+    ]
+
+
+def plan_has_collscan(explain: dict) -> bool:
+    """Whether any winning plan in an explain() result scans a whole collection"""
+
+    def walk(node, in_winning_plan: bool) -> bool:
+        if isinstance(node, dict):
+            if in_winning_plan and node.get("stage") == "COLLSCAN":
+                return True
+            return any(
+                walk(value, in_winning_plan or key == "winningPlan")
+                for key, value in node.items()
+                if key != "rejectedPlans"
+            )
+        if isinstance(node, list):
+            return any(walk(item, in_winning_plan) for item in node)
+        return False
+
+    return walk(explain, False)
+
+
+class IndexBootstrapper:
+    """Creates the helper indexes and keeps the normalized search fields current"""
+
+    def __init__(self):
+        self.holder = f"{socket.gethostname()}:{os.getpid()}"
+        self.leader = False
+        self.indexes_ready = False
+        self.search_fields_ready = False
+        self.normalized_documents = 0
+        self.last_normalized_at = None
+        self.collscans: List[str] = []
+        self._last_pass_started = None
+
+    async def ensure_indexes(self, db):
+        """Create any missing index (create_index is a no-op for existing ones)"""
+        for collection_name, indexes in REQUIRED_INDEXES.items():
+            for keys in indexes:
+                try:
+                    await db[collection_name].create_index(keys)
+                except OperationFailure as e:
+                    # e.g. another service already owns an index on these keys
+                    print(f"Skipping index {keys} on {collection_name}: {e}")
+        self.indexes_ready = True
+        print("✅ MongoDB indexes for the chat helpers are in place")
+
+    async def normalize(self, db, full: bool = False) -> int:
+        """Write city_norm/country_norm/amenities_norm on new or changed properties"""
+        pass_started = datetime.now(timezone.utc)
+
+        stale = [{"search_normalized_at": None}]
+        if full or self._last_pass_started is None:
+            stale.append({"$expr": {"$gt": ["$updatedAt", "$search_normalized_at"]}})
+        else:
+            # Overlap the previous pass a little to tolerate clock skew
+            since = self._last_pass_started - timedelta(seconds=5)
+            stale.append({"updatedAt": {"$gte": since}})
+
+        updated = 0
+        batch = []
+        async for doc in db.properties.find({"$or": stale}, NORMALIZE_PROJECTION):
+            fields = normalized_fields(doc)
+            fields["search_normalized_at"] = pass_started
+            batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": fields}))
+            if len(batch) >= NORMALIZE_BATCH_SIZE:
+                await db.properties.bulk_write(batch, ordered=False)
+                updated += len(batch)
+                batch = []
+        if batch:
+            await db.properties.bulk_write(batch, ordered=False)
+            updated += len(batch)
+
+        self._last_pass_started = pass_started
+        self.normalized_documents += updated
+        self.last_normalized_at = pass_started
+        return updated
+
+    async def find_collscans(self, db) -> List[str]:
+        """Names of helper queries whose winning plan is a COLLSCAN"""
+        collscans = []
+        for query in helper_queries():
+            explain = await db.command(
+                {"explain": query["command"], "verbosity": "queryPlanner"}
+            )
+            if plan_has_collscan(explain):
+                collscans.append(query["name"])
+        return collscans
+
+    async def bootstrap(self, db):
+        """Indexes, a full normalization pass, then the plan check"""
+        await self.ensure_indexes(db)
+        updated = await self.normalize(db, full=True)
+        self.search_fields_ready = True
+        print(f"✅ Normalized search fields on {updated} properties")
+
+        self.collscans = await self.find_collscans(db)
+        for name in self.collscans:
+            print(f"⚠️  {name} falls back to a COLLSCAN")
+
+    async def acquire_lease(self, db) -> bool:
+        """Take or renew the bootstrap lease; False while another worker holds it"""
+        now = datetime.now(timezone.utc)
+        try:
+            # Upserting over a lease held by someone else hits the _id index
+            await db[LEASE_COLLECTION].update_one(
+                {
+                    "_id": LEASE_ID,
+                    "$or": [{"holder": self.holder}, {"expires_at": {"$lt": now}}],
+                },
+                {
+                    "$set": {
+                        "holder": self.holder,
+                        "expires_at": now + timedelta(seconds=INDEX_LEASE_SECONDS),
+                    }
+                },
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def run(self, db):
+        """In the lease holder only: bootstrap once, then normalize new properties.
+
+        Every worker runs this loop, but only one at a time holds the lease, so
+        the full backfill and the periodic passes don't repeat per worker. A
+        worker that takes over an expired lease bootstraps again.
+        """
+        while True:
+            try:
+                self.leader = await self.acquire_lease(db)
+                if not self.leader:
+                    self.search_fields_ready = False
+                elif not self.search_fields_ready:
+                    await self.bootstrap(db)
+                else:
+                    await self.normalize(db)
+            except Exception as e:
+                # search_properties still finds un-normalized properties by regex
+                print(f"❌ Index bootstrap/normalization failed: {e}")
+            await asyncio.sleep(SEARCH_NORMALIZE_INTERVAL)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": INDEX_BOOTSTRAP_ENABLED,
+            "leader": self.leader,
+            "indexes_ready": self.indexes_ready,
+            "search_fields_ready": self.search_fields_ready,
+            "normalized_documents": self.normalized_documents,
+            "last_normalized_at": (
+                self.last_normalized_at.isoformat() if self.last_normalized_at else None
+            ),
+            "collscans": self.collscans,
+        }
+
+
+index_bootstrapper = IndexBootstrapper()
+
+
+async def _migrate():
+    from app import mongo
+
+    try:
+        await index_bootstrapper.bootstrap(mongo.get_database())
+    finally:
+        await mongo.close_client()
+    return 1 if index_bootstrapper.collscans else 0
+
+
+if __name__ == "__main__":
+    # One-off migration: python -m app.indexes (exits 1 if any helper query scans)
+    sys.exit(asyncio.run(_migrate()))
@@ -0,0 +1,331 @@
+import re
+from dataclasses import dataclass, field
+from datetime import date
+from typing import List, Optional, Tuple
+
+# Intent phrases in routing priority order
+INTENT_PHRASES = {
+    "my_properties": ["my propert", "my listing"],
+    "favorites": ["favorite", "favourite", "fav", "liked"],
+    "bookings": ["my booking", "my reservation", "my trip", "show booking"],
+    "search": [
+        "find",
+        "search",
+        "show",
+        "properties",
+        "property",
+        "hotel",
+        "accommodation",
+    ],
+}
+
+AMENITIES = [
+    "pool",
+    "wifi",
+    "parking",
+    "kitchen",
+    "gym",
+    "beach",
+    "balcony",
+    "ac",
+    "garden",
+]
+BEDROOM_UNITS = ["bedroom", "bed", "br"]
+BATHROOM_UNITS = ["bathroom", "bath", "ba"]
+PRICE_CUES = ["under", "below", "less than", "max", "maximum"]
+CITY_CUES = ["in ", "near ", "at ", "around "]
+CITY_STOP_WORDS = ["a", "the", "with", "and", "or", "property", "properties"]
+# Words that lead into a date range and would otherwise end up in the city
+DATE_LEAD_WORDS = ["from", "between", "for", "on", "starting"]
+# Kinds of property; naming one makes a message a search, as in "cozy cabin
+# for a ski weekend"
+PROPERTY_TYPES = [
+    "apartment",
+    "villa",
+    "cabin",
+    "chalet",
+    "cottage",
+    "bungalow",
+    "studio",
+    "loft",
+    "condo",
+]
+# With a date range, any of these (or a property type) makes a message a search
+STAY_WORDS = ["place", "stay", "somewhere", "room", "house", "rent"]
+MONTHS = {
+    "jan": 1,
+    "feb": 2,
+    "mar": 3,
+    "apr": 4,
+    "may": 5,
+    "jun": 6,
+    "jul": 7,
+    "aug": 8,
+    "sep": 9,
+    "oct": 10,
+    "nov": 11,
+    "dec": 12,
+}
+
+
+def _any_of(phrases) -> "re.Pattern":
+    """One precompiled substring check for a list of phrases"""
+    return re.compile("|".join(re.escape(phrase) for phrase in phrases))
+
+
+# Checked group by group, so overlapping phrases ("my properties") all count
+_INTENT_PATTERNS = tuple(
+    (intent, _any_of(phrases)) for intent, phrases in INTENT_PHRASES.items()
+)
+_PRICE_CUE_PATTERN = _any_of(PRICE_CUES)
+# Whole words only: "place" and "beach access" don't ask for AC
+_AMENITY_PATTERN = re.compile(r"\b(" + "|".join(AMENITIES) + r")(?:e?s)?\b")
+# Room counts, prices and dates all need one
+_DIGIT_PATTERN = re.compile(r"\d")
+# Only there to tell when a date parse is worth trying
+_MONTH_HINT_PATTERN = _any_of(MONTHS)
+_UNIT_PATTERNS = {
+    unit: re.compile(rf"(\d+)\s*{re.escape(unit)}|{re.escape(unit)}\s*(\d+)")
+    for unit in BEDROOM_UNITS + BATHROOM_UNITS
+}
+_PRICE_PATTERN = re.compile(r"\$?(\d+)")
+
+_MONTH = (
+    r"(jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?"
+    r"|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?"
+)
+_DAY = r"(\d{1,2})(?:st|nd|rd|th)?"
+_YEAR = r"(?:,?\s+(\d{4}))?"
+# "dec 20", "dec 20, 2025", "20 dec", "20th of december", "2025-12-20"
+_DATE_PATTERN = re.compile(
+    rf"\b(?:{_MONTH}\s+{_DAY}{_YEAR}|{_DAY}\s+(?:of\s+)?{_MONTH}{_YEAR}"
+    r"|(\d{4})-(\d{2})-(\d{2}))\b"
+)
+_RANGE_JOIN_PATTERN = re.compile(r"\s*(?:-|–|to|until|till|through|thru)\s*")
+# "and" only joins two full dates: "dec 20 and 3 bedrooms" is not a range
+_AND_JOIN_PATTERN = re.compile(r"\s+and\s+")
+# "dec 20-27", but not "dec 20 - 3 bedrooms"
+_BARE_DAY_PATTERN = re.compile(rf"{_DAY}\b(?!\s*(?:bed|br|bath|ba))")
+# Longer ranges are parsing mistakes rather than stays
+MAX_STAY_NIGHTS = 90
+_STAY_PATTERN = re.compile(r"\b(?:" + "|".join(STAY_WORDS + PROPERTY_TYPES) + r")s?\b")
+_PROPERTY_TYPE_PATTERN = re.compile(r"\b(?:" + "|".join(PROPERTY_TYPES) + r")s?\b")
+# Location cues as whole words: the "in " of "cabin for" is no cue
+_CITY_CUE_PATTERNS = [(cue, re.compile(rf"\b{cue}")) for cue in CITY_CUES]
+# "show my bookings and find places in paris"
+_CLAUSE_SPLIT_PATTERN = re.compile(r"\s+(?:and|then|also|plus)\s+|[,;]")
+# "show" alone is how a user list is asked for, not a search
+_SEARCH_CLAUSE_PATTERN = _any_of(
+    phrase for phrase in INTENT_PHRASES["search"] if phrase != "show"
+)
+_PERSONAL_PATTERN = _any_of(
+    phrase
+    for intent, phrases in INTENT_PHRASES.items()
+    if intent != "search"
+    for phrase in phrases
+)
+
+
+@dataclass
+class SearchParams:
+    city: Optional[str] = None
+    max_price: Optional[float] = None
+    amenity: Optional[str] = None
+    bedrooms: Optional[int] = None
+    bathrooms: Optional[int] = None
+    check_in: Optional[date] = None
+    check_out: Optional[date] = None
+
+    def as_dict(self) -> dict:
+        """Only the parameters that were found, dates as ISO strings"""
+        params = {}
+        if self.bedrooms is not None:
+            params["bedrooms"] = self.bedrooms
+        if self.bathrooms is not None:
+            params["bathrooms"] = self.bathrooms
+        if self.city is not None:
+            params["city"] = self.city
+        if self.max_price is not None:
+            params["max_price"] = self.max_price
+        if self.amenity is not None:
+            params["amenity"] = self.amenity
+        if self.check_in is not None:
+            params["check_in"] = self.check_in.isoformat()
+            params["check_out"] = self.check_out.isoformat()
+        return params
+
+
+@dataclass
+class ParsedMessage:
+    intents: List[str] = field(default_factory=list)  # In priority order
+    search: SearchParams = field(default_factory=SearchParams)
+    # Next to a user list, the clauses that ask for a search of their own
+    search_clause: Optional[str] = None
+
+    @property
+    def intent(self) -> Optional[str]:
+        """Highest-priority intent, or None for a general question"""
+        return self.intents[0] if self.intents else None
+
+
+def _extract_number(text: str, units: List[str]) -> Optional[int]:
+    """Number next to the first unit (in priority order) that has one"""
+    for unit in units:
+        if unit in text:
+            match = _UNIT_PATTERNS[unit].search(text)
+            if match:
+                return int(match.group(1) or match.group(2))
+    return None
+
+
+def _extract_city(text: str, dates_start: Optional[int] = None) -> Optional[str]:
+    """Up to three words after the first location cue, minus stop words"""
+    for cue, pattern in _CITY_CUE_PATTERNS:
+        # The substring check is cheap and most messages lack most cues
+        match = cue in text and pattern.search(text)
+        if not match:
+            continue
+        start = match.end()
+        # The text between the first and second occurrence of the cue
+        following = pattern.search(text, start)
+        end = following.start() if following else len(text)
+        trim_dates = dates_start is not None and start <= dates_start < end
+        if trim_dates:
+            end = dates_start  # "in rome from dec 20" names rome, not "rome from dec"
+        city_words = text[start:end].strip().split()[:3]
+        city_words = [w for w in city_words if w not in CITY_STOP_WORDS]
+        while trim_dates and city_words and city_words[-1] in DATE_LEAD_WORDS:
+            city_words.pop()
+        if city_words:
+            return " ".join(city_words).replace(",", "").replace(".", "")
+    return None
+
+
+def _match_date(match, today: date) -> date:
+    """The date a _DATE_PATTERN match names, in the coming year if it has none"""
+    month_day = match.group(1)
+    if month_day:
+        month, day, year = month_day, match.group(2), match.group(3)
+    elif match.group(4):
+        day, month, year = match.group(4), match.group(5), match.group(6)
+    else:
+        return date(int(match.group(7)), int(match.group(8)), int(match.group(9)))
+    month_number = MONTHS[month[:3]]
+    if year:
+        return date(int(year), month_number, int(day))
+    named = date(today.year, month_number, int(day))
+    return named if named >= today else date(today.year + 1, month_number, int(day))
+
+
+def _next_month(day: date) -> date:
+    """The same day of the following month (ValueError if it has no such day)"""
+    if day.month == 12:
+        return day.replace(year=day.year + 1, month=1)
+    return day.replace(month=day.month + 1)
+
+
+def extract_dates(
+    text: str, today: Optional[date] = None
+) -> Optional[Tuple[date, date, int, int]]:
+    """Check-in, check-out and the span of the first date range in the text"""
+    for match in _DATE_PATTERN.finditer(text):
+        join = _RANGE_JOIN_PATTERN.match(text, match.end()) or _AND_JOIN_PATTERN.match(
+            text, match.end()
+        )
+        if not join:
+            continue
+        today = today or date.today()
+        try:
+            check_in = _match_date(match, today)
+            end_match = _DATE_PATTERN.match(text, join.end())
+            if end_match:
+                # "dec 28 to jan 3" runs into the next year
+                check_out = _match_date(end_match, check_in)
+            else:
+                if join.re is _AND_JOIN_PATTERN:
+                    continue
+                # "dec 20-27": the second day is in the same month, and
+                # "jan 30 to 2" runs into the next one
+                end_match = _BARE_DAY_PATTERN.match(text, join.end())
+                if not end_match:
+                    continue
+                check_out = check_in.replace(day=int(end_match.group(1)))
+                if check_out <= check_in:
+                    check_out = _next_month(check_out)
+        except ValueError:
+            continue  # e.g. feb 30
+        if not 0 < (check_out - check_in).days <= MAX_STAY_NIGHTS:
+            continue
+        return check_in, check_out, match.start(), end_match.end()
+    return None
+
+
+def _extract_numbers(
+    text: str, intents: List[str], search: SearchParams, today: Optional[date]
+):
+    """Dates, room counts, price and city, for a message with digits in it"""
+    dates = dates_start = None
+    if "-" in text or _MONTH_HINT_PATTERN.search(text):
+        dates = extract_dates(text, today)
+        if not dates:
+            # A lone date still ends the city: "in rome on dec 20"
+            lone_date = _DATE_PATTERN.search(text)
+            if lone_date:
+                dates_start = lone_date.start()
+    if dates:
+        search.check_in, search.check_out, dates_start, dates_end = dates
+        # Keep the day numbers away from the price and room count extraction
+        text = text[:dates_start] + " " * (dates_end - dates_start) + text[dates_end:]
+        if not intents and _STAY_PATTERN.search(text):
+            intents.append("search")
+
+    # Zero counts are ignored, as before
+    search.bedrooms = _extract_number(text, BEDROOM_UNITS) or None
+    search.bathrooms = _extract_number(text, BATHROOM_UNITS) or None
+    search.city = _extract_city(text, dates_start)
+
+    if _PRICE_CUE_PATTERN.search(text):
+        # Find price with $ or just number
+        price_match = _PRICE_PATTERN.search(text)
+        if price_match:
+            search.max_price = float(price_match.group(1))
+
+
+def _search_clause(text: str) -> Optional[str]:
+    """The clauses that name no user list, if one of them asks for properties"""
+    clauses = [
+        clause
+        for clause in _CLAUSE_SPLIT_PATTERN.split(text)
+        if not _PERSONAL_PATTERN.search(clause)
+    ]
+    if any(
+        _SEARCH_CLAUSE_PATTERN.search(clause) or _STAY_PATTERN.search(clause)
+        for clause in clauses
+    ):
+        return ", ".join(clause.strip() for clause in clauses)
+    return None
+
+
+def parse_message(message: str, today: Optional[date] = None) -> ParsedMessage:
+    """Detect intents and search parameters from one lowercased copy of the message"""
+    text = message.lower()
+
+    intents = [intent for intent, pattern in _INTENT_PATTERNS if pattern.search(text)]
+    if not intents and _PROPERTY_TYPE_PATTERN.search(text):
+        intents.append("search")
+
+    search = SearchParams()
+    if _DIGIT_PATTERN.search(text):
+        _extract_numbers(text, intents, search, today)
+    else:
+        search.city = _extract_city(text)
+
+    amenities = _AMENITY_PATTERN.findall(text)
+    if amenities:
+        # The first in AMENITIES order, whatever order the message names them
+        search.amenity = min(amenities, key=AMENITIES.index)
+
+    parsed = ParsedMessage(intents=intents, search=search)
+    if "search" in intents and intents[0] != "search":
+        parsed.search_clause = _search_clause(text)
+    return parsed
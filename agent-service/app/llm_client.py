@@ -0,0 +1,115 @@
+import json
+import os
+from typing import AsyncIterator, List, Optional
+
+import httpx
+
+from app.metrics import record_ollama_result
+
+# Ollama configuration
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "localhost")
+OLLAMA_PORT = int(os.getenv("OLLAMA_PORT", 11434))
+OLLAMA_BASE_URL = f"http://{OLLAMA_HOST}:{OLLAMA_PORT}"
+OLLAMA_URL = f"{OLLAMA_BASE_URL}/api/generate"
+MODEL_NAME = "llama3.2:1b"
+REQUEST_TIMEOUT = 60
+HEALTH_TIMEOUT = 5
+
+# Connection pool limits
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", 10))
+OLLAMA_MAX_KEEPALIVE = int(os.getenv("OLLAMA_MAX_KEEPALIVE", 5))
+OLLAMA_KEEPALIVE_EXPIRY = float(os.getenv("OLLAMA_KEEPALIVE_EXPIRY", 30))
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", 5))
+
+
+def _parse_keep_alive(value: str):
+    """Ollama takes a duration string ("30m") or a number of seconds (-1 = forever)"""
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+# How long Ollama keeps the model loaded after a request
+OLLAMA_KEEP_ALIVE = _parse_keep_alive(os.getenv("OLLAMA_KEEP_ALIVE", "30m"))
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Get the shared keep-alive client, creating it on first use"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=OLLAMA_BASE_URL,
+            limits=httpx.Limits(
+                max_connections=OLLAMA_MAX_CONNECTIONS,
+                max_keepalive_connections=OLLAMA_MAX_KEEPALIVE,
+                keepalive_expiry=OLLAMA_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=OLLAMA_CONNECT_TIMEOUT),
+        )
+    return _client
+
+
+async def close_client():
+    """Close the shared client and its pooled connections"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def generate(payload: dict) -> dict:
+    """Run a non-streaming generation and return Ollama's JSON body"""
+    response = await get_client().post("/api/generate", json=payload)
+    response.raise_for_status()
+    result = response.json()
+    record_ollama_result(payload["model"], result)
+    return result
+
+
+async def stream_generate(payload: dict) -> AsyncIterator[dict]:
+    """Run a streaming generation, yielding each NDJSON chunk as it arrives"""
+    async with get_client().stream(
+        "POST", "/api/generate", json={**payload, "stream": True}
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line.strip():
+                chunk = json.loads(line)
+                if chunk.get("done"):
+                    record_ollama_result(payload["model"], chunk)
+                yield chunk
+
+
+async def get_tags() -> httpx.Response:
+    """Fetch the list of locally available models"""
+    return await get_client().get("/api/tags", timeout=HEALTH_TIMEOUT)
+
+
+async def load_model(model: str) -> dict:
+    """Load a model into memory without generating anything"""
+    # An empty generate request only loads the model and applies keep_alive
+    response = await get_client().post(
+        "/api/generate", json={"model": model, "keep_alive": OLLAMA_KEEP_ALIVE}
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+async def running_models() -> List[str]:
+    """Names of the models Ollama currently holds in memory"""
+    response = await get_client().get("/api/ps", timeout=HEALTH_TIMEOUT)
+    response.raise_for_status()
+    return [model.get("name") for model in response.json().get("models", [])]
+
+
+async def embed(model: str, inputs: List[str]) -> List[List[float]]:
+    """Embed a batch of texts, one vector per input"""
+    response = await get_client().post(
+        "/api/embed",
+        json={"model": model, "input": inputs, "keep_alive": OLLAMA_KEEP_ALIVE},
+    )
+    response.raise_for_status()
+    return response.json()["embeddings"]
@@ -0,0 +1,226 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+# Prometheus text exposition (format 0.0.4) for the agent service
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+_registry: List["_Metric"] = []
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self):
+        return [
+            f"{self.name}{_format_labels(list(zip(self.labelnames, key)))} "
+            f"{_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def _samples(self):
+        return [
+            f"{self.name}{_format_labels(list(zip(self.labelnames, key)))} "
+            f"{_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> (per-bucket counts, sum, count)
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        series = self._values.get(key)
+        if series is None:
+            series = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][i] += 1
+                break
+        series[1] += value
+        series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of the with-block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self):
+        samples = []
+        for key, (counts, total, count) in sorted(self._values.items()):
+            pairs = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(pairs + [("le", _format_value(bound))])
+                samples.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(pairs + [("le", "+Inf")])
+            samples.append(f"{self.name}_bucket{labels} {count}")
+            samples.append(
+                f"{self.name}_sum{_format_labels(pairs)} {_format_value(total)}"
+            )
+            samples.append(f"{self.name}_count{_format_labels(pairs)} {count}")
+        return samples
+
+
+def render() -> str:
+    """Every registered metric in the text exposition format"""
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+# Chat pipeline metrics
+CHAT_REQUESTS = Counter(
+    "agent_chat_requests_total", "Chat turns handled, by detected intent", ["intent"]
+)
+CHAT_STAGE_SECONDS = Histogram(
+    "agent_chat_stage_seconds", "Time spent in each stage of a chat turn", ["stage"]
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "agent_http_request_seconds",
+    "Time to response start per endpoint",
+    ["method", "path", "status"],
+)
+
+# Ollama generation metrics, from the eval_count/eval_duration Ollama returns
+OLLAMA_EVAL_TOKENS = Counter(
+    "agent_ollama_eval_tokens_total", "Tokens generated by Ollama", ["model"]
+)
+OLLAMA_EVAL_SECONDS = Counter(
+    "agent_ollama_eval_seconds_total", "Ollama time spent generating tokens", ["model"]
+)
+OLLAMA_TOKENS_PER_SECOND = Gauge(
+    "agent_ollama_tokens_per_second",
+    "Generation throughput of the most recent Ollama response",
+    ["model"],
+)
+
+# LLM admission control
+LLM_QUEUE_WAIT_SECONDS = Histogram(
+    "agent_llm_queue_wait_seconds", "Time spent waiting for a generation slot"
+)
+LLM_REJECTIONS = Counter(
+    "agent_llm_rejections_total", "Generations turned away with a 429", ["reason"]
+)
+
+# MongoDB command metrics, fed by a pymongo command listener
+MONGO_COMMAND_SECONDS = Histogram(
+    "agent_mongo_command_seconds", "MongoDB command round-trip time", ["command"]
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "agent_mongo_command_failures_total", "Failed MongoDB commands", ["command"]
+)
+
+# Connection pools, fed by app.pools
+POOL_CHECKOUT_SECONDS = Histogram(
+    "agent_pool_checkout_seconds",
+    "Time spent waiting to check a connection out of a pool",
+    ["pool"],
+)
+POOL_CHECKOUT_TIMEOUTS = Counter(
+    "agent_pool_checkout_timeouts_total",
+    "Checkouts that gave up waiting for a free connection",
+    ["pool"],
+)
+POOL_CONNECTIONS = Gauge(
+    "agent_pool_connections", "Open pool connections by state", ["pool", "state"]
+)
+
+
+def record_ollama_result(model: str, result: dict):
+    """Record token throughput from a final Ollama response"""
+    eval_count = result.get("eval_count")
+    eval_duration = result.get("eval_duration")  # Nanoseconds
+    if not eval_count or not eval_duration:
+        return
+    seconds = eval_duration / 1e9
+    OLLAMA_EVAL_TOKENS.inc(eval_count, model=model)
+    OLLAMA_EVAL_SECONDS.inc(seconds, model=model)
+    OLLAMA_TOKENS_PER_SECOND.set(eval_count / seconds, model=model)
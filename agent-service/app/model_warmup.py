@@ -0,0 +1,96 @@
+import asyncio
+import os
+import time
+from typing import Optional
+
+from app import llm_client
+from app.llm_client import MODEL_NAME
+
+# Model warm-up configuration
+MODEL_WARMUP_ENABLED = os.getenv("MODEL_WARMUP_ENABLED", "true").lower() == "true"
+MODEL_KEEPALIVE_CHECK_SECONDS = float(os.getenv("MODEL_KEEPALIVE_CHECK_SECONDS", 60))
+MODEL_WARMUP_RETRY_SECONDS = 5
+MODEL_WARMUP_MAX_RETRY_SECONDS = 60
+
+
+class ModelWarmer:
+    """Loads the model at startup and reloads it if Ollama lets it go.
+
+    state is "cold" until the first load finishes, then "ready"; it goes
+    back to "loading" while a model Ollama unloaded is brought back.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self.state = "cold"
+        self.loads = 0
+        self.last_load_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def is_ready(self) -> bool:
+        return self.state == "ready"
+
+    async def load(self):
+        """Load the model, retrying with backoff until Ollama has it"""
+        delay = MODEL_WARMUP_RETRY_SECONDS
+        while True:
+            started = time.monotonic()
+            try:
+                await llm_client.load_model(self.model)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e) or type(e).__name__
+                print(
+                    f"⚠️ Model warm-up failed ({self.last_error}); retrying in {delay}s"
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MODEL_WARMUP_MAX_RETRY_SECONDS)
+                continue
+            self.last_load_seconds = time.monotonic() - started
+            self.last_error = None
+            self.loads += 1
+            self.state = "ready"
+            print(f"🔥 Model {self.model} loaded in {self.last_load_seconds:.2f}s")
+            return
+
+    async def is_loaded(self) -> bool:
+        """Whether Ollama still holds the model in memory"""
+        return self.model in await llm_client.running_models()
+
+    async def run(self):
+        """Warm the model, then keep checking that it stays resident"""
+        self.state = "loading"
+        await self.load()
+        while True:
+            await asyncio.sleep(MODEL_KEEPALIVE_CHECK_SECONDS)
+            try:
+                loaded = await self.is_loaded()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Ollama itself is unreachable; the health check reports that
+                self.last_error = str(e) or type(e).__name__
+                continue
+            if not loaded:
+                print(f"🧊 Model {self.model} was unloaded; reloading")
+                self.state = "loading"
+                await self.load()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": MODEL_WARMUP_ENABLED,
+            "model": self.model,
+            "state": self.state,
+            "keep_alive": llm_client.OLLAMA_KEEP_ALIVE,
+            "loads": self.loads,
+            "last_load_seconds": (
+                round(self.last_load_seconds, 3)
+                if self.last_load_seconds is not None
+                else None
+            ),
+            "last_error": self.last_error,
+        }
+
+
+model_warmer = ModelWarmer(MODEL_NAME)
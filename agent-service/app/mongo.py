@@ -0,0 +1,75 @@
+import os
+from typing import Optional
+
+from pymongo import AsyncMongoClient, monitoring
+
+from app.metrics import MONGO_COMMAND_FAILURES, MONGO_COMMAND_SECONDS
+from app.pools import mongo_client_options, mongo_pool
+
+# Database configuration
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST", "localhost"),
+    "database": os.getenv("DB_NAME", "airbnb_db"),
+    "port": int(os.getenv("DB_PORT", 27017)),
+}
+
+
+class CommandTimer(monitoring.CommandListener):
+    """Feed every command's round-trip time into the Mongo metrics"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_COMMAND_SECONDS.observe(
+            event.duration_micros / 1e6, command=event.command_name
+        )
+
+    def failed(self, event):
+        MONGO_COMMAND_SECONDS.observe(
+            event.duration_micros / 1e6, command=event.command_name
+        )
+        MONGO_COMMAND_FAILURES.inc(command=event.command_name)
+
+
+# The async client never blocks the event loop: every query is awaited, so a
+# slow $lookup on one conversation leaves the worker free to serve the others.
+_client: Optional[AsyncMongoClient] = None
+_client_pid: Optional[int] = None
+
+
+def get_client() -> AsyncMongoClient:
+    """This process's client, created on first use and again after a fork"""
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        # A client inherited across fork() would share its parent's sockets
+        # and monitor state, so each worker builds its own
+        options = mongo_client_options()
+        options["event_listeners"].append(CommandTimer())
+        mongo_pool.reset()
+        _client = AsyncMongoClient(
+            host=DB_CONFIG["host"], port=DB_CONFIG["port"], **options
+        )
+        _client_pid = os.getpid()
+        print(f"✅ MongoDB client ready (pid {_client_pid})")
+    return _client
+
+
+def get_database():
+    """The service database on this process's client"""
+    return get_client().get_database(DB_CONFIG["database"])
+
+
+async def close_client():
+    """Close this process's client; one inherited from a parent is left alone"""
+    global _client, _client_pid
+    if _client is not None and _client_pid == os.getpid():
+        await _client.close()
+    _client = None
+    _client_pid = None
+
+
+async def ping() -> bool:
+    """Ping the MongoDB server"""
+    await get_client().admin.command("ping")
+    return True
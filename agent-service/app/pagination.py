@@ -0,0 +1,148 @@
+import base64
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, List, Optional, Tuple
+
+from bson.objectid import ObjectId
+
+from app.intents import SearchParams
+
+TOKEN_VERSION = 1
+# Search parameter types a token may carry, as SearchParams.as_dict() writes them
+_PARAM_TYPES = {
+    "city": str,
+    "amenity": str,
+    "max_price": (int, float),
+    "bedrooms": int,
+    "bathrooms": int,
+    "check_in": str,
+    "check_out": str,
+}
+# What a my_properties token carries: whose listing it pages through
+_LISTING_PARAM_TYPES = {"user_type": str}
+
+
+class InvalidContinuation(ValueError):
+    """A continuation token that can't be decoded"""
+
+
+@dataclass
+class Page:
+    items: List[dict] = field(default_factory=list)
+    # (sort value, _id) of the last item, when another page exists
+    after: Optional[Tuple[Any, Any]] = None
+
+
+@dataclass
+class Continuation:
+    intent: str
+    after: Tuple[Any, Any]
+    params: dict = field(default_factory=dict)
+
+
+def make_page(docs: List[dict], limit: int, sort_field: str, id_field: str) -> Page:
+    """Cut a limit + 1 fetch into one page and the position of the next"""
+    items = docs[:limit]
+    if len(docs) <= limit:
+        return Page(items)
+    last = items[-1]
+    return Page(items, (last.get(sort_field), last.get(id_field)))
+
+
+def _encode_value(value) -> list:
+    if isinstance(value, datetime):
+        return ["d", value.isoformat()]
+    if isinstance(value, ObjectId):
+        return ["o", str(value)]
+    return ["v", value]
+
+
+def _decode_value(encoded):
+    kind, value = encoded
+    if kind == "d":
+        return datetime.fromisoformat(value)
+    if kind == "o":
+        return ObjectId(value)
+    if kind == "v":
+        # Plain sort values only: a dict here would become a query operator
+        if value is not None and not isinstance(value, (str, int, float)):
+            raise InvalidContinuation("Malformed position")
+        return value
+    raise InvalidContinuation(f"Unknown value type {kind!r}")
+
+
+def _check_param_types(params, types: dict):
+    if not isinstance(params, dict):
+        raise InvalidContinuation("Malformed parameters")
+    for name, value in params.items():
+        expected = types.get(name)
+        # bool is an int, but never a valid count or price
+        if (
+            expected is None
+            or isinstance(value, bool)
+            or not isinstance(value, expected)
+        ):
+            raise InvalidContinuation(f"Malformed parameter {name!r}")
+
+
+def _decode_params(intent: str, params) -> dict:
+    """A token's parameters, checked against the types its intent uses"""
+    if intent == "my_properties":
+        _check_param_types(params, _LISTING_PARAM_TYPES)
+        return dict(params)
+    _check_param_types(params, _PARAM_TYPES)
+    if ("check_in" in params) != ("check_out" in params):
+        raise InvalidContinuation("Malformed stay dates")
+    search = SearchParams(
+        city=params.get("city"),
+        max_price=params.get("max_price"),
+        amenity=params.get("amenity"),
+        bedrooms=params.get("bedrooms"),
+        bathrooms=params.get("bathrooms"),
+    )
+    if "check_in" in params:
+        search.check_in = date.fromisoformat(params["check_in"])
+        search.check_out = date.fromisoformat(params["check_out"])
+        if search.check_out <= search.check_in:
+            raise InvalidContinuation("Malformed stay dates")
+    if search.max_price is not None:
+        search.max_price = float(search.max_price)
+    return search.as_dict()
+
+
+def encode_continuation(
+    intent: str, after: Tuple[Any, Any], params: dict = None
+) -> str:
+    """Opaque, URL-safe token for the page that follows the given position"""
+    payload = {
+        "v": TOKEN_VERSION,
+        "i": intent,
+        "a": [_encode_value(after[0]), _encode_value(after[1])],
+        "p": params or {},
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_continuation(token: str) -> Continuation:
+    """Parse a token made by encode_continuation"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        if payload["v"] != TOKEN_VERSION:
+            raise InvalidContinuation("Unsupported token version")
+        after = tuple(_decode_value(value) for value in payload["a"])
+        if len(after) != 2:
+            raise InvalidContinuation("Malformed position")
+        if not isinstance(payload["i"], str):
+            raise InvalidContinuation("Malformed intent")
+        return Continuation(
+            intent=payload["i"],
+            after=after,
+            params=_decode_params(payload["i"], payload["p"]),
+        )
+    except InvalidContinuation:
+        raise
+    except Exception as e:
+        raise InvalidContinuation(str(e)) from e
@@ -0,0 +1,328 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+from pymongo import monitoring
+
+from app.metrics import POOL_CHECKOUT_SECONDS, POOL_CHECKOUT_TIMEOUTS, POOL_CONNECTIONS
+
+# MongoDB connection pool configuration
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 5))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000))
+MONGO_PREWARM_TIMEOUT = float(os.getenv("MONGO_PREWARM_TIMEOUT", 10))
+
+# MySQL connection pool configuration (used by app/database.py)
+MYSQL_POOL_SIZE = int(os.getenv("MYSQL_POOL_SIZE", 5))
+MYSQL_POOL_TIMEOUT = float(os.getenv("MYSQL_POOL_TIMEOUT", 5))
+# A pool that can't be created is retried after this, doubling with each
+# failure in a row up to the maximum
+MYSQL_POOL_RETRY_SECONDS = float(os.getenv("MYSQL_POOL_RETRY_SECONDS", 1))
+MYSQL_POOL_MAX_RETRY_SECONDS = float(os.getenv("MYSQL_POOL_MAX_RETRY_SECONDS", 60))
+
+
+class PoolStats:
+    """Connection and checkout counts for one pool"""
+
+    def __init__(self, name: str, max_size: int, min_size: int, timeout: float):
+        self.name = name
+        self.max_size = max_size
+        self.min_size = min_size
+        self.timeout = timeout
+        self.reset()
+
+    def reset(self):
+        """Start counting afresh, for a pool rebuilt in a new process"""
+        self.open = 0
+        self.in_use = 0
+        self.waiting = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.prewarmed = False
+        self.publish()
+
+    def publish(self):
+        POOL_CONNECTIONS.set(self.in_use, pool=self.name, state="in_use")
+        POOL_CONNECTIONS.set(self.idle(), pool=self.name, state="idle")
+
+    def idle(self) -> int:
+        return max(0, self.open - self.in_use)
+
+    def opened(self):
+        self.open += 1
+        self.publish()
+
+    def closed(self):
+        self.open = max(0, self.open - 1)
+        self.publish()
+
+    def checkout_started(self):
+        self.waiting += 1
+
+    def checked_out(self, waited: float):
+        self.waiting = max(0, self.waiting - 1)
+        self.in_use += 1
+        self.checkouts += 1
+        self.wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        POOL_CHECKOUT_SECONDS.observe(waited, pool=self.name)
+        self.publish()
+
+    def checkout_failed(self, timed_out: bool, waited: float):
+        self.waiting = max(0, self.waiting - 1)
+        POOL_CHECKOUT_SECONDS.observe(waited, pool=self.name)
+        if timed_out:
+            self.timeouts += 1
+            POOL_CHECKOUT_TIMEOUTS.inc(pool=self.name)
+        else:
+            self.failures += 1
+
+    def checked_in(self):
+        self.in_use = max(0, self.in_use - 1)
+        self.publish()
+
+    def stats(self) -> dict:
+        return {
+            "max_size": self.max_size,
+            "min_size": self.min_size,
+            "checkout_timeout": self.timeout,
+            "open": self.open,
+            "in_use": self.in_use,
+            "idle": self.idle(),
+            "waiting": self.waiting,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+            "avg_checkout_wait_ms": (
+                round(self.wait_seconds / self.checkouts * 1000, 3)
+                if self.checkouts
+                else None
+            ),
+            "max_checkout_wait_ms": round(self.max_wait_seconds * 1000, 3),
+            "prewarmed": self.prewarmed,
+        }
+
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """Feed pymongo's connection pool events into a PoolStats"""
+
+    def __init__(self, pool: PoolStats):
+        self.pool = pool
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.pool.opened()
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.pool.closed()
+
+    def connection_check_out_started(self, event):
+        self.pool.checkout_started()
+
+    def connection_check_out_failed(self, event):
+        timed_out = event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT
+        self.pool.checkout_failed(timed_out, event.duration)
+
+    def connection_checked_out(self, event):
+        self.pool.checked_out(event.duration)
+
+    def connection_checked_in(self, event):
+        self.pool.checked_in()
+
+
+mongo_pool = PoolStats(
+    "mongo",
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
+    MONGO_WAIT_QUEUE_TIMEOUT_MS / 1000,
+)
+
+
+def mongo_client_options() -> dict:
+    """AsyncMongoClient keyword arguments for the configured pool"""
+    return {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "event_listeners": [MongoPoolListener(mongo_pool)],
+    }
+
+
+async def prewarm_mongo(client):
+    """Open minPoolSize connections before the first requests need them"""
+    if MONGO_MIN_POOL_SIZE <= 0:
+        return
+    started = time.perf_counter()
+    try:
+        # Pings in flight together can't share a connection, so the pool opens
+        # more; pymongo keeps it topped up to minPoolSize after that
+        await asyncio.wait_for(
+            asyncio.gather(
+                *(client.admin.command("ping") for _ in range(MONGO_MIN_POOL_SIZE))
+            ),
+            timeout=MONGO_PREWARM_TIMEOUT,
+        )
+        mongo_pool.prewarmed = True
+        print(
+            f"🔥 MongoDB pool warmed: {mongo_pool.open} connections in "
+            f"{(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+    except Exception as e:
+        print(f"❌ MongoDB pool pre-warm failed: {e}")
+
+
+class _PooledConnection:
+    """A checked-out MySQL connection that tells MySQLPool when it is closed"""
+
+    def __init__(self, connection, checked_in: Callable[[], None]):
+        self._connection = connection
+        self._checked_in: Optional[Callable[[], None]] = checked_in
+
+    def close(self):
+        if self._checked_in is None:
+            return
+        checked_in, self._checked_in = self._checked_in, None
+        try:
+            self._connection.close()  # Hands it back to mysql.connector's pool
+        finally:
+            checked_in()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+class MySQLPool:
+    """A MySQLConnectionPool sized from the environment, with checkout stats.
+
+    mysql.connector's pool raises at once when every connection is out; here
+    a checkout waits up to MYSQL_POOL_TIMEOUT for one to be closed instead.
+    The wait blocks its thread, so async code checks out with
+    get_connection_async. A pool that can't be created is tried again only
+    after a backoff.
+    """
+
+    def __init__(self, size: int, timeout: float):
+        self.counts = PoolStats("mysql", size, size, timeout)
+        self.create_failures = 0
+        self._pool = None
+        self._pid: Optional[int] = None
+        self._slots: Optional[threading.BoundedSemaphore] = None
+        self._retry_at = 0.0
+
+    def get_pool(self, db_config: dict):
+        """This process's pool, created on first use and again after a fork"""
+        if self._pool is not None and self._pid == os.getpid():
+            return self._pool
+        if self._pid == os.getpid() and time.monotonic() < self._retry_at:
+            return None  # Creation failed recently
+        # Optional dependency: only app/database.py needs it
+        import mysql.connector
+        from mysql.connector import pooling
+
+        self.counts.reset()
+        self._pool = None
+        self._pid = os.getpid()
+        try:
+            # The pool opens all of its connections up front
+            pool = pooling.MySQLConnectionPool(
+                pool_name="airbnb_pool",
+                pool_size=self.counts.max_size,
+                **db_config,
+            )
+        except mysql.connector.Error as err:
+            self.create_failures += 1
+            delay = min(
+                MYSQL_POOL_RETRY_SECONDS * 2 ** (self.create_failures - 1),
+                MYSQL_POOL_MAX_RETRY_SECONDS,
+            )
+            self._retry_at = time.monotonic() + delay
+            print(f"❌ Error creating connection pool: {err}; retrying in {delay:g}s")
+            return None
+        self.create_failures = 0
+        self._pool = pool
+        # Checkouts are counted here, not read back from the pool's internals
+        self._slots = threading.BoundedSemaphore(self.counts.max_size)
+        self.counts.open = self.counts.max_size
+        self.counts.prewarmed = True
+        print("✅ Successfully created MySQL connection pool")
+        return pool
+
+    def get_connection(self, db_config: dict):
+        """Check a connection out, waiting up to the timeout for a free one"""
+        pool = self.get_pool(db_config)
+        if pool is None:
+            return None
+        from mysql.connector.errors import PoolError
+
+        slots = self._slots
+        started = time.perf_counter()
+        self.counts.checkout_started()
+        connection = None
+        timed_out = False
+        try:
+            if not slots.acquire(timeout=self.counts.timeout):
+                timed_out = True
+                raise PoolError(
+                    f"No MySQL connection free within {self.counts.timeout:g}s"
+                )
+            try:
+                connection = pool.get_connection()
+            except BaseException:
+                slots.release()
+                raise
+        finally:
+            waited = time.perf_counter() - started
+            if connection is None:
+                self.counts.checkout_failed(timed_out, waited)
+            else:
+                self.counts.checked_out(waited)
+        return _PooledConnection(connection, lambda: self._checked_in(slots))
+
+    async def get_connection_async(self, db_config: dict):
+        """get_connection, waiting in a thread rather than on the event loop"""
+        return await asyncio.to_thread(self.get_connection, db_config)
+
+    def _checked_in(self, slots: threading.BoundedSemaphore):
+        slots.release()
+        if slots is self._slots:  # Not a connection from before a fork
+            self.counts.checked_in()
+
+    def stats(self) -> dict:
+        return {
+            **self.counts.stats(),
+            "created": self._pool is not None,
+            "create_failures": self.create_failures,
+        }
+
+
+mysql_pool = MySQLPool(MYSQL_POOL_SIZE, MYSQL_POOL_TIMEOUT)
+
+
+def stats() -> dict:
+    """Every pool's stats, as /stats reports them"""
+    return {"mongo": mongo_pool.stats(), "mysql": mysql_pool.stats()}
@@ -0,0 +1,307 @@
+import os
+import re
+import time
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import numpy as np
+
+# Property index configuration
+PROPERTY_INDEX_ENABLED = os.getenv("PROPERTY_INDEX_ENABLED", "false").lower() == "true"
+PROPERTY_INDEX_MAX_STALENESS = float(os.getenv("PROPERTY_INDEX_MAX_STALENESS", 120))
+
+# Same fields search_properties returns, plus what the index filters and sorts on
+RESULT_FIELDS = [
+    "property_name",
+    "city",
+    "country",
+    "price_per_night",
+    "bedrooms",
+    "bathrooms",
+    "property_type",
+    "amenities",
+]
+INDEX_PROJECTION = {field: 1 for field in RESULT_FIELDS}
+INDEX_PROJECTION.update({"is_available": 1, "created_at": 1, "updatedAt": 1})
+
+_MIN_DATETIME = datetime.min.replace(tzinfo=timezone.utc)
+
+
+def _created_key(created_at) -> datetime:
+    """Comparable created_at, missing values lowest (Mongo null order)"""
+    if not isinstance(created_at, datetime):
+        return _MIN_DATETIME
+    if created_at.tzinfo is None:
+        return created_at.replace(tzinfo=timezone.utc)
+    return created_at
+
+
+def _sort_key(doc: dict):
+    """Newest first by (created_at, _id), matching PROPERTIES_SORT"""
+    return (_created_key(doc.get("created_at")), doc["_id"])
+
+
+def _as_float(value) -> float:
+    """Numeric column value, NaN for anything a Mongo comparison would skip"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return np.nan
+    return float(value)
+
+
+class _Vocabulary:
+    """Interns strings into dense integer ids"""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self._ids = {}
+
+    def intern(self, value) -> int:
+        if not isinstance(value, str):
+            return -1
+        value_id = self._ids.get(value)
+        if value_id is None:
+            value_id = len(self.values)
+            self._ids[value] = value_id
+            self.values.append(value)
+        return value_id
+
+    def matching_ids(self, pattern) -> np.ndarray:
+        """Ids of every interned value the compiled regex matches"""
+        return np.array(
+            [i for i, value in enumerate(self.values) if pattern.search(value)],
+            dtype=np.int32,
+        )
+
+
+class PropertyIndex:
+    """Column-oriented in-memory copy of the available properties.
+
+    Answers the same filters as the Mongo path of search_properties with
+    vectorized masks. Rows are kept in created_at order so the first matches
+    are already the newest ones.
+    """
+
+    def __init__(self):
+        self._docs = {}  # _id -> projected document of an available property
+        self._rows: List[dict] = []
+        self._keys = []  # _sort_key of each row, descending
+        self._positions = {}  # _id -> row
+        self._columns = {}
+        self._vocab = {}
+        self._synced_at: Optional[float] = None
+        self.projection = INDEX_PROJECTION
+        self.mode = "disabled"
+        self.searches = 0
+        self.fallbacks = 0
+
+    def build(self):
+        """Rebuild the column arrays from the current documents"""
+        rows = sorted(self._docs.values(), key=_sort_key, reverse=True)
+        cities, countries, types, amenities = (
+            _Vocabulary(),
+            _Vocabulary(),
+            _Vocabulary(),
+            _Vocabulary(),
+        )
+
+        city_ids = np.fromiter(
+            (cities.intern(doc.get("city")) for doc in rows), np.int32, len(rows)
+        )
+        country_ids = np.fromiter(
+            (countries.intern(doc.get("country")) for doc in rows),
+            np.int32,
+            len(rows),
+        )
+        type_ids = np.fromiter(
+            (types.intern(doc.get("property_type")) for doc in rows),
+            np.int32,
+            len(rows),
+        )
+        price = np.fromiter(
+            (_as_float(doc.get("price_per_night")) for doc in rows),
+            np.float64,
+            len(rows),
+        )
+        bedrooms = np.fromiter(
+            (_as_float(doc.get("bedrooms")) for doc in rows), np.float64, len(rows)
+        )
+        bathrooms = np.fromiter(
+            (_as_float(doc.get("bathrooms")) for doc in rows), np.float64, len(rows)
+        )
+
+        row_amenities = []
+        for doc in rows:
+            values = doc.get("amenities") or []
+            if isinstance(values, str):
+                values = [values]
+            row_amenities.append([i for i in map(amenities.intern, values) if i >= 0])
+
+        # One bit per distinct amenity, packed into 64-bit words per row
+        words = max(1, (len(amenities.values) + 63) // 64)
+        amenity_bits = np.zeros((len(rows), words), dtype=np.uint64)
+        for row, ids in enumerate(row_amenities):
+            for amenity_id in ids:
+                amenity_bits[row, amenity_id // 64] |= np.uint64(1 << (amenity_id % 64))
+
+        self._rows = rows
+        self._keys = [_sort_key(doc) for doc in rows]
+        self._positions = {doc["_id"]: row for row, doc in enumerate(rows)}
+        self._columns = {
+            "price": price,
+            "bedrooms": bedrooms,
+            "bathrooms": bathrooms,
+            "city_ids": city_ids,
+            "country_ids": country_ids,
+            "type_ids": type_ids,
+            "amenity_bits": amenity_bits,
+        }
+        self._vocab = {
+            "cities": cities,
+            "countries": countries,
+            "types": types,
+            "amenities": amenities,
+        }
+
+    def is_ready(self) -> bool:
+        """Whether the index is loaded and recent enough to answer searches"""
+        return (
+            self._synced_at is not None
+            and time.monotonic() - self._synced_at <= PROPERTY_INDEX_MAX_STALENESS
+        )
+
+    def search(
+        self,
+        city: str = None,
+        max_price: float = None,
+        amenity: str = None,
+        bedrooms: int = None,
+        bathrooms: int = None,
+        limit: int = 10,
+        after=None,
+        exclude=None,
+    ) -> Optional[List[dict]]:
+        """Search the index; returns None when the caller should query Mongo"""
+        if not self.is_ready():
+            self.fallbacks += 1
+            return None
+
+        start = 0
+        if after is not None:
+            try:
+                start = self._start_after(after)
+            except TypeError:
+                # e.g. a non-ObjectId _id that can't be ordered against the rows
+                self.fallbacks += 1
+                return None
+
+        try:
+            city_pattern = re.compile(city, re.IGNORECASE) if city else None
+            amenity_pattern = re.compile(amenity, re.IGNORECASE) if amenity else None
+        except re.error:
+            # Mongo's regex dialect may accept what Python's rejects
+            self.fallbacks += 1
+            return None
+
+        columns = self._columns
+        mask = np.ones(len(self._rows), dtype=bool)
+        mask[:start] = False
+
+        if city_pattern is not None:
+            mask &= np.isin(
+                columns["city_ids"], self._vocab["cities"].matching_ids(city_pattern)
+            ) | np.isin(
+                columns["country_ids"],
+                self._vocab["countries"].matching_ids(city_pattern),
+            )
+
+        if max_price is not None:
+            mask &= columns["price"] <= max_price
+
+        if amenity_pattern is not None:
+            query_bits = np.zeros(columns["amenity_bits"].shape[1], dtype=np.uint64)
+            for amenity_id in self._vocab["amenities"].matching_ids(amenity_pattern):
+                query_bits[amenity_id // 64] |= np.uint64(1 << (int(amenity_id) % 64))
+            mask &= (columns["amenity_bits"] & query_bits).any(axis=1)
+
+        if bedrooms is not None:
+            mask &= columns["bedrooms"] == bedrooms
+
+        if bathrooms is not None:
+            mask &= columns["bathrooms"] == bathrooms
+
+        if exclude:
+            # e.g. properties already booked for the requested dates
+            rows = [self._positions[i] for i in exclude if i in self._positions]
+            mask[rows] = False
+
+        self.searches += 1
+        return [self._result(self._rows[row]) for row in np.flatnonzero(mask)[:limit]]
+
+    def _start_after(self, after) -> int:
+        """First row that sorts after a (created_at, _id) keyset position"""
+        target = (_created_key(after[0]), after[1])
+        low, high = 0, len(self._keys)
+        while low < high:
+            middle = (low + high) // 2
+            if self._keys[middle] < target:
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    @staticmethod
+    def _result(doc: dict) -> dict:
+        """Shape a row like the Mongo path's projected document"""
+        result = {field: doc[field] for field in RESULT_FIELDS if field in doc}
+        result["_id"] = doc["_id"]
+        if "created_at" in doc:
+            result["created_at"] = doc["created_at"]
+        return result
+
+    def apply(self, doc: dict) -> bool:
+        """Insert, update or drop one property; returns True if the index changed"""
+        if doc.get("is_available") is True:
+            self._docs[doc["_id"]] = doc
+            return True
+        return self._docs.pop(doc["_id"], None) is not None
+
+    def remove(self, property_id) -> bool:
+        """Drop a deleted property; returns True if it was indexed"""
+        return self._docs.pop(property_id, None) is not None
+
+    async def load(self, docs: List[dict]):
+        """Replace the index with these available properties (change feed)"""
+        self._docs = {doc["_id"]: doc for doc in docs}
+        self.build()
+        self._synced_at = time.monotonic()
+        print(f"✅ Property index loaded {len(self._rows)} available properties")
+
+    async def apply_changes(self, docs: List[dict], deleted):
+        """Apply changed and deleted properties (change feed)"""
+        changed = False
+        for doc in docs:
+            changed = self.apply(doc) or changed
+        for property_id in deleted:
+            changed = self.remove(property_id) or changed
+        if changed:
+            self.build()
+        self._synced_at = time.monotonic()
+
+    def stats(self) -> dict:
+        """Report size, freshness and how often searches fell back to Mongo"""
+        return {
+            "enabled": PROPERTY_INDEX_ENABLED,
+            "mode": self.mode,
+            "ready": self.is_ready(),
+            "properties": len(self._rows),
+            "age_seconds": (
+                round(time.monotonic() - self._synced_at, 3)
+                if self._synced_at is not None
+                else None
+            ),
+            "searches": self.searches,
+            "fallbacks": self.fallbacks,
+        }
+
+
+property_index = PropertyIndex()
@@ -0,0 +1,231 @@
+import re
+from typing import List
+
+# Shared filters and pipelines for the chat helpers, so the index bootstrapper
+# can explain() exactly what the helpers run.
+
+PROPERTY_FIELDS = {
+    "property_name": 1,
+    "city": 1,
+    "country": 1,
+    "price_per_night": 1,
+    "bedrooms": 1,
+    "bathrooms": 1,
+    "property_type": 1,
+}
+
+OWNER_PROPERTIES_PROJECTION = {
+    "property_id": "$_id",  # Rename _id to property_id for consistency
+    **PROPERTY_FIELDS,
+    "is_available": 1,  # Additional field to select for owner properties
+    "created_at": 1,  # Keyset position for the next page
+}
+AVAILABLE_PROPERTIES_PROJECTION = {
+    "property_id": "$_id",  # Rename _id to property_id
+    **PROPERTY_FIELDS,
+    "created_at": 1,
+}
+SEARCH_PROJECTION = {
+    "property_id": "$_id",  # Rename _id to property_id
+    **PROPERTY_FIELDS,
+    "amenities": 1,  # Include amenities in the projection
+    "created_at": 1,
+}
+
+# _id breaks created_at ties so keyset pages never skip or repeat a document
+PROPERTIES_SORT = {"created_at": -1, "_id": -1}
+PROPERTIES_LIMIT = 10
+FAVORITES_LIMIT = 10
+BOOKINGS_LIMIT = 5
+
+
+def normalize_text(value: str) -> str:
+    """Lowercase and collapse whitespace"""
+    return " ".join(value.lower().split())
+
+
+def search_terms(value) -> List[str]:
+    """Normalized value plus each trailing word run, e.g. 'new york' -> ['new york', 'york'].
+
+    Storing every word-start lets an anchored prefix regex, which Mongo can
+    serve from an index, still find 'York' in 'New York' or 'pool' in
+    'Swimming Pool'.
+    """
+    if not isinstance(value, str):
+        return []
+    words = normalize_text(value).split()
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+def owner_properties_filter(owner_id) -> dict:
+    return {"owner_id": owner_id}
+
+
+def available_properties_filter() -> dict:
+    return {"is_available": True}
+
+
+def after_filter(after, sort_field: str = "created_at") -> dict:
+    """Documents that come after a (sort value, _id) position, newest first.
+
+    Missing sort values sort last in descending order, so they follow every
+    dated document and are paged by _id among themselves.
+    """
+    value, last_id = after
+    if value is None:
+        return {sort_field: None, "_id": {"$lt": last_id}}
+    return {
+        "$or": [
+            {sort_field: {"$lt": value}},
+            {sort_field: value, "_id": {"$lt": last_id}},
+            {sort_field: None},
+        ]
+    }
+
+
+def paged(query_filter: dict, after=None, sort_field: str = "created_at") -> dict:
+    """Restrict a filter to the page after the given position, if any"""
+    if after is None:
+        return query_filter
+    return {"$and": [query_filter, after_filter(after, sort_field)]}
+
+
+def excluding(query_filter: dict, ids) -> dict:
+    """Restrict a filter to documents whose _id is not among the given ones"""
+    if not ids:
+        return query_filter
+    return {"$and": [query_filter, {"_id": {"$nin": list(ids)}}]}
+
+
+def search_filter(
+    city: str = None,
+    max_price: float = None,
+    amenity: str = None,
+    bedrooms: int = None,
+    bathrooms: int = None,
+    normalized: bool = False,
+) -> dict:
+    """Build the search_properties filter.
+
+    With normalized=True, city/country/amenity match as anchored prefixes on
+    the lowercase *_norm fields maintained by the index bootstrapper, instead
+    of case-insensitive substring regexes that always scan. Properties the
+    bootstrapper hasn't reached yet (no search_normalized_at) still match
+    through the regexes, so new listings show up before the next pass.
+    """
+    query_filter = {"is_available": True}
+
+    text_filter = {}
+    if city:
+        text_filter["$or"] = [
+            {"city": {"$regex": city, "$options": "i"}},  # Case-insensitive search
+            {"country": {"$regex": city, "$options": "i"}},  # Case-insensitive search
+        ]
+    if amenity:
+        # Assuming amenities is an array of strings in MongoDB
+        # This will match if any amenity in the array contains the substring
+        text_filter["amenities"] = {"$regex": amenity, "$options": "i"}
+
+    if text_filter and normalized:
+        normalized_filter = {}
+        if city:
+            prefix = {"$regex": "^" + re.escape(normalize_text(city))}
+            normalized_filter["$or"] = [{"city_norm": prefix}, {"country_norm": prefix}]
+        if amenity:
+            normalized_filter["amenities_norm"] = {
+                "$regex": "^" + re.escape(normalize_text(amenity))
+            }
+        query_filter["$or"] = [
+            normalized_filter,
+            {"$and": [{"search_normalized_at": None}, text_filter]},
+        ]
+    else:
+        query_filter.update(text_filter)
+
+    if max_price is not None:  # Check for None explicitly to allow 0 as a valid price
+        query_filter["price_per_night"] = {"$lte": max_price}
+
+    if bedrooms is not None:
+        query_filter["bedrooms"] = bedrooms
+
+    if bathrooms is not None:
+        query_filter["bathrooms"] = bathrooms
+
+    return query_filter
+
+
+def property_lookup(fields: dict) -> dict:
+    """Join each row to its property, bringing back only the given fields.
+
+    Rows whose property is gone keep an empty propertyDetails rather than
+    being dropped, so a page still holds limit rows and the next-page check
+    stays right; the helpers leave those rows out of the reply.
+    """
+    return {
+        "$lookup": {
+            "from": "properties",  # The collection to join with
+            "localField": "property_id",
+            "foreignField": "_id",
+            "pipeline": [{"$project": fields}],
+            "as": "propertyDetails",
+        }
+    }
+
+
+# Property fields each join needs, besides _id
+FAVORITE_PROPERTY_FIELDS = PROPERTY_FIELDS
+BOOKING_PROPERTY_FIELDS = {"property_name": 1, "city": 1, "country": 1}
+
+
+def favorites_pipeline(user_id, after=None, limit: int = FAVORITES_LIMIT) -> list:
+    # Sort and limit on the (user_id, created_at, _id) index before joining,
+    # so a user with a long history still joins only one page of properties
+    return [
+        {"$match": paged({"user_id": user_id}, after)},
+        {"$sort": {"created_at": -1, "_id": -1}},  # Newest favorites first
+        {"$limit": limit},
+        property_lookup(FAVORITE_PROPERTY_FIELDS),
+        {"$unwind": {"path": "$propertyDetails", "preserveNullAndEmptyArrays": True}},
+        {
+            "$project": {
+                "_id": 0,  # Exclude the favorite's _id
+                "favorite_id": "$_id",  # Keyset tie-breaker for the next page
+                "property_id": "$propertyDetails._id",  # Map property _id to property_id
+                "property_name": "$propertyDetails.property_name",
+                "city": "$propertyDetails.city",
+                "country": "$propertyDetails.country",
+                "price_per_night": "$propertyDetails.price_per_night",
+                "bedrooms": "$propertyDetails.bedrooms",
+                "bathrooms": "$propertyDetails.bathrooms",
+                "property_type": "$propertyDetails.property_type",
+                "created_at": "$created_at",  # Favorite created_at for the next page
+            }
+        },
+    ]
+
+
+def bookings_pipeline(user_id, after=None, limit: int = BOOKINGS_LIMIT) -> list:
+    # Sort and limit on the (traveler_id, booking_date, _id) index before joining
+    return [
+        {"$match": paged({"traveler_id": user_id}, after, "booking_date")},
+        {"$sort": {"booking_date": -1, "_id": -1}},  # Newest bookings first
+        {"$limit": limit},
+        property_lookup(BOOKING_PROPERTY_FIELDS),
+        {"$unwind": {"path": "$propertyDetails", "preserveNullAndEmptyArrays": True}},
+        {
+            "$project": {
+                "_id": 0,  # Exclude the booking's _id
+                "booking_id": "$_id",  # Map booking _id to booking_id
+                "check_in_date": 1,
+                "check_out_date": 1,
+                "num_guests": 1,
+                "total_price": 1,
+                "status": 1,
+                "property_id": "$propertyDetails._id",  # Missing if the property is gone
+                "property_name": "$propertyDetails.property_name",
+                "city": "$propertyDetails.city",
+                "country": "$propertyDetails.country",
+                "booking_date": 1,  # Booking date for the next page
+            }
+        },
+    ]
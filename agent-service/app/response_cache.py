@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+# Response cache configuration
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 512))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", 3600))
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after a fixed TTL"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None when missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        """Store a value, evicting the least recently used entry when full"""
+        if self.max_entries <= 0:
+            return
+        if ttl_seconds is None:
+            ttl_seconds = self.ttl_seconds
+        self._entries[key] = (time.monotonic() + ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: str):
+        """Drop a single entry"""
+        self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop every entry"""
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """Report size and hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lowercase and collapse whitespace so near-identical prompts share a key"""
+    return " ".join(prompt.lower().split())
+
+
+def make_key(prompt: str, model: str, options: dict) -> str:
+    """Build a cache key from the normalized prompt and the model options"""
+    payload = json.dumps(
+        {"prompt": normalize_prompt(prompt), "model": model, "options": options},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+llm_cache = TTLCache(LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL)
@@ -0,0 +1,323 @@
+import os
+import re
+import time
+from typing import Callable, Collection, List, Optional
+
+import numpy as np
+
+from app import llm_client
+from app.intents import extract_dates
+from app.property_index import RESULT_FIELDS
+
+# Semantic search configuration
+SEMANTIC_SEARCH_ENABLED = (
+    os.getenv("SEMANTIC_SEARCH_ENABLED", "false").lower() == "true"
+)
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "nomic-embed-text")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 32))
+SEMANTIC_MIN_SCORE = float(os.getenv("SEMANTIC_MIN_SCORE", 0.3))
+SEMANTIC_INDEX_MAX_STALENESS = float(os.getenv("SEMANTIC_INDEX_MAX_STALENESS", 300))
+
+EMBED_PROJECTION = {field: 1 for field in RESULT_FIELDS}
+EMBED_PROJECTION.update({"description": 1, "is_available": 1, "updatedAt": 1})
+
+# Words that only say "search for something", not what to search for
+FILLER_WORDS = {
+    "a",
+    "accommodation",
+    "all",
+    "an",
+    "any",
+    "are",
+    "available",
+    "can",
+    "display",
+    "do",
+    "every",
+    "find",
+    "for",
+    "get",
+    "give",
+    "got",
+    "have",
+    "hotel",
+    "i",
+    "is",
+    "list",
+    "listing",
+    "listings",
+    "looking",
+    "me",
+    "more",
+    "option",
+    "options",
+    "other",
+    "place",
+    "places",
+    "please",
+    "properties",
+    "property",
+    "results",
+    "search",
+    "see",
+    "show",
+    "some",
+    "stay",
+    "stays",
+    "the",
+    "there",
+    "to",
+    "view",
+    "want",
+    "what",
+    "you",
+}
+_WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+def descriptive_query(message: str) -> str:
+    """What is left of a search message once the filler words and dates are gone"""
+    text = message.lower()
+    dates = extract_dates(text)
+    if dates:
+        text = text[: dates[2]] + " " + text[dates[3] :]
+    words = _WORD_PATTERN.findall(text)
+    return " ".join(word for word in words if word not in FILLER_WORDS)
+
+
+def result_filter(
+    places: Optional[Collection[str]] = None,
+    max_price: float = None,
+    bedrooms: int = None,
+    bathrooms: int = None,
+) -> Optional[Callable[[dict], bool]]:
+    """Predicate holding ranked results to a search's place, budget and rooms"""
+    if places is None and max_price is None and bedrooms is None and bathrooms is None:
+        return None
+    names = {place.lower() for place in places} if places is not None else None
+
+    def matches(result: dict) -> bool:
+        if names is not None and not (
+            str(result.get("city", "")).lower() in names
+            or str(result.get("country", "")).lower() in names
+        ):
+            return False
+        if max_price is not None:
+            price = result.get("price_per_night")
+            if not isinstance(price, (int, float)) or price > max_price:
+                return False
+        if bedrooms is not None and result.get("bedrooms") != bedrooms:
+            return False
+        if bathrooms is not None and result.get("bathrooms") != bathrooms:
+            return False
+        return True
+
+    return matches
+
+
+def embedding_text(doc: dict) -> str:
+    """The text a property is embedded from"""
+    amenities = doc.get("amenities") or []
+    if isinstance(amenities, str):
+        amenities = [amenities]
+    parts = [
+        doc.get("property_name"),
+        doc.get("property_type"),
+        doc.get("description"),
+        "Amenities: " + ", ".join(map(str, amenities)) if amenities else None,
+        ", ".join(str(v) for v in (doc.get("city"), doc.get("country")) if v),
+    ]
+    return ". ".join(str(part) for part in parts if part)
+
+
+class SemanticIndex:
+    """Embeddings of the available properties in one contiguous float32 matrix.
+
+    Rows are L2-normalized, so a query is one matrix-vector product followed
+    by a partial sort for the top k. Properties are only re-embedded when the
+    text they are embedded from changes.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._size = 0
+        self._ids = []  # row -> _id
+        self._results: List[dict] = []  # row -> projected result document
+        self._rows = {}  # _id -> row
+        self._texts = {}  # _id -> text its row was embedded from
+        self._synced_at: Optional[float] = None
+        self.projection = EMBED_PROJECTION
+        self.mode = "disabled"
+        self.embedded = 0
+        self.searches = 0
+        self.fallbacks = 0
+
+    def is_ready(self) -> bool:
+        return (
+            self._synced_at is not None
+            and time.monotonic() - self._synced_at <= SEMANTIC_INDEX_MAX_STALENESS
+        )
+
+    def _put(self, doc: dict, text: str, vector: List[float]):
+        """Store one property's normalized embedding, appending or overwriting"""
+        vector = np.asarray(vector, dtype=np.float32)
+        if self._matrix.shape[1] != vector.shape[0]:
+            # First vector, or the embedding model changed: start over
+            self._matrix = np.zeros((0, vector.shape[0]), dtype=np.float32)
+            self._size = 0
+            self._ids, self._results, self._rows, self._texts = [], [], {}, {}
+
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector = vector / norm
+
+        row = self._rows.get(doc["_id"])
+        if row is None:
+            if self._size == self._matrix.shape[0]:
+                # Grow geometrically so appends stay amortized O(1)
+                grown = np.zeros(
+                    (max(64, 2 * self._size), self._matrix.shape[1]), dtype=np.float32
+                )
+                grown[: self._size] = self._matrix[: self._size]
+                self._matrix = grown
+            row = self._size
+            self._size += 1
+            self._rows[doc["_id"]] = row
+            self._ids.append(doc["_id"])
+            self._results.append(self._result(doc))
+        else:
+            self._results[row] = self._result(doc)
+        self._matrix[row] = vector
+        self._texts[doc["_id"]] = text
+
+    def remove(self, property_id) -> bool:
+        """Drop a property by moving the last row into its place"""
+        row = self._rows.pop(property_id, None)
+        if row is None:
+            return False
+        self._texts.pop(property_id, None)
+        last = self._size - 1
+        if row != last:
+            self._matrix[row] = self._matrix[last]
+            self._ids[row] = self._ids[last]
+            self._results[row] = self._results[last]
+            self._rows[self._ids[row]] = row
+        self._ids.pop()
+        self._results.pop()
+        self._size -= 1
+        return True
+
+    @staticmethod
+    def _result(doc: dict) -> dict:
+        result = {field: doc[field] for field in RESULT_FIELDS if field in doc}
+        result["_id"] = doc["_id"]
+        return result
+
+    async def upsert(self, docs: List[dict]):
+        """Apply changed properties, embedding only those whose text changed"""
+        pending = []
+        for doc in docs:
+            if doc.get("is_available") is not True:
+                self.remove(doc["_id"])
+                continue
+            text = embedding_text(doc)
+            if self._texts.get(doc["_id"]) == text:
+                # Price or the like changed; the vector is still good
+                self._results[self._rows[doc["_id"]]] = self._result(doc)
+            else:
+                pending.append((doc, text))
+
+        for start in range(0, len(pending), EMBEDDING_BATCH_SIZE):
+            batch = pending[start : start + EMBEDDING_BATCH_SIZE]
+            vectors = await llm_client.embed(self.model, [text for _, text in batch])
+            for (doc, text), vector in zip(batch, vectors):
+                self._put(doc, text, vector)
+            self.embedded += len(batch)
+
+    def search_vector(
+        self,
+        vector: List[float],
+        limit: int,
+        min_score: float = SEMANTIC_MIN_SCORE,
+        exclude=None,
+        where: Optional[Callable[[dict], bool]] = None,
+    ) -> List[dict]:
+        """Top properties by cosine similarity to an embedded query"""
+        if self._size == 0:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        if query.shape[0] != self._matrix.shape[1]:
+            return []
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+        scores = self._matrix[: self._size] @ (query / norm)
+        if exclude:
+            rows = [self._rows[i] for i in exclude if i in self._rows]
+            scores[rows] = -np.inf
+        if where is not None:
+            keep = np.fromiter(
+                (where(result) for result in self._results),
+                dtype=bool,
+                count=self._size,
+            )
+            scores[~keep] = -np.inf
+
+        k = min(limit, self._size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {**self._results[row], "score": float(scores[row])}
+            for row in top
+            if scores[row] >= min_score
+        ]
+
+    async def search(
+        self, query: str, limit: int, exclude=None, where=None
+    ) -> Optional[List[dict]]:
+        """Semantic search; returns None when the index can't answer"""
+        if not self.is_ready():
+            self.fallbacks += 1
+            return None
+        try:
+            vector = (await llm_client.embed(self.model, [query]))[0]
+        except Exception as e:
+            print(f"Query embedding error: {e}")
+            self.fallbacks += 1
+            return None
+        self.searches += 1
+        return self.search_vector(vector, limit, exclude=exclude, where=where)
+
+    async def load(self, docs: List[dict]):
+        """Sync every available property, dropping ones that are gone (change feed)"""
+        await self.upsert(docs)
+        current = {doc["_id"] for doc in docs}
+        for property_id in [i for i in self._ids if i not in current]:
+            self.remove(property_id)
+        self._synced_at = time.monotonic()
+        print(f"✅ Semantic index holds {self._size} properties")
+
+    async def apply_changes(self, docs: List[dict], deleted):
+        """Apply changed and deleted properties (change feed)"""
+        await self.upsert(docs)
+        for property_id in deleted:
+            self.remove(property_id)
+        self._synced_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": SEMANTIC_SEARCH_ENABLED,
+            "model": self.model,
+            "mode": self.mode,
+            "ready": self.is_ready(),
+            "properties": self._size,
+            "dimensions": self._matrix.shape[1],
+            "matrix_bytes": int(self._matrix.nbytes),
+            "embedded": self.embedded,
+            "searches": self.searches,
+            "fallbacks": self.fallbacks,
+        }
+
+
+semantic_index = SemanticIndex(EMBEDDING_MODEL)
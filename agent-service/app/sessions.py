@@ -0,0 +1,112 @@
+import os
+import time
+import uuid
+from array import array
+from collections import OrderedDict, deque
+from typing import List, Optional, Tuple
+
+# Conversation session configuration
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", 1000))
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", 1800))
+SESSION_MAX_CONTEXT_TOKENS = int(os.getenv("SESSION_MAX_CONTEXT_TOKENS", 2048))
+SESSION_HISTORY_MESSAGES = 6
+
+
+class Session:
+    """One conversation: Ollama's context tokens plus the recent messages"""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        # Token ids as 32-bit ints, about 4 bytes each instead of a PyLong apiece
+        self.context = array("i")
+        self.history = deque(maxlen=SESSION_HISTORY_MESSAGES)
+        self.turns = 0
+        self.last_used = time.monotonic()
+
+    def remember_context(self, context: Optional[List[int]]):
+        """Keep the context Ollama returned, unless it outgrew the budget"""
+        if context and len(context) <= SESSION_MAX_CONTEXT_TOKENS:
+            self.context = array("i", context)
+        else:
+            # Too long to carry on; the next turn is rebuilt from the history
+            self.context = array("i")
+
+    def record(self, message: str, response: str):
+        """Append a finished turn to the history"""
+        self.history.append(("user", message))
+        self.history.append(("assistant", response))
+        self.turns += 1
+
+    def messages(self) -> List[Tuple[str, str]]:
+        """Recent (role, content) pairs, oldest first"""
+        return list(self.history)
+
+
+class SessionStore:
+    """Bounded LRU of sessions that also expire after being idle"""
+
+    def __init__(self, max_entries: int, idle_ttl: float):
+        self.max_entries = max_entries
+        self.idle_ttl = idle_ttl
+        self._sessions = OrderedDict()  # session_id -> Session, least recent first
+        self.created = 0
+        self.resumed = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def _sweep(self):
+        """Drop idle sessions from the least recently used end"""
+        cutoff = time.monotonic() - self.idle_ttl
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.last_used > cutoff:
+                break
+            self._sessions.popitem(last=False)
+            self.expired += 1
+
+    def create(self) -> Session:
+        """Start a new session, evicting the least recently used when full"""
+        self._sweep()
+        session = Session(uuid.uuid4().hex)
+        self._sessions[session.session_id] = session
+        self.created += 1
+        while len(self._sessions) > self.max_entries:
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+        return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        """A live session, or None if it never existed, expired or was evicted"""
+        self._sweep()
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        session.last_used = time.monotonic()
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def resume(self, session_id: str) -> Session:
+        """The session for an id, or a fresh one if it is gone"""
+        session = self.get(session_id)
+        if session is None:
+            return self.create()
+        self.resumed += 1
+        return session
+
+    def end(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._sessions),
+            "max_entries": self.max_entries,
+            "idle_ttl": self.idle_ttl,
+            "created": self.created,
+            "resumed": self.resumed,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "context_tokens": sum(len(s.context) for s in self._sessions.values()),
+        }
+
+
+chat_sessions = SessionStore(SESSION_MAX_ENTRIES, SESSION_IDLE_TTL)
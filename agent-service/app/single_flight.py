@@ -0,0 +1,51 @@
+import asyncio
+import hashlib
+import json
+from typing import Awaitable, Callable, Dict
+
+
+def payload_key(payload: dict) -> str:
+    """Key identifying an exact request payload"""
+    encoded = json.dumps(payload, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one in-flight call.
+
+    The shared call runs as its own task, so a caller that gives up (e.g. a
+    client disconnect) does not cancel the result for everyone else waiting.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.executed = 0
+        self.deduplicated = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]):
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+            self.executed += 1
+        else:
+            self.deduplicated += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every waiter went away
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._in_flight),
+            "executed": self.executed,
+            "deduplicated": self.deduplicated,
+        }
+
+
+llm_flights = SingleFlight()
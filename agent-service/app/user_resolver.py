@@ -0,0 +1,55 @@
+import os
+from typing import Optional
+
+from bson.objectid import ObjectId
+
+from app.response_cache import TTLCache
+
+# Email -> user id cache configuration
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", 10000))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 300))
+USER_CACHE_NEGATIVE_TTL = float(os.getenv("USER_CACHE_NEGATIVE_TTL", 30))
+
+# Cached for emails with no user, so repeated unknown emails skip the lookup too
+_NOT_FOUND = object()
+
+
+class UserResolver:
+    """Resolves user emails to ids through a bounded TTL cache"""
+
+    def __init__(self):
+        self._cache = TTLCache(USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL)
+        self.negative_hits = 0
+
+    async def resolve(self, db, email: str) -> Optional[ObjectId]:
+        """User _id for an email, or None if no such user exists"""
+        cached = self._cache.get(email)
+        if cached is _NOT_FOUND:
+            self.negative_hits += 1
+            return None
+        if cached is not None:
+            return cached
+
+        user_doc = await db.users.find_one({"email": email}, {"_id": 1})
+        if not user_doc:
+            self._cache.set(email, _NOT_FOUND, ttl_seconds=USER_CACHE_NEGATIVE_TTL)
+            return None
+
+        self._cache.set(email, user_doc["_id"])
+        return user_doc["_id"]
+
+    def invalidate(self, email: Optional[str] = None):
+        """Forget one email (e.g. after signup or an email change), or all of them"""
+        if email is None:
+            self._cache.clear()
+        else:
+            self._cache.invalidate(email)
+
+    def stats(self) -> dict:
+        stats = self._cache.stats()
+        stats["negative_hits"] = self.negative_hits
+        stats["negative_ttl_seconds"] = USER_CACHE_NEGATIVE_TTL
+        return stats
+
+
+user_resolver = UserResolver()
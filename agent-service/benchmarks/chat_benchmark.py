@@ -0,0 +1,365 @@
+"""Load benchmark for /chat against seeded data and a fake Ollama server.
+
+Serves main.app with uvicorn on a local port and drives it over HTTP from a
+separate thread at a fixed concurrency with a weighted mix of intents. Data
+comes from an in-process fake (default) or a local MongoDB seeded into a
+throwaway database. Ollama is replaced by a local HTTP server with a
+configurable time to first token and token rate. The report is JSON, so runs
+can be diffed or compared by a script.
+
+    python -m benchmarks.chat_benchmark
+    python -m benchmarks.chat_benchmark --concurrency 32 --requests 2000 --output run.json
+    python -m benchmarks.chat_benchmark --mongo-host localhost --properties 50000
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import socket
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import httpx
+import uvicorn
+
+from benchmarks.fakes import CITIES, FakeDatabase, fake_ollama_app, seed_documents
+
+DEFAULT_MIX = "search=0.4,bookings=0.15,favorites=0.15,my_properties=0.1,general=0.2"
+GENERAL_QUESTIONS = [
+    "What can you do?",
+    "Best time to visit Paris?",
+    "What should I pack for a beach trip?",
+    "Is Lisbon good for families?",
+    "How do refunds work?",
+    "Tips for traveling on a budget?",
+    "What is there to do in Rome in winter?",
+    "Do I need a visa for Japan?",
+]
+LAG_INTERVAL = 0.01
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        intent, _, weight = part.partition("=")
+        weights[intent.strip()] = float(weight)
+    return weights
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def summarize(values: List[float]) -> dict:
+    """Millisecond summary of durations given in seconds"""
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values) * 1000, 3),
+        "p50": round(percentile(values, 50) * 1000, 3),
+        "p95": round(percentile(values, 95) * 1000, 3),
+        "p99": round(percentile(values, 99) * 1000, 3),
+        "max": round(max(values) * 1000, 3),
+    }
+
+
+def plan_requests(args, documents: Dict[str, List[dict]], count: int) -> List[tuple]:
+    """(intent, payload) pairs drawn from the mix with a fixed seed"""
+    rng = random.Random(args.seed)
+    weights = parse_mix(args.mix)
+    intents = list(weights)
+    users = documents["users"]
+    owners = [u for u in users if u["user_type"] == "owner"] or users
+
+    def context(user):
+        return {
+            "email": user["email"],
+            "name": user["name"],
+            "user_type": user["user_type"],
+        }
+
+    planned = []
+    for intent in rng.choices(intents, [weights[i] for i in intents], k=count):
+        if intent == "search":
+            city = rng.choice(CITIES)[0]
+            message = rng.choice(
+                [
+                    f"Find properties in {city}",
+                    f"Show me properties in {city} under ${rng.randrange(100, 400)}",
+                    f"Search {rng.randint(1, 4)} bedroom places in {city}",
+                    f"Find a property with pool in {city}",
+                    "Find a quiet cabin close to the ski slopes",
+                ]
+            )
+            payload = {"message": message}
+        elif intent == "bookings":
+            payload = {
+                "message": "Show my bookings",
+                "user_context": context(rng.choice(users)),
+            }
+        elif intent == "favorites":
+            payload = {
+                "message": "Show my favorites",
+                "user_context": context(rng.choice(users)),
+            }
+        elif intent == "my_properties":
+            payload = {
+                "message": "Show my properties",
+                "user_context": context(rng.choice(owners)),
+            }
+        else:
+            payload = {
+                "message": rng.choice(GENERAL_QUESTIONS),
+                "use_cache": not args.no_cache,
+            }
+        planned.append((intent, payload))
+    return planned
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class BackgroundServer:
+    """uvicorn server running on its own thread and event loop"""
+
+    def __init__(self, app, port: int):
+        config = uvicorn.Config(
+            app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"
+        )
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+def seed_mongo(args, documents: Dict[str, List[dict]]):
+    """Replace the benchmark database's collections with the seeded documents"""
+    from pymongo import MongoClient
+
+    client = MongoClient(host=args.mongo_host, port=args.mongo_port)
+    database = client[args.db_name]
+    for name, docs in documents.items():
+        database.drop_collection(name)
+        if docs:
+            database[name].insert_many(docs, ordered=False)
+    client.close()
+
+
+async def drive(base_url: str, planned: List[tuple], concurrency: int, timeout: float):
+    """Send the planned requests with a fixed number of concurrent clients"""
+    results = []
+    queue = iter(planned)
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=timeout
+    ) as client:
+
+        async def worker():
+            for intent, payload in queue:
+                started = time.perf_counter()
+                try:
+                    response = await client.post("/chat", json=payload)
+                    status = response.status_code
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                results.append((intent, status, time.perf_counter() - started))
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results
+
+
+async def monitor_loop_lag(samples: List[float]):
+    """Record how late the service's event loop wakes up from short sleeps"""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(LAG_INTERVAL)
+        samples.append(max(0.0, loop.time() - started - LAG_INTERVAL))
+
+
+async def run_service(args, main, planned: List[tuple]) -> dict:
+    port = free_port()
+    config = uvicorn.Config(
+        main.app, host="127.0.0.1", port=port, log_level="warning", lifespan="on"
+    )
+    server = uvicorn.Server(config)
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    base_url = f"http://127.0.0.1:{port}"
+    warmup, measured = planned[: args.warmup], planned[args.warmup :]
+
+    def load(requests: List[tuple]):
+        return asyncio.run(drive(base_url, requests, args.concurrency, args.timeout))
+
+    if warmup:
+        await asyncio.to_thread(load, warmup)
+
+    lag_samples: List[float] = []
+    lag_task = asyncio.create_task(monitor_loop_lag(lag_samples))
+    started = time.perf_counter()
+    results = await asyncio.to_thread(load, measured)
+    duration = time.perf_counter() - started
+    lag_task.cancel()
+
+    server.should_exit = True
+    await serving
+    return report(args, results, duration, lag_samples)
+
+
+def report(args, results: List[tuple], duration: float, lag_samples) -> dict:
+    by_intent = defaultdict(list)
+    statuses = defaultdict(int)
+    latencies = []
+    for intent, status, elapsed in results:
+        statuses[str(status)] += 1
+        if status == 200:
+            latencies.append(elapsed)
+            by_intent[intent].append(elapsed)
+
+    return {
+        "config": {
+            "backend": "mongo" if args.mongo_host else "fake",
+            "properties": args.properties,
+            "users": args.users,
+            "bookings": args.bookings,
+            "favorites": args.favorites,
+            "mongo_latency_ms": args.mongo_latency * 1000,
+            "ollama_first_token_ms": args.ollama_latency * 1000,
+            "ollama_tokens_per_second": args.token_rate,
+            "ollama_tokens": args.tokens,
+            "concurrency": args.concurrency,
+            "requests": len(results),
+            "warmup": args.warmup,
+            "mix": parse_mix(args.mix),
+            "use_cache": not args.no_cache,
+            "semantic_search": args.semantic,
+            "seed": args.seed,
+            "python": platform.python_version(),
+        },
+        "duration_seconds": round(duration, 3),
+        "throughput_rps": round(len(latencies) / duration, 2) if duration else 0.0,
+        "errors": len(results) - len(latencies),
+        "status_codes": dict(statuses),
+        "latency_ms": summarize(latencies),
+        "latency_ms_by_intent": {
+            intent: summarize(values) for intent, values in sorted(by_intent.items())
+        },
+        "event_loop_lag_ms": summarize(lag_samples),
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--properties", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--bookings", type=int, default=5000)
+    parser.add_argument("--favorites", type=int, default=3000)
+    parser.add_argument(
+        "--mongo-latency",
+        type=float,
+        default=0.002,
+        help="Seconds added to every fake Mongo round trip",
+    )
+    parser.add_argument(
+        "--mongo-host", help="Seed and use a local MongoDB instead of the fake"
+    )
+    parser.add_argument("--mongo-port", type=int, default=27017)
+    parser.add_argument(
+        "--db-name",
+        default="airbnb_benchmark",
+        help="Database to (re)seed when --mongo-host is set",
+    )
+    parser.add_argument(
+        "--ollama-latency",
+        type=float,
+        default=0.2,
+        help="Fake Ollama time to first token in seconds",
+    )
+    parser.add_argument("--token-rate", type=float, default=50.0)
+    parser.add_argument("--tokens", type=int, default=30)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument(
+        "--semantic", action="store_true", help="Enable the semantic search path"
+    )
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report here too")
+    args = parser.parse_args()
+
+    documents = seed_documents(
+        args.properties, args.users, args.bookings, args.favorites, args.seed
+    )
+
+    ollama_port = free_port()
+    ollama = BackgroundServer(
+        fake_ollama_app(args.ollama_latency, args.token_rate, args.tokens), ollama_port
+    )
+    ollama.start()
+
+    # The service reads its configuration at import time
+    os.environ["OLLAMA_HOST"] = "127.0.0.1"
+    os.environ["OLLAMA_PORT"] = str(ollama_port)
+    os.environ["SEMANTIC_SEARCH_ENABLED"] = "true" if args.semantic else "false"
+    if args.mongo_host:
+        seed_mongo(args, documents)
+        os.environ["DB_HOST"] = args.mongo_host
+        os.environ["DB_PORT"] = str(args.mongo_port)
+        os.environ["DB_NAME"] = args.db_name
+    else:
+        # The fake has no indexes, explain() or change streams to maintain
+        os.environ["INDEX_BOOTSTRAP_ENABLED"] = "false"
+        os.environ["PROPERTY_INDEX_ENABLED"] = "false"
+
+    # Keep the service's print() logging out of the JSON on stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        import main
+
+        if not args.mongo_host:
+            main.db = FakeDatabase(documents, latency=args.mongo_latency)
+
+        planned = plan_requests(args, documents, args.warmup + args.requests)
+        try:
+            result = asyncio.run(run_service(args, main, planned))
+        finally:
+            ollama.stop()
+
+    output = json.dumps(result, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    return 0 if result["errors"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
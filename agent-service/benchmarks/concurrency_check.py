@@ -0,0 +1,189 @@
+"""Check that one slow query doesn't hold up other conversations on a worker.
+
+Seeds a fake database whose bookings collection answers only after --delay
+seconds, while every other collection answers after --latency. A "show my
+bookings" /chat request is started, and once it is waiting on the slow query
+a property search is sent on the same event loop. The search should come
+back long before the bookings do: the run exits 1 if it takes more than
+--max-fast-fraction of the delay, or if it finishes after the bookings.
+The report is JSON, like the other benchmarks'.
+
+    python -m benchmarks.concurrency_check
+    python -m benchmarks.concurrency_check --delay 2 --latency 0.01
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.fakes import FakeCollection, FakeDatabase, seed_documents
+
+# The fake has no indexes, explain() or change streams to maintain
+os.environ.setdefault("INDEX_BOOTSTRAP_ENABLED", "false")
+os.environ.setdefault("PROPERTY_INDEX_ENABLED", "false")
+os.environ.setdefault("SEMANTIC_SEARCH_ENABLED", "false")
+
+SLOW_MESSAGE = "Show my bookings"
+FAST_MESSAGE = "Find properties in Paris"
+
+
+class DelayedCollection(FakeCollection):
+    """FakeCollection whose queries wait an extra delay on top of the latency"""
+
+    def __init__(self, collection: FakeCollection, delay: float):
+        super().__init__(
+            collection.database, collection.name, collection.docs, collection._indexed
+        )
+        self.delay = delay
+
+    def find(self, query: dict = None, projection: dict = None, **kwargs):
+        cursor = super().find(query, projection, **kwargs)
+        cursor._latency += self.delay
+        return cursor
+
+    async def aggregate(self, pipeline: list, **kwargs):
+        cursor = await super().aggregate(pipeline, **kwargs)
+        cursor._latency += self.delay
+        return cursor
+
+
+class DelayedDatabase(FakeDatabase):
+    """FakeDatabase with a per-collection delay instead of one global latency"""
+
+    def __init__(
+        self,
+        collections: Dict[str, List[dict]],
+        delays: Dict[str, float],
+        latency: float = 0.0,
+    ):
+        super().__init__(collections, latency)
+        for name, delay in delays.items():
+            self._collections[name] = DelayedCollection(self[name], delay)
+
+
+async def timed_chat(client: httpx.AsyncClient, payload: dict, started: float):
+    """Status and seconds from the shared start until the response arrived"""
+    response = await client.post("/chat", json=payload)
+    return response.status_code, time.perf_counter() - started
+
+
+async def run(args) -> dict:
+    import main
+
+    documents = seed_documents(args.properties, args.users, args.bookings, 0, args.seed)
+    main.db = DelayedDatabase(documents, {"bookings": args.delay}, args.latency)
+    user = documents["users"][0]
+    slow_payload = {
+        "message": SLOW_MESSAGE,
+        "user_context": {"email": user["email"], "user_type": user["user_type"]},
+    }
+    fast_payload = {"message": FAST_MESSAGE}
+
+    transport = httpx.ASGITransport(main.app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://agent", timeout=args.delay * 10
+    ) as client:
+        # Warm up the search path so the measured one doesn't pay for first use
+        await client.post("/chat", json=fast_payload)
+        started = time.perf_counter()
+        slow = asyncio.create_task(timed_chat(client, slow_payload, started))
+        # Let the bookings request reach its slow query first
+        await asyncio.sleep(args.head_start)
+        fast_status, fast_finished = await timed_chat(client, fast_payload, started)
+        slow_in_flight = not slow.done()
+        slow_status, slow_finished = await slow
+
+    fast_seconds = fast_finished - args.head_start
+    failures = []
+    if fast_status != 200 or slow_status != 200:
+        failures.append(f"status codes: search {fast_status}, bookings {slow_status}")
+    if not slow_in_flight:
+        failures.append("the bookings request finished before the search did")
+    if slow_finished < args.delay:
+        failures.append(
+            f"the bookings request took {slow_finished:.3f}s, "
+            f"less than the {args.delay}s delay"
+        )
+    if fast_seconds > args.delay * args.max_fast_fraction:
+        failures.append(
+            f"the search took {fast_seconds:.3f}s while the bookings query "
+            f"was in flight (allowed {args.delay * args.max_fast_fraction:.3f}s)"
+        )
+
+    return {
+        "config": {
+            "properties": args.properties,
+            "users": args.users,
+            "bookings": args.bookings,
+            "delay": args.delay,
+            "latency": args.latency,
+            "head_start": args.head_start,
+            "max_fast_fraction": args.max_fast_fraction,
+            "seed": args.seed,
+        },
+        "search": {"status": fast_status, "seconds": round(fast_seconds, 4)},
+        "bookings": {
+            "status": slow_status,
+            "seconds": round(slow_finished, 4),
+            "in_flight_when_search_finished": slow_in_flight,
+        },
+        "failures": failures,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--properties", type=int, default=500)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--bookings", type=int, default=500)
+    parser.add_argument(
+        "--delay",
+        type=float,
+        default=1.0,
+        help="Seconds every bookings query waits",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.005,
+        help="Seconds every other query waits",
+    )
+    parser.add_argument(
+        "--head-start",
+        type=float,
+        default=0.05,
+        help="Seconds between starting the bookings request and the search",
+    )
+    parser.add_argument(
+        "--max-fast-fraction",
+        type=float,
+        default=0.25,
+        help="Longest allowed search time, as a fraction of the delay",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report here too")
+    args = parser.parse_args()
+
+    # Keep the service's print() logging out of the JSON on stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        result = asyncio.run(run(args))
+
+    output = json.dumps(result, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    for failure in result["failures"]:
+        print(f"❌ {failure}", file=sys.stderr)
+    return 1 if result["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
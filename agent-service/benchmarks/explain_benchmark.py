@@ -0,0 +1,201 @@
+"""explain("executionStats") regression check for the joined history pages.
+
+For each history size, seeds a throwaway database on a local MongoDB with one
+user who has that many bookings and favorites, creates the helper indexes,
+and explains the first and next page of favorites_pipeline and
+bookings_pipeline. The work a page does should depend on the page size, not
+on how long the user's history is: the run exits 1 if documents or index
+keys examined at the largest history exceed those at the smallest by more
+than --tolerance, or if any plan scans a whole collection. The report is
+JSON, like the other benchmarks'.
+
+    python -m benchmarks.explain_benchmark
+    python -m benchmarks.explain_benchmark --histories 50,500,5000 --tolerance 0
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import sys
+from typing import Dict, List
+
+from pymongo import AsyncMongoClient
+
+from app.indexes import index_bootstrapper, plan_has_collscan
+from app.queries import (
+    BOOKINGS_LIMIT,
+    FAVORITES_LIMIT,
+    bookings_pipeline,
+    favorites_pipeline,
+)
+from benchmarks.fakes import seed_documents
+
+
+def examined(explain) -> Dict[str, int]:
+    """Documents and index keys examined, summed over every stage and join"""
+    totals = {"docs": 0, "keys": 0}
+
+    def walk(node):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key == "totalDocsExamined":
+                    totals["docs"] += value
+                elif key == "totalKeysExamined":
+                    totals["keys"] += value
+                else:
+                    walk(value)
+        elif isinstance(node, list):
+            for item in node:
+                walk(item)
+
+    walk(explain)
+    return totals
+
+
+def next_page_position(docs: List[dict], sort_field: str, limit: int):
+    """Keyset position after the first page, as the helpers would send it"""
+    ordered = sorted(docs, key=lambda d: (d[sort_field], d["_id"]), reverse=True)
+    if len(ordered) <= limit:
+        return None
+    last = ordered[limit - 1]
+    return (last[sort_field], last["_id"])
+
+
+def pipelines(documents: Dict[str, List[dict]]) -> Dict[str, tuple]:
+    """(collection, pipeline) for each page the chat helpers fetch"""
+    user_id = documents["users"][0]["_id"]
+    favorites_after = next_page_position(
+        documents["favorites"], "created_at", FAVORITES_LIMIT
+    )
+    bookings_after = next_page_position(
+        documents["bookings"], "booking_date", BOOKINGS_LIMIT
+    )
+    return {
+        "favorites": (
+            "favorites",
+            favorites_pipeline(user_id, None, FAVORITES_LIMIT + 1),
+        ),
+        "favorites (next page)": (
+            "favorites",
+            favorites_pipeline(user_id, favorites_after, FAVORITES_LIMIT + 1),
+        ),
+        "bookings": ("bookings", bookings_pipeline(user_id, None, BOOKINGS_LIMIT + 1)),
+        "bookings (next page)": (
+            "bookings",
+            bookings_pipeline(user_id, bookings_after, BOOKINGS_LIMIT + 1),
+        ),
+    }
+
+
+async def explain_history(args, db, history: int) -> Dict[str, dict]:
+    """Seed one user with the given history and explain each page"""
+    # A single user owns every booking and favorite
+    documents = seed_documents(args.properties, 1, history, history, args.seed)
+    for name, docs in documents.items():
+        await db.drop_collection(name)
+        if docs:
+            await db[name].insert_many(docs, ordered=False)
+    await index_bootstrapper.ensure_indexes(db)
+
+    results = {}
+    for name, (collection, pipeline) in pipelines(documents).items():
+        explain = await db.command(
+            {
+                "explain": {
+                    "aggregate": collection,
+                    "pipeline": pipeline,
+                    "cursor": {},
+                },
+                "verbosity": "executionStats",
+            }
+        )
+        results[name] = {**examined(explain), "collscan": plan_has_collscan(explain)}
+    return results
+
+
+async def run(args) -> dict:
+    histories = sorted(int(size) for size in args.histories.split(","))
+    client = AsyncMongoClient(host=args.mongo_host, port=args.mongo_port)
+    db = client[args.db_name]
+    try:
+        by_history = {}
+        for history in histories:
+            by_history[history] = await explain_history(args, db, history)
+    finally:
+        await client.drop_database(args.db_name)
+        await client.close()
+
+    smallest, largest = by_history[histories[0]], by_history[histories[-1]]
+    failures = [
+        f"{name}: COLLSCAN with {history} bookings/favorites"
+        for history in histories
+        for name, result in by_history[history].items()
+        if result["collscan"]
+    ]
+    for name in smallest:
+        for measure in ("docs", "keys"):
+            allowed = smallest[name][measure] * (1 + args.tolerance)
+            if largest[name][measure] > allowed:
+                failures.append(
+                    f"{name}: {measure} examined grew from "
+                    f"{smallest[name][measure]} to {largest[name][measure]}"
+                )
+
+    return {
+        "config": {
+            "mongo_host": args.mongo_host,
+            "properties": args.properties,
+            "histories": histories,
+            "tolerance": args.tolerance,
+            "seed": args.seed,
+        },
+        "examined": {
+            name: {history: by_history[history][name] for history in histories}
+            for name in smallest
+        },
+        "failures": failures,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo-host", default="localhost")
+    parser.add_argument("--mongo-port", type=int, default=27017)
+    parser.add_argument(
+        "--db-name",
+        default="airbnb_explain",
+        help="Throwaway database; dropped when the run ends",
+    )
+    parser.add_argument("--properties", type=int, default=2000)
+    parser.add_argument(
+        "--histories",
+        default="50,500,5000",
+        help="Comma-separated bookings/favorites per user to compare",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="Allowed growth in examined counts, as a fraction",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report here too")
+    args = parser.parse_args()
+
+    # Keep the index bootstrapper's print() logging out of the JSON on stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        result = asyncio.run(run(args))
+
+    output = json.dumps(result, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    for failure in result["failures"]:
+        print(f"❌ {failure}", file=sys.stderr)
+    return 1 if result["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,548 @@
+"""Stand-ins for MongoDB and Ollama used by the benchmark harness.
+
+FakeDatabase answers the subset of the pymongo async API the agent service
+uses (find/find_one/aggregate with the filters and pipelines in app.queries),
+with a configurable per-round-trip latency. Queries are evaluated in a
+worker thread, which still competes with the service for the GIL, so
+absolute numbers are only comparable between runs against the same backend.
+
+fake_ollama_app() is a FastAPI app speaking enough of the Ollama HTTP API,
+with a configurable time to first token and token rate. Its /api/embed
+returns hashed bag-of-words vectors, so texts that share words score as
+similar.
+"""
+
+import asyncio
+import json
+import random
+import re
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from bson.objectid import ObjectId
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+CITIES = [
+    ("Paris", "France"),
+    ("Lisbon", "Portugal"),
+    ("Rome", "Italy"),
+    ("Barcelona", "Spain"),
+    ("New York", "USA"),
+    ("San Jose", "USA"),
+    ("Tokyo", "Japan"),
+    ("Berlin", "Germany"),
+    ("London", "UK"),
+    ("Sydney", "Australia"),
+]
+DESCRIPTIONS = [
+    "A quiet retreat close to the ski slopes",
+    "Steps from the beach with ocean views",
+    "A family home near parks and playgrounds",
+    "A stylish base in the heart of the old town",
+    "A romantic hideaway with a fireplace",
+    "A remote workspace with fast internet",
+]
+PROPERTY_TYPES = ["apartment", "house", "villa", "cabin", "studio", "loft"]
+AMENITY_POOL = [
+    "WiFi",
+    "Pool",
+    "Parking",
+    "Kitchen",
+    "Gym",
+    "Beach Access",
+    "Balcony",
+    "AC",
+    "Garden",
+]
+# The booking service's status enum
+BOOKING_STATUSES = ["ACCEPTED", "ACCEPTED", "ACCEPTED", "PENDING", "CANCELLED"]
+
+
+# Documents
+def seed_documents(
+    properties: int, users: int, bookings: int, favorites: int, seed: int = 42
+) -> Dict[str, List[dict]]:
+    """Deterministic users/properties/bookings/favorites shaped like the real ones"""
+    rng = random.Random(seed)
+    now = datetime(2025, 1, 1)
+
+    def new_id() -> ObjectId:
+        return ObjectId(rng.getrandbits(96).to_bytes(12, "big"))
+
+    user_docs = []
+    for i in range(users):
+        user_type = "owner" if i % 5 == 0 else "traveler"
+        user_docs.append(
+            {
+                "_id": new_id(),
+                "email": f"user{i}@example.com",
+                "name": f"User {i}",
+                "user_type": user_type,
+            }
+        )
+    owners = [u["_id"] for u in user_docs if u["user_type"] == "owner"] or [new_id()]
+
+    property_docs = []
+    for i in range(properties):
+        city, country = rng.choice(CITIES)
+        created_at = now - timedelta(minutes=rng.randrange(0, 525600))
+        property_docs.append(
+            {
+                "_id": new_id(),
+                "owner_id": rng.choice(owners),
+                "property_name": f"{rng.choice(['Cozy', 'Sunny', 'Modern', 'Quiet'])} "
+                f"{rng.choice(PROPERTY_TYPES).title()} {i}",
+                "city": city,
+                "country": country,
+                "price_per_night": rng.randrange(40, 600),
+                "bedrooms": rng.randint(1, 5),
+                "bathrooms": rng.randint(1, 3),
+                "property_type": rng.choice(PROPERTY_TYPES),
+                "amenities": rng.sample(AMENITY_POOL, rng.randint(1, 5)),
+                "description": f"{DESCRIPTIONS[i % len(DESCRIPTIONS)]} in {city}.",
+                "is_available": rng.random() < 0.9,
+                "created_at": created_at,
+                "updatedAt": created_at,
+            }
+        )
+
+    booking_docs = []
+    for _ in range(bookings):
+        prop = rng.choice(property_docs)
+        check_in = now + timedelta(days=rng.randrange(-180, 180))
+        nights = rng.randint(1, 10)
+        booking_docs.append(
+            {
+                "_id": new_id(),
+                "traveler_id": rng.choice(user_docs)["_id"],
+                "property_id": prop["_id"],
+                "owner_id": prop["owner_id"],
+                "check_in_date": check_in,
+                "check_out_date": check_in + timedelta(days=nights),
+                "num_guests": rng.randint(1, 6),
+                "total_price": prop["price_per_night"] * nights,
+                "status": rng.choice(BOOKING_STATUSES),
+                "booking_date": check_in - timedelta(days=rng.randrange(1, 90)),
+            }
+        )
+        booking_docs[-1]["updated_at"] = booking_docs[-1]["booking_date"]
+
+    favorite_docs = []
+    for _ in range(favorites):
+        favorite_docs.append(
+            {
+                "_id": new_id(),
+                "user_id": rng.choice(user_docs)["_id"],
+                "property_id": rng.choice(property_docs)["_id"],
+                "created_at": now - timedelta(minutes=rng.randrange(0, 525600)),
+            }
+        )
+
+    return {
+        "users": user_docs,
+        "properties": property_docs,
+        "bookings": booking_docs,
+        "favorites": favorite_docs,
+    }
+
+
+# Query evaluation
+def _get(doc, path: str):
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _compare(value, op: str, operand) -> bool:
+    if op == "$regex":
+        return isinstance(value, str) and operand.search(value) is not None
+    if op == "$eq":
+        return value == operand
+    if op == "$ne":
+        return value != operand
+    if op == "$in":
+        return value in operand
+    if op == "$nin":
+        return value not in operand
+    if value is None or operand is None:
+        return False
+    try:
+        if op == "$lt":
+            return value < operand
+        if op == "$lte":
+            return value <= operand
+        if op == "$gt":
+            return value > operand
+        if op == "$gte":
+            return value >= operand
+    except TypeError:
+        return False
+    raise NotImplementedError(f"Unsupported operator {op}")
+
+
+def _match_value(value, condition) -> bool:
+    if isinstance(condition, dict) and any(k.startswith("$") for k in condition):
+        if "$exists" in condition:
+            if (value is not None) != bool(condition["$exists"]):
+                return False
+        candidates = value if isinstance(value, list) else [value]
+        for op, operand in condition.items():
+            if op in ("$exists", "$options"):
+                continue
+            if op in ("$ne", "$nin"):
+                # Negations hold only when no element matches
+                positive = "$eq" if op == "$ne" else "$in"
+                if any(_compare(c, positive, operand) for c in candidates):
+                    return False
+            elif not any(_compare(c, op, operand) for c in candidates):
+                return False
+        return True
+    if isinstance(value, list) and not isinstance(condition, list):
+        return condition in value
+    return value == condition
+
+
+def compile_query(query):
+    """Copy of a filter with its $regex patterns compiled once"""
+    if isinstance(query, list):
+        return [compile_query(item) for item in query]
+    if not isinstance(query, dict):
+        return query
+    compiled = {key: compile_query(value) for key, value in query.items()}
+    if isinstance(compiled.get("$regex"), str):
+        flags = re.IGNORECASE if "i" in compiled.get("$options", "") else 0
+        compiled["$regex"] = re.compile(compiled["$regex"], flags)
+    return compiled
+
+
+def matches(doc: dict, query: dict, variables: dict = None) -> bool:
+    """Whether a document satisfies a find() filter or $match stage"""
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, sub, variables) for sub in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, sub, variables) for sub in condition):
+                return False
+        elif key == "$expr":
+            if not _evaluate(doc, condition, variables):
+                return False
+        elif not _match_value(_get(doc, key), condition):
+            return False
+    return True
+
+
+def _evaluate(doc: dict, expression, variables: dict = None):
+    """Aggregation expressions: field paths, $$variables and simple operators"""
+    variables = variables or {}
+    if isinstance(expression, str):
+        if expression.startswith("$$"):
+            name, _, path = expression[2:].partition(".")
+            value = variables.get(name)
+            return _get(value, path) if path else value
+        if expression.startswith("$"):
+            return _get(doc, expression[1:])
+        return expression
+    if isinstance(expression, dict) and len(expression) == 1:
+        op, args = next(iter(expression.items()))
+        if op.startswith("$"):
+            if op == "$and":
+                return all(_evaluate(doc, arg, variables) for arg in args)
+            if op == "$or":
+                return any(_evaluate(doc, arg, variables) for arg in args)
+            left, right = (_evaluate(doc, arg, variables) for arg in args)
+            if op == "$in":
+                return left in (right or [])
+            return _compare(left, op, right)
+    if isinstance(expression, dict):
+        return {k: _evaluate(doc, v, variables) for k, v in expression.items()}
+    return expression
+
+
+def project(doc: dict, spec: dict, variables: dict = None) -> dict:
+    """Apply an inclusion/exclusion projection or a $project stage"""
+    if not spec:
+        return dict(doc)
+    excluded = {k for k, v in spec.items() if v == 0 or v is False}
+    included = {k: v for k, v in spec.items() if k not in excluded}
+    if not included:
+        return {k: v for k, v in doc.items() if k not in excluded}
+
+    result = {} if "_id" in excluded else {"_id": doc.get("_id")}
+    for key, value in included.items():
+        if value == 1 or value is True:
+            field = _get(doc, key)
+            if field is not None:
+                result[key] = field
+        else:
+            result[key] = _evaluate(doc, value, variables)
+    if "_id" in result and result["_id"] is None and "_id" not in included:
+        del result["_id"]
+    return result
+
+
+def sort_documents(docs: List[dict], spec) -> List[dict]:
+    items = spec.items() if isinstance(spec, dict) else spec
+    for key, direction in reversed(list(items)):
+        present = [d for d in docs if _get(d, key) is not None]
+        missing = [d for d in docs if _get(d, key) is None]
+        present.sort(key=lambda d: _get(d, key), reverse=direction < 0)
+        docs = present + missing if direction < 0 else missing + present
+    return docs
+
+
+class FakeCursor:
+    def __init__(self, produce, latency: float):
+        self._produce = produce
+        self._latency = latency
+        self._sort = None
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key_or_list, direction=None):
+        if direction is not None:
+            key_or_list = [(key_or_list, direction)]
+        self._sort = key_or_list
+        return self
+
+    def skip(self, count: int):
+        self._skip = count
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    def batch_size(self, size: int):
+        return self
+
+    async def to_list(self, length=None):
+        await asyncio.sleep(self._latency)
+        # Evaluated off the event loop, as a real server would
+        docs = await asyncio.to_thread(self._produce)
+        if self._sort:
+            docs = sort_documents(docs, self._sort)
+        docs = docs[self._skip :]
+        if self._limit:
+            docs = docs[: self._limit]
+        if length:
+            docs = docs[:length]
+        return docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in await self.to_list():
+            yield doc
+
+
+class FakeCollection:
+    """In-memory collection with hash indexes on equality-filtered fields"""
+
+    def __init__(self, database, name: str, docs=(), indexed=("_id",)):
+        self.database = database
+        self.name = name
+        self.docs = list(docs)
+        self._indexed = set(indexed)
+        self._indexes = {}
+
+    def _candidates(self, query: dict) -> List[dict]:
+        for key, condition in query.items():
+            if key in self._indexed and not isinstance(condition, (dict, list)):
+                index = self._indexes.get(key)
+                if index is None:
+                    index = self._indexes[key] = {}
+                    for doc in self.docs:
+                        index.setdefault(doc.get(key), []).append(doc)
+                return index.get(condition, [])
+        return self.docs
+
+    def _find(self, query: dict) -> List[dict]:
+        query = compile_query(query or {})
+        return [doc for doc in self._candidates(query) if matches(doc, query)]
+
+    def find(self, query: dict = None, projection: dict = None, **kwargs):
+        def produce():
+            return [project(doc, projection) for doc in self._find(query)]
+
+        return FakeCursor(produce, self.database.latency)
+
+    async def find_one(self, query: dict = None, projection: dict = None, **kwargs):
+        docs = await self.find(query, projection).limit(1).to_list()
+        return docs[0] if docs else None
+
+    async def aggregate(self, pipeline: list, **kwargs):
+        return FakeCursor(lambda: self._run(pipeline), self.database.latency)
+
+    def _run(self, pipeline: list, docs: List[dict] = None, variables=None):
+        if docs is None:
+            if pipeline and "$match" in pipeline[0]:
+                docs = self._find(pipeline[0]["$match"])
+                pipeline = pipeline[1:]
+            else:
+                docs = list(self.docs)
+        for stage in pipeline:
+            ((name, spec),) = stage.items()
+            if name == "$match":
+                spec = compile_query(spec)
+                docs = [d for d in docs if matches(d, spec, variables)]
+            elif name == "$sort":
+                docs = sort_documents(docs, spec)
+            elif name == "$skip":
+                docs = docs[spec:]
+            elif name == "$limit":
+                docs = docs[:spec]
+            elif name == "$project":
+                docs = [project(d, spec, variables) for d in docs]
+            elif name == "$unwind":
+                path = spec if isinstance(spec, str) else spec["path"]
+                keep = isinstance(spec, dict) and spec.get("preserveNullAndEmptyArrays")
+                field = path[1:]
+                unwound = []
+                for d in docs:
+                    items = _get(d, field) or []
+                    if items:
+                        unwound.extend({**d, field: item} for item in items)
+                    elif keep:
+                        unwound.append({k: v for k, v in d.items() if k != field})
+                docs = unwound
+            elif name == "$lookup":
+                docs = [self._lookup(d, spec) for d in docs]
+            elif name == "$facet":
+                docs = [
+                    {
+                        key: self._run(sub, list(docs), variables)
+                        for key, sub in spec.items()
+                    }
+                ]
+            else:
+                raise NotImplementedError(f"Unsupported stage {name}")
+        return docs
+
+    def _lookup(self, doc: dict, spec: dict) -> dict:
+        foreign = self.database[spec["from"]]
+        if "localField" in spec:
+            query = {spec["foreignField"]: _get(doc, spec["localField"])}
+            joined = foreign._find(query)
+        else:
+            joined = list(foreign.docs)
+        if "pipeline" in spec:
+            variables = {
+                name: _evaluate(doc, expression)
+                for name, expression in spec.get("let", {}).items()
+            }
+            joined = foreign._run(spec["pipeline"], joined, variables)
+        return {**doc, spec["as"]: joined}
+
+    async def create_index(self, keys, **kwargs):
+        return "_".join(f"{k}_{d}" for k, d in keys)
+
+
+class FakeDatabase:
+    def __init__(self, collections: Dict[str, List[dict]], latency: float = 0.0):
+        self.latency = latency
+        self._collections = {}
+        indexed = {
+            "users": ("_id", "email"),
+            "properties": ("_id", "owner_id"),
+            "bookings": ("_id", "traveler_id"),
+            "favorites": ("_id", "user_id"),
+        }
+        for name, docs in collections.items():
+            self._collections[name] = FakeCollection(
+                self, name, docs, indexed.get(name, ("_id",))
+            )
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(self, name)
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> FakeCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+
+# Ollama
+EMBEDDING_DIMENSIONS = 256
+FAKE_WORDS = ["Sure", ",", " here", " are", " some", " travel", " ideas", "."]
+
+
+def fake_embedding(text: str, dimensions: int = EMBEDDING_DIMENSIONS) -> List[float]:
+    """Hashed bag of words, so texts sharing words get similar vectors"""
+    vector = [0.0] * dimensions
+    for word in re.findall(r"[a-z]+", text.lower()):
+        vector[zlib.crc32(word.encode("utf-8")) % dimensions] += 1.0
+    return vector
+
+
+def fake_ollama_app(
+    first_token_latency: float = 0.2, tokens_per_second: float = 50.0, tokens: int = 30
+) -> FastAPI:
+    """Ollama stand-in with a fixed time to first token and generation rate"""
+    app = FastAPI()
+    token_interval = 1.0 / tokens_per_second
+    eval_duration = int(tokens * token_interval * 1e9)
+
+    def final_chunk(body: dict, response: str) -> dict:
+        context = list(body.get("context") or []) + list(range(tokens))
+        return {
+            "model": body.get("model"),
+            "response": response,
+            "done": True,
+            "context": context,
+            "eval_count": tokens,
+            "eval_duration": eval_duration,
+        }
+
+    loaded = set()
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": "llama3.2:1b"}]}
+
+    @app.get("/api/ps")
+    async def running():
+        return {"models": [{"name": name} for name in sorted(loaded)]}
+
+    @app.post("/api/embed")
+    async def embed(request: Request):
+        body = await request.json()
+        inputs = body["input"]
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        return {
+            "model": body.get("model"),
+            "embeddings": [fake_embedding(text) for text in inputs],
+        }
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        loaded.add(body.get("model"))
+        if "prompt" not in body:
+            # Load-only request, as sent by the model warm-up
+            return {"model": body.get("model"), "done": True, "done_reason": "load"}
+        words = [FAKE_WORDS[i % len(FAKE_WORDS)] for i in range(tokens)]
+
+        if not body.get("stream", True):
+            await asyncio.sleep(first_token_latency + tokens * token_interval)
+            return final_chunk(body, "".join(words))
+
+        async def chunks():
+            await asyncio.sleep(first_token_latency)
+            for word in words:
+                yield json.dumps({"response": word, "done": False}) + "\n"
+                await asyncio.sleep(token_interval)
+            yield json.dumps(final_chunk(body, "")) + "\n"
+
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    return app
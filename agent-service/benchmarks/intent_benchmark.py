@@ -0,0 +1,268 @@
+"""Golden-corpus check and micro-benchmark for the intent/entity engine.
+
+Compares app.intents.parse_message against the original scan-based routing
+and parameter extraction from main.py, kept below as the reference. The
+corpus holds the reference's answers with the fixes expected_parse() makes
+on purpose (whole-word amenities and location cues, property types as
+searches). The reference never parsed dates, so date ranges are checked against a separate,
+hand-written corpus with a fixed "today" that --regenerate leaves alone.
+
+    python -m benchmarks.intent_benchmark              # verify corpora, then time both
+    python -m benchmarks.intent_benchmark --regenerate # rebuild the corpus from the reference
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import timeit
+from datetime import date
+
+from app.intents import parse_message
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "intent_corpus.json")
+DATE_CORPUS_PATH = os.path.join(os.path.dirname(__file__), "date_corpus.json")
+
+
+# Reference implementation (the routing chain and extractors before app.intents)
+def legacy_intent(message: str):
+    message_lower = message.lower()
+    if any(phrase in message_lower for phrase in ["my propert", "my listing"]):
+        return "my_properties"
+    elif any(
+        phrase in message_lower for phrase in ["favorite", "favourite", "fav", "liked"]
+    ):
+        return "favorites"
+    elif any(
+        phrase in message_lower
+        for phrase in ["my booking", "my reservation", "my trip", "show booking"]
+    ):
+        return "bookings"
+    elif any(
+        word in message_lower
+        for word in [
+            "find",
+            "search",
+            "show",
+            "properties",
+            "property",
+            "hotel",
+            "accommodation",
+        ]
+    ):
+        return "search"
+    return None
+
+
+def legacy_extract_number(text: str, keywords: list) -> int:
+    text_lower = text.lower()
+    for keyword in keywords:
+        if keyword in text_lower:
+            pattern = rf"(\d+)\s*{keyword}|{keyword}\s*(\d+)"
+            match = re.search(pattern, text_lower)
+            if match:
+                num = match.group(1) or match.group(2)
+                return int(num)
+    return None
+
+
+def legacy_extract_search_params(message: str) -> dict:
+    message_lower = message.lower()
+    params = {}
+
+    bedrooms = legacy_extract_number(message, ["bedroom", "bed", "br"])
+    if bedrooms:
+        params["bedrooms"] = bedrooms
+
+    bathrooms = legacy_extract_number(message, ["bathroom", "bath", "ba"])
+    if bathrooms:
+        params["bathrooms"] = bathrooms
+
+    city_keywords = ["in", "near", "at", "around"]
+    for keyword in city_keywords:
+        if keyword + " " in message_lower:
+            parts = message_lower.split(keyword + " ")
+            if len(parts) > 1:
+                city_words = parts[1].strip().split()[:3]
+                stop_words = ["a", "the", "with", "and", "or", "property", "properties"]
+                city_words = [w for w in city_words if w not in stop_words]
+                if city_words:
+                    params["city"] = (
+                        " ".join(city_words).replace(",", "").replace(".", "")
+                    )
+                    break
+
+    if any(
+        word in message_lower
+        for word in ["under", "below", "less than", "max", "maximum"]
+    ):
+        price_match = re.search(r"\$?(\d+)", message_lower)
+        if price_match:
+            params["max_price"] = float(price_match.group(1))
+
+    amenities = [
+        "pool",
+        "wifi",
+        "parking",
+        "kitchen",
+        "gym",
+        "beach",
+        "balcony",
+        "ac",
+        "garden",
+    ]
+    for amenity in amenities:
+        if amenity in message_lower:
+            params["amenity"] = amenity
+            break
+
+    return params
+
+
+def legacy_parse(message: str):
+    return legacy_intent(message), legacy_extract_search_params(message)
+
+
+# Deliberate departures from the reference; the corpus is rebuilt with them
+LEGACY_AMENITIES = [
+    "pool",
+    "wifi",
+    "parking",
+    "kitchen",
+    "gym",
+    "beach",
+    "balcony",
+    "ac",
+    "garden",
+]
+LEGACY_PROPERTY_TYPES = [
+    "apartment",
+    "villa",
+    "cabin",
+    "chalet",
+    "cottage",
+    "bungalow",
+    "studio",
+    "loft",
+    "condo",
+]
+
+
+def expected_parse(message: str):
+    """The reference's answer with the fixes the engine makes on purpose"""
+    intent, params = legacy_parse(message)
+    message_lower = message.lower()
+    # A property type on its own asks for a search: "cozy cabin for a weekend"
+    if intent is None and re.search(
+        r"\b(?:" + "|".join(LEGACY_PROPERTY_TYPES) + r")s?\b", message_lower
+    ):
+        intent = "search"
+    # Location cues are whole words: the "in " of "cabin for" is no cue
+    params.pop("city", None)
+    for keyword in ["in", "near", "at", "around"]:
+        parts = re.split(rf"\b{keyword} ", message_lower)
+        if len(parts) > 1:
+            city_words = parts[1].strip().split()[:3]
+            stop_words = ["a", "the", "with", "and", "or", "property", "properties"]
+            city_words = [w for w in city_words if w not in stop_words]
+            if city_words:
+                params["city"] = " ".join(city_words).replace(",", "").replace(".", "")
+                break
+    # Amenities are whole words (plurals too): "place" doesn't ask for AC
+    params.pop("amenity", None)
+    amenities = re.findall(
+        r"\b(" + "|".join(LEGACY_AMENITIES) + r")(?:e?s)?\b", message_lower
+    )
+    if amenities:
+        params["amenity"] = min(amenities, key=LEGACY_AMENITIES.index)
+    # In the reference's key order, so a rebuilt corpus only shows real changes
+    order = ["bedrooms", "bathrooms", "city", "max_price", "amenity"]
+    return intent, {name: params[name] for name in order if name in params}
+
+
+def engine_parse(message: str, today: date = None):
+    parsed = parse_message(message, today)
+    return parsed.intent, parsed.search.as_dict()
+
+
+def load_corpus(path: str = CORPUS_PATH) -> list:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def regenerate():
+    messages = [case["message"] for case in load_corpus()]
+    corpus = []
+    for message in messages:
+        intent, params = expected_parse(message)
+        corpus.append({"message": message, "intent": intent, "params": params})
+    with open(CORPUS_PATH, "w", encoding="utf-8") as f:
+        json.dump(corpus, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    print(f"Wrote {len(corpus)} cases to {CORPUS_PATH}")
+
+
+def verify(corpus: list, name: str = "corpus") -> int:
+    failures = 0
+    for case in corpus:
+        today = date.fromisoformat(case["today"]) if "today" in case else None
+        intent, params = engine_parse(case["message"], today)
+        if intent != case["intent"] or params != case["params"]:
+            failures += 1
+            print(f"❌ {case['message']!r}")
+            print(f"   expected: {case['intent']} {case['params']}")
+            print(f"   got:      {intent} {params}")
+    print(f"{len(corpus) - failures}/{len(corpus)} {name} cases match")
+    return failures
+
+
+def benchmark(corpus: list, repeat: int, rounds: int):
+    messages = [case["message"] for case in corpus]
+    parsers = (("legacy", legacy_parse), ("engine", engine_parse))
+    best = {name: float("inf") for name, _ in parsers}
+    # Alternate the two within each round so load spikes hit both alike
+    for _ in range(rounds):
+        for name, parse in parsers:
+            elapsed = timeit.timeit(
+                lambda: [parse(message) for message in messages], number=repeat
+            )
+            best[name] = min(best[name], elapsed)
+    results = {
+        name: elapsed / (repeat * len(messages)) * 1e6 for name, elapsed in best.items()
+    }
+    print(
+        json.dumps(
+            {
+                "messages": len(messages),
+                "legacy_us_per_message": round(results["legacy"], 2),
+                "engine_us_per_message": round(results["engine"], 2),
+                "speedup": round(results["legacy"] / results["engine"], 2),
+            },
+            indent=2,
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--regenerate", action="store_true")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=15)
+    args = parser.parse_args()
+
+    if args.regenerate:
+        regenerate()
+        return 0
+
+    corpus = load_corpus()
+    failures = verify(corpus)
+    failures += verify(load_corpus(DATE_CORPUS_PATH), "date range")
+    if failures:
+        return 1
+    benchmark(corpus, args.repeat, args.rounds)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,361 @@
+"""Cold start and multi-worker scaling benchmark for the agent service.
+
+Times a bare `import main` in fresh interpreters, then, for each worker count,
+starts `uvicorn --workers N` in a subprocess, records how long it takes until
+/health answers, and drives /chat data intents from several client processes
+to measure throughput. Each worker gets its own seeded fake database and the
+fake Ollama server, so the numbers reflect the service's own CPU time. The
+report is JSON, like chat_benchmark's.
+
+The same measurements are taken on a baseline revision, by default the one
+before database clients moved out of import time, exported with `git
+archive` and run with this checkout's benchmarks/ so both arms share the
+harness and the fakes. Against this checkout the difference includes every
+later change too; --revision measures another revision in its place, so
+`--revision 3c7d08d` isolates the move itself.
+
+    python -m benchmarks.startup_benchmark
+    python -m benchmarks.startup_benchmark --workers 1,2,4,8 --requests 4000
+    python -m benchmarks.startup_benchmark --revision 3c7d08d
+    python -m benchmarks.startup_benchmark --baseline ""   # this tree only
+
+Scaling is only meaningful up to the number of cores; the report includes
+cpu_count so runs from different machines can be compared.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+import httpx
+
+from benchmarks.chat_benchmark import (
+    BackgroundServer,
+    drive,
+    free_port,
+    plan_requests,
+    summarize,
+)
+from benchmarks.fakes import FakeDatabase, fake_ollama_app, seed_documents
+
+# Data intents only: generations would measure the fake Ollama, not the workers
+DEFAULT_MIX = "search=0.5,bookings=0.2,favorites=0.2,my_properties=0.1"
+IMPORT_SNIPPET = (
+    "import time; started = time.perf_counter(); import main; "
+    "print(time.perf_counter() - started)"
+)
+READY_POLL_INTERVAL = 0.02
+# The last revision that created the database clients when main was imported
+DEFAULT_BASELINE = "3c7d08d^"
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def fake_app():
+    """uvicorn app factory: main.app on a freshly seeded fake database.
+
+    Called once in every worker, so each process seeds its own data.
+    """
+    import main
+
+    main.db = FakeDatabase(
+        seed_documents(
+            int(os.environ["STARTUP_BENCH_PROPERTIES"]),
+            int(os.environ["STARTUP_BENCH_USERS"]),
+            int(os.environ["STARTUP_BENCH_BOOKINGS"]),
+            int(os.environ["STARTUP_BENCH_FAVORITES"]),
+            int(os.environ["STARTUP_BENCH_SEED"]),
+        )
+    )
+    return main.app
+
+
+def service_env(args, ollama_port: int) -> dict:
+    """Environment for the service processes"""
+    env = dict(os.environ)
+    env.update(
+        {
+            "OLLAMA_HOST": "127.0.0.1",
+            "OLLAMA_PORT": str(ollama_port),
+            # The fake has no indexes, explain() or change streams to maintain
+            "INDEX_BOOTSTRAP_ENABLED": "false",
+            "PROPERTY_INDEX_ENABLED": "false",
+            "SEMANTIC_SEARCH_ENABLED": "false",
+            "STARTUP_BENCH_PROPERTIES": str(args.properties),
+            "STARTUP_BENCH_USERS": str(args.users),
+            "STARTUP_BENCH_BOOKINGS": str(args.bookings),
+            "STARTUP_BENCH_FAVORITES": str(args.favorites),
+            "STARTUP_BENCH_SEED": str(args.seed),
+        }
+    )
+    return env
+
+
+def export_revision(revision: str, destination: str) -> str:
+    """Check the service out at a revision, with this checkout's benchmarks"""
+    top = subprocess.run(
+        ["git", "rev-parse", "--show-toplevel", "--show-prefix"],
+        cwd=SERVICE_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.splitlines()
+    prefix = top[1] if len(top) > 1 else ""
+    # git archive has to run from the top level to take a tree-ish:path
+    archive = subprocess.run(
+        ["git", "archive", "--format=tar", f"{revision}:{prefix}"],
+        cwd=top[0],
+        capture_output=True,
+        check=True,
+    ).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(destination)
+    shutil.copytree(
+        os.path.join(SERVICE_DIR, "benchmarks"),
+        os.path.join(destination, "benchmarks"),
+        dirs_exist_ok=True,
+    )
+    return destination
+
+
+def time_imports(runs: int, env: dict, cwd: str) -> List[float]:
+    """Seconds to import main, each in a fresh interpreter"""
+    timings = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET],
+            cwd=cwd,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+def wait_until_ready(base_url: str, process, timeout: float):
+    """Block until /health answers 200"""
+    deadline = time.perf_counter() + timeout
+    with httpx.Client(base_url=base_url, timeout=1.0) as client:
+        while time.perf_counter() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"Service exited with code {process.returncode}")
+            with contextlib.suppress(httpx.HTTPError):
+                if client.get("/health").status_code == 200:
+                    return
+            time.sleep(READY_POLL_INTERVAL)
+    raise TimeoutError(f"Service not ready after {timeout}s")
+
+
+def load(base_url: str, planned: List[tuple], concurrency: int, timeout: float):
+    """One client process's share of the load"""
+    return asyncio.run(drive(base_url, planned, concurrency, timeout))
+
+
+def run_workers(args, workers: int, env: dict, planned: List[tuple], cwd: str) -> dict:
+    """Start the service with the given worker count, then time the load"""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    command = [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "benchmarks.startup_benchmark:fake_app",
+        "--factory",
+        "--host",
+        "127.0.0.1",
+        "--port",
+        str(port),
+        "--workers",
+        str(workers),
+        "--log-level",
+        "warning",
+    ]
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        command,
+        cwd=cwd,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_ready(base_url, process, args.ready_timeout)
+        ready_seconds = time.perf_counter() - started
+
+        warmup, measured = planned[: args.warmup], planned[args.warmup :]
+        clients = args.clients
+        per_client = args.concurrency // clients or 1
+        with ProcessPoolExecutor(clients) as pool:
+            if warmup:
+                list(
+                    pool.map(
+                        load,
+                        [base_url] * clients,
+                        [warmup[i::clients] for i in range(clients)],
+                        [per_client] * clients,
+                        [args.timeout] * clients,
+                    )
+                )
+            load_started = time.perf_counter()
+            shares = pool.map(
+                load,
+                [base_url] * clients,
+                [measured[i::clients] for i in range(clients)],
+                [per_client] * clients,
+                [args.timeout] * clients,
+            )
+            results = [result for share in shares for result in share]
+            duration = time.perf_counter() - load_started
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    latencies = [elapsed for _, status, elapsed in results if status == 200]
+    return {
+        "workers": workers,
+        "ready_seconds": round(ready_seconds, 3),
+        "duration_seconds": round(duration, 3),
+        "throughput_rps": round(len(latencies) / duration, 2) if duration else 0.0,
+        "errors": len(results) - len(latencies),
+        "latency_ms": summarize(latencies),
+    }
+
+
+def measure(args, env: dict, planned: List[tuple], cwd: str) -> dict:
+    """Import times and worker runs for the service checked out in cwd"""
+    imports = time_imports(args.imports, env, cwd)
+    runs = [
+        run_workers(args, int(count), env, planned, cwd)
+        for count in args.workers.split(",")
+    ]
+    # Throughput relative to perfect scaling from the smallest worker count
+    base = runs[0]
+    for run in runs:
+        ideal = base["throughput_rps"] * run["workers"] / base["workers"]
+        run["scaling_efficiency"] = (
+            round(run["throughput_rps"] / ideal, 3) if ideal else None
+        )
+    return {
+        "import_seconds": {
+            "runs": len(imports),
+            "median": round(statistics.median(imports), 3),
+            "min": round(min(imports), 3),
+            "max": round(max(imports), 3),
+        },
+        "runs": runs,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--workers", default="1,2,4", help="Comma-separated worker counts to run"
+    )
+    parser.add_argument("--properties", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--bookings", type=int, default=5000)
+    parser.add_argument("--favorites", type=int, default=3000)
+    parser.add_argument(
+        "--imports", type=int, default=5, help="Fresh-interpreter imports to time"
+    )
+    parser.add_argument(
+        "--clients", type=int, default=4, help="Load generator processes"
+    )
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--ready-timeout", type=float, default=120.0)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--revision",
+        default="",
+        help="Git revision to measure instead of this checkout",
+    )
+    parser.add_argument(
+        "--baseline",
+        default=DEFAULT_BASELINE,
+        help="Git revision to measure as well ('' to skip)",
+    )
+    parser.add_argument("--output", help="Write the JSON report here too")
+    args = parser.parse_args()
+    # plan_requests reads these from chat_benchmark's arguments
+    args.no_cache = False
+
+    ollama_port = free_port()
+    ollama = BackgroundServer(fake_ollama_app(0.0, 1000.0, 1), ollama_port)
+    ollama.start()
+    env = service_env(args, ollama_port)
+
+    documents = seed_documents(
+        args.properties, args.users, args.bookings, args.favorites, args.seed
+    )
+    planned = plan_requests(args, documents, args.warmup + args.requests)
+
+    baseline = None
+    try:
+        with tempfile.TemporaryDirectory() as trees:
+            service_dir = SERVICE_DIR
+            if args.revision:
+                service_dir = export_revision(
+                    args.revision, os.path.join(trees, "revision")
+                )
+            current = measure(args, env, planned, service_dir)
+            if args.baseline:
+                tree = export_revision(args.baseline, os.path.join(trees, "baseline"))
+                baseline = {
+                    "revision": args.baseline,
+                    **measure(args, env, planned, tree),
+                }
+    finally:
+        ollama.stop()
+
+    result = {
+        "config": {
+            "cpu_count": os.cpu_count(),
+            "properties": args.properties,
+            "users": args.users,
+            "bookings": args.bookings,
+            "favorites": args.favorites,
+            "clients": args.clients,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "mix": args.mix,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "revision": args.revision or None,
+        },
+        **current,
+        "baseline": baseline,
+    }
+
+    output = json.dumps(result, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    runs = current["runs"] + (baseline["runs"] if baseline else [])
+    return 0 if all(run["errors"] == 0 for run in runs) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -1,17 +1,127 @@
+import asyncio
 import os
-import re
-import sys
-from datetime import datetime
-from typing import List, Optional
+import time
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from typing import List, Literal, Optional
 
-import requests
+import httpx
+import orjson
 from bson.objectid import ObjectId
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel, Field
-from pymongo import MongoClient
 
-app = FastAPI(title="Airbnb AI Travel Assistant")
+from app import llm_client, metrics, mongo, pools
+from app.admission import AdmissionRejected, Slot, llm_admission
+from app.availability import (
+    AVAILABILITY_INDEX_ENABLED,
+    availability_index,
+    booking_feed,
+    overlap_filter,
+)
+from app.cards import BookingCard, PropertyCard, booking_cards, property_cards
+from app.change_feed import property_feed
+from app.facets import FACETS_ENABLED, facet_index
+from app.health import health_prober
+from app.indexes import INDEX_BOOTSTRAP_ENABLED, index_bootstrapper
+from app.intents import parse_message
+from app.llm_client import MODEL_NAME, OLLAMA_KEEP_ALIVE
+from app.metrics import CHAT_REQUESTS, CHAT_STAGE_SECONDS, HTTP_REQUEST_SECONDS
+from app.model_warmup import MODEL_WARMUP_ENABLED, model_warmer
+from app.mongo import DB_CONFIG
+from app.pagination import (
+    Continuation,
+    InvalidContinuation,
+    Page,
+    decode_continuation,
+    encode_continuation,
+    make_page,
+)
+from app.property_index import PROPERTY_INDEX_ENABLED, property_index
+from app.queries import (
+    AVAILABLE_PROPERTIES_PROJECTION,
+    BOOKINGS_LIMIT,
+    FAVORITES_LIMIT,
+    OWNER_PROPERTIES_PROJECTION,
+    PROPERTIES_LIMIT,
+    PROPERTIES_SORT,
+    SEARCH_PROJECTION,
+    available_properties_filter,
+    bookings_pipeline,
+    excluding,
+    favorites_pipeline,
+    owner_properties_filter,
+    paged,
+    search_filter,
+)
+from app.semantic_index import (
+    SEMANTIC_SEARCH_ENABLED,
+    descriptive_query,
+    result_filter,
+    semantic_index,
+)
+from app.response_cache import llm_cache, make_key
+from app.sessions import Session, chat_sessions
+from app.single_flight import llm_flights, payload_key
+from app.user_resolver import user_resolver
+
+# Database handle for this worker, opened by the lifespan rather than at import
+db = None
+
+# Worker processes for `python main.py`; the uvicorn CLI reads the same variable
+WORKERS = int(os.getenv("WEB_CONCURRENCY", 1))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global db
+    # Runs in each worker after it is forked or spawned, so no client is ever
+    # shared between processes. A handle set beforehand (the benchmarks' fake
+    # database) is kept.
+    started = time.perf_counter()
+    background_tasks = [asyncio.create_task(health_prober.run())]
+    if db is None:
+        db = mongo.get_database()
+        background_tasks.append(
+            asyncio.create_task(pools.prewarm_mongo(mongo.get_client()))
+        )
+    if MODEL_WARMUP_ENABLED:
+        background_tasks.append(asyncio.create_task(model_warmer.run()))
+    if INDEX_BOOTSTRAP_ENABLED:
+        background_tasks.append(asyncio.create_task(index_bootstrapper.run(db)))
+    # One read of the properties feeds every in-memory index built on them
+    for enabled, index in (
+        (PROPERTY_INDEX_ENABLED, property_index),
+        (SEMANTIC_SEARCH_ENABLED, semantic_index),
+        (FACETS_ENABLED, facet_index),
+    ):
+        if enabled:
+            property_feed.subscribe(index)
+    if property_feed.subscribers:
+        background_tasks.append(asyncio.create_task(property_feed.run(db)))
+    if AVAILABILITY_INDEX_ENABLED:
+        background_tasks.append(asyncio.create_task(booking_feed.run(db)))
+    print(
+        f"🚀 Worker {os.getpid()} started in {(time.perf_counter() - started) * 1000:.1f}ms"
+    )
+
+    yield
+
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await llm_client.close_client()
+    await mongo.close_client()
+
+
+app = FastAPI(
+    title="Airbnb AI Travel Assistant",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 # CORS configuration
 app.add_middleware(
@@ -22,28 +132,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Ollama configuration
-OLLAMA_HOST = os.getenv("OLLAMA_HOST", "localhost")
-OLLAMA_PORT = int(os.getenv("OLLAMA_PORT", 11434))
-OLLAMA_URL = f"http://{OLLAMA_HOST}:{OLLAMA_PORT}/api/generate"
-MODEL_NAME = "llama3.2:1b"
-REQUEST_TIMEOUT = 60
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Time every request up to the start of its response"""
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Label by the route's template ("/sessions/{session_id}"), never the
+    # concrete URL, so clients can't add series; everything else is one label
+    route = request.scope.get("route")
+    path = route.path if route is not None else "unmatched"
+    HTTP_REQUEST_SECONDS.observe(
+        time.perf_counter() - started,
+        method=request.method,
+        path=path,
+        status=response.status_code,
+    )
+    return response
+
+
 PORT = int(os.getenv("PORT", 8001))
 
-# Database configuration
-DB_CONFIG = {
-    "host": os.getenv("DB_HOST", "localhost"),
-    "database": os.getenv("DB_NAME", "airbnb_db"),
-    "port": int(os.getenv("DB_PORT", 27017)),
-}
+# Search params that restrict dates rather than which properties match
+STAY_PARAMS = ("check_in", "check_out")
 
-try:
-    mongo_client = MongoClient(host=DB_CONFIG["host"], port=DB_CONFIG["port"])
-    db = mongo_client.get_database(DB_CONFIG["database"])
-    print("✅ Successfully connected to MongoDB database")
-except Exception as e:
-    print(f"❌ Error connecting to MongoDB database: {e}")
-    sys.exit(1)
+# Follow-up suggestions kept from each part of a multi-intent answer
+MULTI_INTENT_SUGGESTIONS = 2
+# Words two suggestions can differ by and still ask the same thing
+SUGGESTION_FILLER_WORDS = {"a", "an", "the", "my"}
+
+# Batch chat configuration
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", 50))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", 2))
 
 
 class ChatMessage(BaseModel):
@@ -55,11 +175,71 @@ class ChatRequest(BaseModel):
     message: str = Field(..., description="User's message")
     conversation_history: List[ChatMessage] = Field(default_factory=list)
     user_context: Optional[dict] = None
+    use_cache: bool = Field(
+        True, description="Serve repeated general questions from the response cache"
+    )
+    continuation: Optional[str] = Field(
+        None, description="Token from a previous response; fetches its next page"
+    )
+    session_id: Optional[str] = Field(
+        None,
+        description="Session from POST /sessions; the server then keeps the history",
+    )
+    response_mode: Literal["text", "cards", "both"] = Field(
+        "text",
+        description="Markdown text, typed cards with a one-line summary, or both",
+    )
 
 
 class ChatResponse(BaseModel):
     response: str = Field(..., description="AI assistant's response")
     suggestions: List[str] = Field(default_factory=list)
+    continuation: Optional[str] = Field(
+        None, description="Send back on a 'show more' turn to get the next page"
+    )
+    session_id: Optional[str] = Field(
+        None, description="Session to send next turn; replaces an expired one"
+    )
+    properties: Optional[List[PropertyCard]] = Field(
+        None, description="Property cards, unless response_mode is text"
+    )
+    bookings: Optional[List[BookingCard]] = Field(
+        None, description="Booking cards, unless response_mode is text"
+    )
+
+
+class BatchChatRequest(BaseModel):
+    requests: List[ChatRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=BATCH_MAX_SIZE,
+        description="Chat turns to resolve together",
+    )
+
+
+class BatchChatError(BaseModel):
+    status: int = Field(..., description="HTTP status /chat would have returned")
+    detail: str = Field(..., description="Error message")
+    retry_after: Optional[int] = Field(
+        None, description="Seconds to wait before retrying, for 429s"
+    )
+
+
+class BatchChatItem(BaseModel):
+    response: Optional[ChatResponse] = None
+    error: Optional[BatchChatError] = None
+
+
+class BatchChatResponse(BaseModel):
+    results: List[BatchChatItem] = Field(
+        ..., description="One result per request, in request order"
+    )
+
+
+class UserCacheInvalidation(BaseModel):
+    emails: Optional[List[str]] = Field(
+        None, description="Emails to forget; omit to clear the whole cache"
+    )
 
 
 # Improved system prompt
@@ -77,267 +257,266 @@ Current date: {current_date}
 
 
 # Database helper functions
-def get_user_properties(user_email: str = None, user_type: str = None):
-    """Get properties from database"""
+async def get_user_properties(
+    user_email: str = None, user_type: str = None, after=None
+) -> Page:
+    """Get one page of properties from database"""
     try:
         properties_collection = db.properties
-        users_collection = db.users
-
-        query_filter = {}
 
         if user_type == "owner" and user_email:
             # Find the owner's user_id first
-            user_doc = users_collection.find_one({"email": user_email})
-            if user_doc:
-                query_filter = {"owner_id": user_doc["_id"]}
+            with CHAT_STAGE_SECONDS.time(stage="user_lookup"):
+                owner_id = await user_resolver.resolve(db, user_email)
+            if owner_id:
+                query_filter = owner_properties_filter(owner_id)
             else:
-                return []  # Owner not found
-
-            # Additional fields to select for owner properties
-            projection = {
-                "property_id": "$_id",  # Rename _id to property_id for consistency
-                "property_name": 1,
-                "city": 1,
-                "country": 1,
-                "price_per_night": 1,
-                "bedrooms": 1,
-                "bathrooms": 1,
-                "property_type": 1,
-                "is_available": 1,
-            }
-
-            properties = list(
-                properties_collection.find(query_filter, projection)
-                .sort("created_at", -1)
-                .limit(10)
-            )
-
-            # Map _id to property_id in each document
-            for prop in properties:
-                prop["property_id"] = str(prop["_id"])
-                del prop["_id"]
-
+                return Page()  # Owner not found
+            projection = OWNER_PROPERTIES_PROJECTION
         else:
-            query_filter = {"is_available": True}
-            projection = {
-                "property_id": "$_id",  # Rename _id to property_id
-                "property_name": 1,
-                "city": 1,
-                "country": 1,
-                "price_per_night": 1,
-                "bedrooms": 1,
-                "bathrooms": 1,
-                "property_type": 1,
-            }
-            properties = list(
-                properties_collection.find(query_filter, projection)
-                .sort("created_at", -1)
-                .limit(10)
+            query_filter = available_properties_filter()
+            projection = AVAILABLE_PROPERTIES_PROJECTION
+
+        with CHAT_STAGE_SECONDS.time(stage="property_query"):
+            properties = (
+                await properties_collection.find(paged(query_filter, after), projection)
+                .sort(PROPERTIES_SORT)
+                .limit(PROPERTIES_LIMIT + 1)  # One extra to tell if a next page exists
+                .to_list()
             )
 
-            # Map _id to property_id in each document
-            for prop in properties:
-                prop["property_id"] = str(prop["_id"])
-                del prop["_id"]
-
-        return properties
+        return property_page(properties)
     except Exception as e:  # Catch broader exceptions for MongoDB errors
         print(f"Database error: {e}")
-        return []
+        return Page()
 
 
-def get_user_favorites(user_email: str):
-    """Get user's favorite properties"""
+async def get_user_favorites(user_email: str, after=None) -> Page:
+    """Get one page of the user's favorite properties"""
     try:
         favorites_collection = db.favorites
-        users_collection = db.users
 
         # Find the user's _id first
-        user_doc = users_collection.find_one({"email": user_email})
-        if not user_doc:
-            return []  # User not found
-
-        user_id = user_doc["_id"]
-
-        pipeline = [
-            {"$match": {"user_id": user_id}},
-            {
-                "$lookup": {
-                    "from": "properties",  # The collection to join with
-                    "localField": "property_id",
-                    "foreignField": "_id",
-                    "as": "propertyDetails",
-                }
-            },
-            {
-                "$unwind": "$propertyDetails"  # Deconstruct the propertyDetails array
-            },
-            {
-                "$project": {
-                    "_id": 0,  # Exclude the favorite's _id
-                    "property_id": "$propertyDetails._id",  # Map property _id to property_id
-                    "property_name": "$propertyDetails.property_name",
-                    "city": "$propertyDetails.city",
-                    "country": "$propertyDetails.country",
-                    "price_per_night": "$propertyDetails.price_per_night",
-                    "bedrooms": "$propertyDetails.bedrooms",
-                    "bathrooms": "$propertyDetails.bathrooms",
-                    "property_type": "$propertyDetails.property_type",
-                    "created_at": "$created_at",  # Include favorite created_at for sorting
-                }
-            },
-            {
-                "$sort": {"created_at": -1}  # Sort by favorite created_at
-            },
-            {"$limit": 10},
-        ]
+        with CHAT_STAGE_SECONDS.time(stage="user_lookup"):
+            user_id = await user_resolver.resolve(db, user_email)
+        if not user_id:
+            return Page()  # User not found
+
+        while True:
+            with CHAT_STAGE_SECONDS.time(stage="lookup_aggregation"):
+                cursor = await favorites_collection.aggregate(
+                    favorites_pipeline(user_id, after, FAVORITES_LIMIT + 1)
+                )
+                properties = await cursor.to_list()
 
-        properties = list(favorites_collection.aggregate(pipeline))
+            page = make_page(properties, FAVORITES_LIMIT, "created_at", "favorite_id")
+            # Favorites of deleted properties only counted towards the page;
+            # a page of nothing but those moves on to the next one
+            page.items = [prop for prop in page.items if prop.get("property_id")]
+            if page.items or page.after is None:
+                break
+            after = page.after
 
         # Convert ObjectId to string for property_id
-        for prop in properties:
+        for prop in page.items:
             if "_id" in prop:
                 del prop["_id"]  # Ensure _id is removed
             prop["property_id"] = str(prop["property_id"])
-            # Remove created_at if it's not needed in the final output, as it was just for sorting
-            if "created_at" in prop:
-                del prop["created_at"]
+            # created_at and favorite_id were only needed for sorting and paging
+            prop.pop("created_at", None)
+            prop.pop("favorite_id", None)
 
-        return properties
+        return page
     except Exception as e:
         print(f"Database error in get_user_favorites: {e}")
-        return []
+        return Page()
 
 
-def search_properties(
+async def search_properties(
     city: str = None,
     max_price: float = None,
     amenity: str = None,
     bedrooms: int = None,
     bathrooms: int = None,
-):
-    """Search properties based on criteria"""
+    after=None,
+    exclude=None,
+) -> Page:
+    """Search one page of properties based on criteria"""
     try:
-        properties_collection = db.properties
-
-        query_filter = {"is_available": True}
-
-        if city:
-            query_filter["$or"] = [
-                {"city": {"$regex": city, "$options": "i"}},  # Case-insensitive search
-                {
-                    "country": {"$regex": city, "$options": "i"}
-                },  # Case-insensitive search
-            ]
+        if PROPERTY_INDEX_ENABLED:
+            # Served from memory unless the index is stale or can't run the query
+            with CHAT_STAGE_SECONDS.time(stage="property_index"):
+                properties = property_index.search(
+                    city=city,
+                    max_price=max_price,
+                    amenity=amenity,
+                    bedrooms=bedrooms,
+                    bathrooms=bathrooms,
+                    limit=PROPERTIES_LIMIT + 1,
+                    after=after,
+                    exclude=exclude,
+                )
+            if properties is not None:
+                return property_page(properties)
 
-        if (
-            max_price is not None
-        ):  # Check for None explicitly to allow 0 as a valid price
-            query_filter["price_per_night"] = {"$lte": max_price}
-
-        if amenity:
-            # Assuming amenities is an array of strings in MongoDB
-            # This will match if any amenity in the array contains the substring
-            query_filter["amenities"] = {"$regex": amenity, "$options": "i"}
-
-        if bedrooms is not None:
-            query_filter["bedrooms"] = bedrooms
-
-        if bathrooms is not None:
-            query_filter["bathrooms"] = bathrooms
-
-        projection = {
-            "property_id": "$_id",  # Rename _id to property_id
-            "property_name": 1,
-            "city": 1,
-            "country": 1,
-            "price_per_night": 1,
-            "bedrooms": 1,
-            "bathrooms": 1,
-            "property_type": 1,
-            "amenities": 1,  # Include amenities in the projection
-        }
+        properties_collection = db.properties
 
-        properties = list(
-            properties_collection.find(query_filter, projection)
-            .sort("created_at", -1)
-            .limit(10)
+        query_filter = search_filter(
+            city=city,
+            max_price=max_price,
+            amenity=amenity,
+            bedrooms=bedrooms,
+            bathrooms=bathrooms,
+            normalized=INDEX_BOOTSTRAP_ENABLED,
         )
 
-        # Map _id to property_id in each document
-        for prop in properties:
-            prop["property_id"] = str(prop["_id"])
-            del prop["_id"]
+        with CHAT_STAGE_SECONDS.time(stage="property_query"):
+            properties = (
+                await properties_collection.find(
+                    paged(excluding(query_filter, exclude), after), SEARCH_PROJECTION
+                )
+                .sort(PROPERTIES_SORT)
+                .limit(PROPERTIES_LIMIT + 1)
+                .to_list()
+            )
 
-        return properties
+        return property_page(properties)
     except Exception as e:
         print(f"Database error in search_properties: {e}")
-        return []
+        return Page()
+
+
+def stay_dates(params: dict):
+    """(check_in, check_out) dates from search params, or None"""
+    if not params.get("check_in") or not params.get("check_out"):
+        return None
+    return (
+        date.fromisoformat(params["check_in"]),
+        date.fromisoformat(params["check_out"]),
+    )
+
+
+async def booked_properties(check_in: date, check_out: date) -> set:
+    """Properties with a booking on any night of the stay"""
+    booked = None
+    if AVAILABILITY_INDEX_ENABLED:
+        booked = availability_index.booked(check_in, check_out)
+    if booked is None:
+        # Index not ready: one bookings query for the whole stay
+        with CHAT_STAGE_SECONDS.time(stage="availability_query"):
+            bookings = await db.bookings.find(
+                overlap_filter(check_in, check_out), {"property_id": 1}
+            ).to_list()
+        booked = {booking["property_id"] for booking in bookings}
+    return booked
+
+
+def search_filters(params: dict) -> dict:
+    """The params that narrow which properties match.
+
+    Stay dates don't, and neither does a "city" the facets know names no
+    city or country, like the "woods" of "a cabin in the woods".
+    """
+    filters = {name: value for name, value in params.items() if name not in STAY_PARAMS}
+    if "city" in filters and FACETS_ENABLED:
+        if facet_index.places(filters["city"]) == []:
+            del filters["city"]
+    return filters
+
+
+async def semantic_search(
+    message: str, exclude=None, filters: Optional[dict] = None
+) -> Optional[Page]:
+    """Properties ranked by meaning; None to keep the structured results.
+
+    The place, budget and room counts among the filters narrow the ranking.
+    """
+    if not SEMANTIC_SEARCH_ENABLED:
+        return None
+    query = descriptive_query(message)
+    if not query:
+        return None  # e.g. "show all properties": nothing to rank by
+
+    filters = filters or {}
+    places = None
+    if filters.get("city"):
+        if FACETS_ENABLED:
+            places = facet_index.places(filters["city"])
+        # Until the facets load, the city is taken as written
+        places = places or [filters["city"]]
+    where = result_filter(
+        places,
+        filters.get("max_price"),
+        filters.get("bedrooms"),
+        filters.get("bathrooms"),
+    )
+    with CHAT_STAGE_SECONDS.time(stage="semantic_search"):
+        properties = await semantic_index.search(
+            query, PROPERTIES_LIMIT, exclude, where
+        )
+    if not properties:
+        return None
+
+    for prop in properties:
+        prop["property_id"] = str(prop.pop("_id"))
+        prop.pop("score", None)
+    # Ranked by score, not created_at, so there is no keyset for a next page
+    return Page(properties)
 
 
-def get_user_bookings(user_email: str):
-    """Get user's bookings"""
+async def get_user_bookings(user_email: str, after=None) -> Page:
+    """Get one page of the user's bookings"""
     try:
         bookings_collection = db.bookings
-        users_collection = db.users
 
         # Find the user's _id first
-        user_doc = users_collection.find_one({"email": user_email})
-        if not user_doc:
-            return []  # User not found
-
-        user_id = user_doc["_id"]
-
-        pipeline = [
-            {"$match": {"traveler_id": user_id}},
-            {
-                "$lookup": {
-                    "from": "properties",  # The collection to join with
-                    "localField": "property_id",
-                    "foreignField": "_id",
-                    "as": "propertyDetails",
-                }
-            },
-            {
-                "$unwind": "$propertyDetails"  # Deconstruct the propertyDetails array
-            },
-            {
-                "$project": {
-                    "_id": 0,  # Exclude the booking's _id
-                    "booking_id": "$_id",  # Map booking _id to booking_id
-                    "check_in_date": 1,
-                    "check_out_date": 1,
-                    "num_guests": 1,
-                    "total_price": 1,
-                    "status": 1,
-                    "property_name": "$propertyDetails.property_name",
-                    "city": "$propertyDetails.city",
-                    "country": "$propertyDetails.country",
-                    "booking_date": 1,  # Include booking_date for sorting
-                }
-            },
-            {
-                "$sort": {"booking_date": -1}  # Sort by booking_date
-            },
-            {"$limit": 5},
-        ]
+        with CHAT_STAGE_SECONDS.time(stage="user_lookup"):
+            user_id = await user_resolver.resolve(db, user_email)
+        if not user_id:
+            return Page()  # User not found
+
+        while True:
+            with CHAT_STAGE_SECONDS.time(stage="lookup_aggregation"):
+                cursor = await bookings_collection.aggregate(
+                    bookings_pipeline(user_id, after, BOOKINGS_LIMIT + 1)
+                )
+                bookings = await cursor.to_list()
 
-        bookings = list(bookings_collection.aggregate(pipeline))
+            page = make_page(bookings, BOOKINGS_LIMIT, "booking_date", "booking_id")
+            # Bookings of deleted properties only counted towards the page
+            page.items = [
+                booking for booking in page.items if booking.get("property_id")
+            ]
+            if page.items or page.after is None:
+                break
+            after = page.after
 
         # Convert ObjectId to string for booking_id
-        for booking in bookings:
+        for booking in page.items:
             if "booking_id" in booking:
                 booking["booking_id"] = str(booking["booking_id"])
             # Remove booking_date if it's not needed in the final output, as it was just for sorting
             if "booking_date" in booking:
                 del booking["booking_date"]
+            del booking["property_id"]  # Only needed to spot deleted properties
 
-        return bookings
+        return page
     except Exception as e:
         print(f"Database error in get_user_bookings: {e}")
-        return []
+        return Page()
 
 
+def property_page(properties: list) -> Page:
+    """Cut a PROPERTIES_LIMIT + 1 fetch into a page and map _id to property_id"""
+    page = make_page(properties, PROPERTIES_LIMIT, "created_at", "_id")
+    for prop in page.items:
+        prop["property_id"] = str(prop["_id"])
+        del prop["_id"]
+        prop.pop("created_at", None)  # Only needed for the next page's position
+    return page
+
+
+@CHAT_STAGE_SECONDS.time(stage="formatting")
 def format_properties_for_ai(properties: list) -> str:
     """Format properties list for AI response"""
     if not properties:
@@ -355,6 +534,7 @@ def format_properties_for_ai(properties: list) -> str:
     return result
 
 
+@CHAT_STAGE_SECONDS.time(stage="formatting")
 def format_bookings_for_ai(bookings: list) -> str:
     """Format bookings list for AI response"""
     if not bookings:
@@ -372,80 +552,9 @@ def format_bookings_for_ai(bookings: list) -> str:
     return result
 
 
-def extract_number(text: str, keywords: list) -> int:
-    """Extract number near keywords"""
-    text_lower = text.lower()
-    for keyword in keywords:
-        if keyword in text_lower:
-            # Find numbers near the keyword
-            pattern = rf"(\d+)\s*{keyword}|{keyword}\s*(\d+)"
-            match = re.search(pattern, text_lower)
-            if match:
-                num = match.group(1) or match.group(2)
-                return int(num)
-    return None
-
-
 def extract_search_params(message: str) -> dict:
     """Extract search parameters from user message"""
-    message_lower = message.lower()
-    params = {}
-
-    # Extract bedrooms
-    bedrooms = extract_number(message, ["bedroom", "bed", "br"])
-    if bedrooms:
-        params["bedrooms"] = bedrooms
-
-    # Extract bathrooms
-    bathrooms = extract_number(message, ["bathroom", "bath", "ba"])
-    if bathrooms:
-        params["bathrooms"] = bathrooms
-
-    # Extract city - improved logic
-    city_keywords = ["in", "near", "at", "around"]
-    for keyword in city_keywords:
-        if keyword + " " in message_lower:
-            parts = message_lower.split(keyword + " ")
-            if len(parts) > 1:
-                # Get the next 1-3 words after the keyword
-                city_words = parts[1].strip().split()[:3]
-                # Remove common words
-                stop_words = ["a", "the", "with", "and", "or", "property", "properties"]
-                city_words = [w for w in city_words if w not in stop_words]
-                if city_words:
-                    params["city"] = (
-                        " ".join(city_words).replace(",", "").replace(".", "")
-                    )
-                    break
-
-    # Extract price
-    if any(
-        word in message_lower
-        for word in ["under", "below", "less than", "max", "maximum"]
-    ):
-        # Find price with $ or just number
-        price_match = re.search(r"\$?(\d+)", message_lower)
-        if price_match:
-            params["max_price"] = float(price_match.group(1))
-
-    # Extract amenities
-    amenities = [
-        "pool",
-        "wifi",
-        "parking",
-        "kitchen",
-        "gym",
-        "beach",
-        "balcony",
-        "ac",
-        "garden",
-    ]
-    for amenity in amenities:
-        if amenity in message_lower:
-            params["amenity"] = amenity
-            break
-
-    return params
+    return parse_message(message).search.as_dict()
 
 
 def create_prompt(
@@ -456,6 +565,18 @@ def create_prompt(
     """Create a formatted prompt for Ollama"""
     current_date = datetime.now().strftime("%Y-%m-%d")
     prompt = SYSTEM_PROMPT.format(current_date=current_date)
+    return prompt + create_conversation_prompt(
+        message, conversation_history, user_context
+    )
+
+
+def create_conversation_prompt(
+    message: str,
+    conversation_history: List[ChatMessage],
+    user_context: Optional[dict] = None,
+) -> str:
+    """Create the date-independent part of the prompt that follows the system prompt"""
+    prompt = ""
 
     if user_context:
         prompt += f"\nUser: {user_context.get('name', 'Guest')}"
@@ -497,215 +618,770 @@ def get_suggestions(message: str, has_results: bool = False) -> List[str]:
         return ["Search for properties", "View my bookings", "Show my favorites"]
 
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
-    """Main chat endpoint with property integration"""
-    try:
-        message_lower = request.message.lower()
-
-        # Handle "my properties" queries (for owners)
-        if any(phrase in message_lower for phrase in ["my propert", "my listing"]):
-            if request.user_context and request.user_context.get("email"):
-                properties = get_user_properties(
-                    request.user_context.get("email"),
-                    request.user_context.get("user_type"),
-                )
+OLLAMA_OPTIONS = {
+    "temperature": 0.7,
+    "top_p": 0.9,
+    "num_predict": 300,
+    "stop": ["\nUser:", "\nHuman:"],
+    "num_ctx": 2048,
+}
 
-                if properties:
-                    properties_text = format_properties_for_ai(properties)
-                    ai_response = properties_text
-                    suggestions = [
-                        "Add new property",
-                        "View bookings",
-                        "Update details",
-                    ]
-                else:
-                    ai_response = "You don't have any properties listed yet."
-                    suggestions = ["Add a property", "Get started guide", "Help"]
-
-                return ChatResponse(response=ai_response, suggestions=suggestions)
-
-        # Handle favorites queries
-        elif any(
-            phrase in message_lower
-            for phrase in ["favorite", "favourite", "fav", "liked"]
-        ):
-            if request.user_context and request.user_context.get("email"):
-                properties = get_user_favorites(request.user_context.get("email"))
-
-                if properties:
-                    properties_text = format_properties_for_ai(properties)
-                    ai_response = (
-                        f"Here are your favorite properties:\n\n{properties_text}"
-                    )
-                    suggestions = ["View details", "Remove favorite", "Book now"]
-                else:
-                    ai_response = (
-                        "You haven't added any properties to your favorites yet."
-                    )
-                    suggestions = [
-                        "Browse properties",
-                        "Popular destinations",
-                        "Help me search",
-                    ]
-
-                return ChatResponse(response=ai_response, suggestions=suggestions)
-
-        # Handle "my bookings" queries (for travelers)
-        elif any(
-            phrase in message_lower
-            for phrase in ["my booking", "my reservation", "my trip", "show booking"]
-        ):
-            if request.user_context and request.user_context.get("email"):
-                bookings = get_user_bookings(request.user_context.get("email"))
-
-                if bookings:
-                    bookings_text = format_bookings_for_ai(bookings)
-                    ai_response = bookings_text
-                    suggestions = ["Cancel booking", "Modify dates", "Contact host"]
-                else:
-                    ai_response = "You don't have any bookings yet."
-                    suggestions = ["Find properties", "Popular destinations", "Help"]
-
-                return ChatResponse(response=ai_response, suggestions=suggestions)
-
-        # Handle property search queries
-        elif any(
-            word in message_lower
-            for word in [
-                "find",
-                "search",
-                "show",
-                "properties",
-                "property",
-                "hotel",
-                "accommodation",
-            ]
-        ):
-            params = extract_search_params(request.message)
+NO_RESPONSE_TEXT = (
+    "I apologize, but I couldn't generate a response. Please try rephrasing."
+)
+OLLAMA_UNAVAILABLE_TEXT = "AI service unavailable. Please ensure Ollama is running."
+OLLAMA_TIMEOUT_TEXT = "Request took too long. Try a shorter message."
+LLM_BUSY_TEXT = "The assistant is busy right now. Please try again shortly."
+
+# Keyset pagination of database-backed answers
+PAGED_INTENTS = ("my_properties", "favorites", "bookings", "search")
+SHOW_MORE_SUGGESTION = "Show more results"
+NO_MORE_RESULTS_TEXT = "That's everything - there are no more results."
+INVALID_CONTINUATION_TEXT = "Invalid continuation token."
+SIGN_IN_TO_CONTINUE_TEXT = "Sign in to see more of this list."
+
+
+def build_ollama_request(
+    prompt: str, stream: bool = False, context: Optional[List[int]] = None
+) -> dict:
+    """Build the Ollama generate payload for a prompt"""
+    payload = {
+        "model": MODEL_NAME,
+        "prompt": prompt,
+        "stream": stream,
+        "options": OLLAMA_OPTIONS,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+    }
+    if context:
+        # Tokens Ollama returned for the previous turn, so it skips re-evaluating them
+        payload["context"] = list(context)
+    return payload
+
+
+async def answer_from_data(request: ChatRequest) -> Optional[ChatResponse]:
+    """Answer database-backed intents; returns None for general questions"""
+    with CHAT_STAGE_SECONDS.time(stage="intent"):
+        parsed = parse_message(request.message)
+
+    # A "show more" turn continues the query its token came from
+    continuation = read_continuation(request)
+    if continuation:
+        if continuation.intent != "search" and not has_user(request):
+            # "Show more" of a user's list is no question for the LLM
+            raise HTTPException(status_code=400, detail=SIGN_IN_TO_CONTINUE_TEXT)
+        CHAT_REQUESTS.inc(intent=continuation.intent)
+        return await answer_intent(
+            request, continuation.intent, continuation.params, continuation.after
+        )
 
-            print(f"Extracted params: {params}")  # Debug
+    intents = answerable_intents(request, parsed)
+    if not intents:
+        CHAT_REQUESTS.inc(intent="general")
+        return None
+    for intent in intents:
+        CHAT_REQUESTS.inc(intent=intent)
+
+    params = parsed.search.as_dict()
+    if len(intents) == 1:
+        return await answer_intent(request, intents[0], params)
+
+    # "Show my bookings and my favorites": run every query at once, so the
+    # turn takes as long as the slowest one rather than their sum
+    responses = await asyncio.gather(
+        *(fanned_out_answer(request, parsed, intent) for intent in intents)
+    )
+    return combine_responses(responses)
+
+
+async def fanned_out_answer(request: ChatRequest, parsed, intent: str) -> ChatResponse:
+    """One intent's part of a multi-intent answer"""
+    if intent == "search" and parsed.search_clause:
+        # "Find a hotel in paris and show my bookings" searches "find a hotel
+        # in paris", not a city of "paris show"
+        request = request.model_copy(update={"message": parsed.search_clause})
+        params = parse_message(parsed.search_clause).search.as_dict()
+        return await answer_intent(request, intent, params)
+    return await answer_intent(request, intent, parsed.search.as_dict())
+
+
+def answerable_intents(request: ChatRequest, parsed) -> List[str]:
+    """The message's data intents that can be answered, in priority order"""
+    intents = []
+    for intent in parsed.intents:
+        if intent == "search":
+            # "Show my favorite properties in paris" only asks for favorites;
+            # next to a user list, a search needs a clause of its own
+            if intent == parsed.intent or parsed.search_clause:
+                intents.append(intent)
+        elif has_user(request):
+            intents.append(intent)
+    return intents
+
+
+def has_user(request: ChatRequest) -> bool:
+    """Whether the request says whose properties, favorites or bookings to read"""
+    return bool(request.user_context and request.user_context.get("email"))
+
+
+async def answer_intent(
+    request: ChatRequest, intent: str, params: dict, after=None
+) -> ChatResponse:
+    """Answer one data intent, one page at a time"""
+    if intent == "my_properties":
+        return await answer_my_properties(request, after, params)
+    if intent == "favorites":
+        return await answer_favorites(request, after)
+    if intent == "bookings":
+        return await answer_bookings(request, after)
+    return await answer_search(request, params, after)
+
+
+def combine_responses(responses: List[ChatResponse]) -> ChatResponse:
+    """One reply holding each intent's answer, in priority order"""
+    suggestions, seen = [], set()
+    for response in responses:
+        for suggestion in response.suggestions[:MULTI_INTENT_SUGGESTIONS]:
+            key = suggestion_key(suggestion)
+            if suggestion != SHOW_MORE_SUGGESTION and key not in seen:
+                seen.add(key)
+                suggestions.append(suggestion)
+
+    combined = ChatResponse(
+        response="\n\n".join(response.response for response in responses),
+        suggestions=suggestions,
+    )
+    # A single token can only continue one list; offer it when it is unambiguous
+    continued = [response for response in responses if response.continuation]
+    if len(continued) == 1:
+        combined.continuation = continued[0].continuation
+        combined.suggestions.insert(0, SHOW_MORE_SUGGESTION)
+
+    for field in ("properties", "bookings"):
+        cards = [
+            card for response in responses for card in (getattr(response, field) or [])
+        ]
+        if any(getattr(response, field) is not None for response in responses):
+            setattr(combined, field, cards)
+    return combined
+
+
+def suggestion_key(suggestion: str) -> str:
+    """What a suggestion asks, e.g. "Cancel booking" and "Cancel a booking" alike"""
+    return " ".join(
+        word
+        for word in suggestion.lower().split()
+        if word not in SUGGESTION_FILLER_WORDS
+    )
+
+
+async def answer_my_properties(
+    request: ChatRequest, after=None, params: Optional[dict] = None
+) -> ChatResponse:
+    """Handle "my properties" queries (for owners)"""
+    user_type = request.user_context.get("user_type")
+    if after is not None:
+        # Keep paging the listing the token came from, owner's or not
+        user_type = (params or {}).get("user_type")
+    page = await get_user_properties(
+        request.user_context.get("email"), user_type, after
+    )
+    if after is not None and not page.items:
+        return no_more_results()
+    properties = page.items
+
+    if properties:
+        ai_response = properties_text(request, properties)
+        suggestions = [
+            "Add new property",
+            "View bookings",
+            "Update details",
+        ]
+    else:
+        ai_response = "You don't have any properties listed yet."
+        suggestions = ["Add a property", "Get started guide", "Help"]
+
+    response = paged_response(
+        ai_response,
+        suggestions,
+        page,
+        "my_properties",
+        {"user_type": user_type} if user_type else None,
+    )
+    return with_cards(request, response, properties=properties)
+
+
+async def answer_favorites(request: ChatRequest, after=None) -> ChatResponse:
+    """Handle favorites queries"""
+    page = await get_user_favorites(request.user_context.get("email"), after)
+    if after is not None and not page.items:
+        return no_more_results()
+    properties = page.items
+
+    if properties:
+        ai_response = properties_text(
+            request, properties, "Here are your favorite properties"
+        )
+        suggestions = ["View details", "Remove favorite", "Book now"]
+    else:
+        ai_response = "You haven't added any properties to your favorites yet."
+        suggestions = [
+            "Browse properties",
+            "Popular destinations",
+            "Help me search",
+        ]
 
-            properties = search_properties(
+    response = paged_response(ai_response, suggestions, page, "favorites")
+    return with_cards(request, response, properties=properties)
+
+
+async def answer_bookings(request: ChatRequest, after=None) -> ChatResponse:
+    """Handle "my bookings" queries (for travelers)"""
+    page = await get_user_bookings(request.user_context.get("email"), after)
+    if after is not None and not page.items:
+        return no_more_results()
+    bookings = page.items
+
+    if bookings:
+        ai_response = bookings_text(request, bookings)
+        suggestions = ["Cancel booking", "Modify dates", "Contact host"]
+    else:
+        ai_response = "You don't have any bookings yet."
+        suggestions = ["Find properties", "Popular destinations", "Help"]
+
+    response = paged_response(ai_response, suggestions, page, "bookings")
+    return with_cards(request, response, bookings=bookings)
+
+
+async def answer_search(request: ChatRequest, params: dict, after=None) -> ChatResponse:
+    """Handle property search queries"""
+    print(f"Extracted params: {params}")  # Debug
+
+    stay = stay_dates(params)
+    booked = await booked_properties(*stay) if stay else None
+
+    page = await search_properties(
+        city=params.get("city"),
+        max_price=params.get("max_price"),
+        amenity=params.get("amenity"),
+        bedrooms=params.get("bedrooms"),
+        bathrooms=params.get("bathrooms"),
+        after=after,
+        exclude=booked,
+    )
+    filters = search_filters(params)
+    if after is None and (not filters or not page.items):
+        # Free-text searches like "cozy cabin for a ski weekend", and filtered
+        # ones that matched nothing, are ranked by meaning within the filters;
+        # a stay's booked properties are left out of the candidates as well
+        page = await semantic_search(request.message, booked, filters) or page
+    if after is not None and not page.items:
+        return no_more_results()
+    properties = page.items
+    alternatives = []
+
+    if properties:
+        ai_response = properties_text(request, properties)
+    else:
+        search_criteria = []
+        if params.get("bedrooms"):
+            search_criteria.append(f"{params['bedrooms']} bedrooms")
+        if params.get("bathrooms"):
+            search_criteria.append(f"{params['bathrooms']} bathrooms")
+        if params.get("city"):
+            search_criteria.append(f"in {params['city']}")
+        if params.get("max_price"):
+            search_criteria.append(f"under ${params['max_price']}")
+        if params.get("amenity"):
+            search_criteria.append(f"with {params['amenity']}")
+        if stay:
+            search_criteria.append(
+                f"free from {stay[0]:%b} {stay[0].day} to {stay[1]:%b} {stay[1].day}"
+            )
+
+        criteria_text = (
+            ", ".join(search_criteria) if search_criteria else "matching your criteria"
+        )
+        if FACETS_ENABLED:
+            alternatives = facet_index.alternatives(
                 city=params.get("city"),
                 max_price=params.get("max_price"),
-                amenity=params.get("amenity"),
                 bedrooms=params.get("bedrooms"),
-                bathrooms=params.get("bathrooms"),
             )
+        if alternatives:
+            tips = "\n".join(f"• {alt.describe()}" for alt in alternatives)
+            # Facets count available properties regardless of bookings and
+            # amenities, so they vouch for nothing when either was asked for
+            lead = (
+                "You could also try:"
+                if stay or params.get("amenity")
+                else "These searches have availability:"
+            )
+            ai_response = (
+                f"I couldn't find any properties {criteria_text}.\n\n{lead}\n{tips}"
+            )
+        else:
+            ai_response = f"I couldn't find any properties {criteria_text}.\n\nTry:\n• Adjusting your filters\n• Searching in a different city\n• Increasing your budget"
 
-            if properties:
-                properties_text = format_properties_for_ai(properties)
-                ai_response = properties_text
-            else:
-                search_criteria = []
-                if params.get("bedrooms"):
-                    search_criteria.append(f"{params['bedrooms']} bedrooms")
-                if params.get("bathrooms"):
-                    search_criteria.append(f"{params['bathrooms']} bathrooms")
-                if params.get("city"):
-                    search_criteria.append(f"in {params['city']}")
-                if params.get("max_price"):
-                    search_criteria.append(f"under ${params['max_price']}")
-                if params.get("amenity"):
-                    search_criteria.append(f"with {params['amenity']}")
-
-                criteria_text = (
-                    ", ".join(search_criteria)
-                    if search_criteria
-                    else "matching your criteria"
-                )
-                ai_response = f"I couldn't find any properties {criteria_text}.\n\nTry:\n• Adjusting your filters\n• Searching in a different city\n• Increasing your budget"
+    if alternatives:
+        # Each suggestion runs its alternative's search when sent back
+        suggestions = [alt.query() for alt in alternatives]
+    else:
+        suggestions = get_suggestions(request.message, has_results=len(properties) > 0)
+    response = paged_response(ai_response, suggestions, page, "search", params)
+    return with_cards(request, response, properties=properties)
 
-            suggestions = get_suggestions(
-                request.message, has_results=len(properties) > 0
-            )
-            return ChatResponse(response=ai_response, suggestions=suggestions)
 
-        # For general questions, use AI
-        prompt = create_prompt(
-            request.message, request.conversation_history, request.user_context
+def properties_text(
+    request: ChatRequest, properties: list, heading: Optional[str] = None
+) -> str:
+    """Markdown listing, or just a summary line when the client renders cards"""
+    if request.response_mode == "cards":
+        return (
+            f"{heading}."
+            if heading
+            else f"I found {len(properties)} properties for you."
+        )
+    properties_markdown = format_properties_for_ai(properties)
+    return f"{heading}:\n\n{properties_markdown}" if heading else properties_markdown
+
+
+def bookings_text(request: ChatRequest, bookings: list) -> str:
+    """Markdown listing, or just a summary line when the client renders cards"""
+    if request.response_mode == "cards":
+        return "Here are your recent bookings."
+    return format_bookings_for_ai(bookings)
+
+
+def with_cards(
+    request: ChatRequest,
+    response: ChatResponse,
+    properties: Optional[list] = None,
+    bookings: Optional[list] = None,
+) -> ChatResponse:
+    """Attach typed cards for the page unless the client asked for text only"""
+    if request.response_mode == "text":
+        return response
+    if properties is not None:
+        response.properties = property_cards(properties)
+    if bookings is not None:
+        response.bookings = booking_cards(bookings)
+    return response
+
+
+def read_continuation(request: ChatRequest) -> Optional[Continuation]:
+    """Decode the request's continuation token, if it sent one"""
+    if not request.continuation:
+        return None
+    try:
+        continuation = decode_continuation(request.continuation)
+    except InvalidContinuation:
+        raise HTTPException(status_code=400, detail=INVALID_CONTINUATION_TEXT)
+    if continuation.intent not in PAGED_INTENTS:
+        raise HTTPException(status_code=400, detail=INVALID_CONTINUATION_TEXT)
+    return continuation
+
+
+def paged_response(
+    ai_response: str,
+    suggestions: List[str],
+    page: Page,
+    intent: str,
+    params: Optional[dict] = None,
+) -> ChatResponse:
+    """Response for one page, with a continuation token when more results exist"""
+    if page.after is None:
+        return ChatResponse(response=ai_response, suggestions=suggestions)
+    return ChatResponse(
+        response=ai_response,
+        suggestions=[SHOW_MORE_SUGGESTION, *suggestions],
+        continuation=encode_continuation(intent, page.after, params),
+    )
+
+
+def no_more_results() -> ChatResponse:
+    return ChatResponse(
+        response=NO_MORE_RESULTS_TEXT,
+        suggestions=["Search for properties", "View my bookings", "Show my favorites"],
+    )
+
+
+def open_session(request: ChatRequest) -> Optional[Session]:
+    """The request's conversation session, if it is part of one"""
+    if not request.session_id:
+        return None
+    return chat_sessions.resume(request.session_id)
+
+
+def with_session_history(
+    request: ChatRequest, session: Optional[Session]
+) -> ChatRequest:
+    """The request with the session's messages standing in for a missing history"""
+    if session is None or request.conversation_history or not session.history:
+        return request
+    history = [
+        ChatMessage(role=role, content=content) for role, content in session.messages()
+    ]
+    return request.model_copy(update={"conversation_history": history})
+
+
+def generation_request(
+    request: ChatRequest, session: Optional[Session], stream: bool = False
+) -> dict:
+    """Ollama payload for a general question, continuing the session's context"""
+    if session is not None and session.context:
+        # Ollama already holds the system prompt and earlier turns
+        prompt = create_conversation_prompt(request.message, [])
+        return build_ollama_request(prompt, stream, session.context)
+    prompt = create_prompt(
+        request.message, request.conversation_history, request.user_context
+    )
+    return build_ollama_request(prompt, stream)
+
+
+def reply_cache_key(request: ChatRequest, session: Optional[Session]) -> Optional[str]:
+    """Cache key for a general question, None when the answer can't be shared"""
+    if session is not None and session.context:
+        return None  # Depends on the conversation held in the context
+    return response_cache_key(request)
+
+
+def finish_turn(
+    request: ChatRequest, session: Optional[Session], response: ChatResponse
+) -> ChatResponse:
+    """Record the turn in its session and tell the client which session it is"""
+    if session is not None:
+        session.record(request.message, response.response)
+        response.session_id = session.session_id
+    return response
+
+
+def response_cache_key(request: ChatRequest) -> Optional[str]:
+    """Cache key for a general question, or None when the client opted out"""
+    if not request.use_cache:
+        return None
+    conversation = create_conversation_prompt(
+        request.message, request.conversation_history, request.user_context
+    )
+    return make_key(conversation, MODEL_NAME, OLLAMA_OPTIONS)
+
+
+async def admitted_generate(ollama_request: dict) -> dict:
+    """Run a generation once the admission queue grants it a slot"""
+    async with llm_admission.slot():
+        return await llm_client.generate(ollama_request)
+
+
+async def generate_reply(
+    request: ChatRequest, session: Optional[Session] = None
+) -> str:
+    """Answer a general question with Ollama, serving repeats from the cache"""
+    request = with_session_history(request, session)
+    cache_key = reply_cache_key(request, session)
+    if cache_key:
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    ollama_request = generation_request(request, session)
+    # Identical concurrent questions share one generation
+    with CHAT_STAGE_SECONDS.time(stage="ollama_generation"):
+        result = await llm_flights.do(
+            payload_key(ollama_request), lambda: admitted_generate(ollama_request)
         )
+    ai_response = result.get("response", "").strip()
+    if session is not None:
+        session.remember_context(result.get("context"))
 
-        ollama_request = {
-            "model": MODEL_NAME,
-            "prompt": prompt,
-            "stream": False,
-            "options": {
-                "temperature": 0.7,
-                "top_p": 0.9,
-                "num_predict": 300,
-                "stop": ["\nUser:", "\nHuman:"],
-                "num_ctx": 2048,
-            },
-        }
+    if not ai_response:
+        return NO_RESPONSE_TEXT
 
-        response = requests.post(
-            OLLAMA_URL, json=ollama_request, timeout=REQUEST_TIMEOUT
-        )
-        response.raise_for_status()
+    if cache_key:
+        llm_cache.set(cache_key, ai_response)
+    return ai_response
 
-        result = response.json()
-        ai_response = result.get("response", "").strip()
 
-        if not ai_response:
-            ai_response = "I apologize, but I couldn't generate a response. Please try rephrasing."
+@app.post("/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest):
+    """Main chat endpoint with property integration"""
+    try:
+        session = open_session(request)
+        data_response = await answer_from_data(request)
+        if data_response is not None:
+            return finish_turn(request, session, data_response)
+
+        # For general questions, use AI
+        ai_response = await generate_reply(request, session)
 
         suggestions = get_suggestions(request.message)
 
-        return ChatResponse(response=ai_response, suggestions=suggestions)
-
-    except requests.exceptions.ConnectionError:
-        raise HTTPException(
-            status_code=503,
-            detail="AI service unavailable. Please ensure Ollama is running.",
+        return finish_turn(
+            request,
+            session,
+            ChatResponse(response=ai_response, suggestions=suggestions),
         )
-    except requests.exceptions.Timeout:
-        raise HTTPException(
-            status_code=504, detail="Request took too long. Try a shorter message."
+
+    except Exception as e:
+        raise chat_error(e)
+
+
+def chat_error(e: Exception) -> HTTPException:
+    """Map a failure while answering a chat turn to the HTTP error to return"""
+    if isinstance(e, HTTPException):
+        return e
+    if isinstance(e, AdmissionRejected):
+        return HTTPException(
+            status_code=429,
+            detail=LLM_BUSY_TEXT,
+            headers={"Retry-After": str(e.retry_after)},
         )
+    if isinstance(e, httpx.ConnectError):
+        return HTTPException(status_code=503, detail=OLLAMA_UNAVAILABLE_TEXT)
+    if isinstance(e, httpx.TimeoutException):
+        return HTTPException(status_code=504, detail=OLLAMA_TIMEOUT_TEXT)
+    print(f"ERROR: {type(e).__name__}: {str(e)}")
+    return HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+
+async def answer_batch_item(
+    request: ChatRequest, llm_slots: asyncio.Semaphore
+) -> BatchChatItem:
+    """Answer one batch item, reporting failure on the item instead of raising"""
+    try:
+        session = open_session(request)
+        data_response = await answer_from_data(request)
+        if data_response is None:
+            # Database-backed items never wait for a generation slot
+            async with llm_slots:
+                ai_response = await generate_reply(request, session)
+            data_response = ChatResponse(
+                response=ai_response, suggestions=get_suggestions(request.message)
+            )
+        return BatchChatItem(response=finish_turn(request, session, data_response))
     except Exception as e:
-        print(f"ERROR: {type(e).__name__}: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+        error = chat_error(e)
+        retry_after = (error.headers or {}).get("Retry-After")
+        return BatchChatItem(
+            error=BatchChatError(
+                status=error.status_code,
+                detail=error.detail,
+                retry_after=int(retry_after) if retry_after else None,
+            )
+        )
 
 
-@app.get("/health")
-async def health_check():
-    """Health check endpoint"""
+@app.post("/chat/batch", response_model=BatchChatResponse)
+async def chat_batch(batch: BatchChatRequest):
+    """Resolve many chat turns concurrently, with LLM calls bounded per batch"""
+    llm_slots = asyncio.Semaphore(BATCH_LLM_CONCURRENCY)
+    results = await asyncio.gather(
+        *(answer_batch_item(request, llm_slots) for request in batch.requests)
+    )
+    return BatchChatResponse(results=results)
+
+
+def stream_event(event: dict) -> bytes:
+    """Encode one NDJSON stream event"""
+    return orjson.dumps(event) + b"\n"
+
+
+async def stream_data_events(data_response: ChatResponse):
+    """Stream a database-backed answer as a single token plus the final event"""
+    yield stream_event({"type": "token", "content": data_response.response})
+    yield stream_event(
+        {
+            "type": "done",
+            "suggestions": data_response.suggestions,
+            "continuation": data_response.continuation,
+            "session_id": data_response.session_id,
+            **data_response.model_dump(
+                include={"properties", "bookings"}, exclude_none=True
+            ),
+        }
+    )
+
+
+async def stream_llm_events(
+    request: ChatRequest,
+    session: Optional[Session],
+    cache_key: Optional[str],
+    slot: Slot,
+):
+    """Stream Ollama tokens as they arrive, holding the admission slot throughout"""
     try:
-        ollama_response = requests.get("http://ollama:11434/api/tags", timeout=5)
-        ollama_status = (
-            "connected" if ollama_response.status_code == 200 else "disconnected"
-        )
+        async for event in stream_generation(request, session, cache_key):
+            yield event
+    finally:
+        slot.release()
 
-        try:
-            # Attempt to ping the MongoDB server
-            mongo_client.admin.command("ping")
-            db_status = "connected"
-        except Exception as e:
-            print(f"MongoDB health check error: {e}")
-            db_status = "disconnected"
-
-        models = []
-        if ollama_response.status_code == 200:
-            data = ollama_response.json()
-            models = [model.get("name") for model in data.get("models", [])]
-
-        return {
-            "status": "healthy",
-            "ollama": ollama_status,
-            "database": db_status,
-            "model": MODEL_NAME,  # Assuming MODEL_NAME is globally available
-            "available_models": models,
-        }
+
+async def stream_generation(
+    request: ChatRequest, session: Optional[Session], cache_key: Optional[str]
+):
+    """Token events for one streamed generation, then the final event"""
+    tokens = []
+    context = None
+
+    try:
+        async for chunk in llm_client.stream_generate(
+            generation_request(request, session, stream=True)
+        ):
+            token = chunk.get("response", "")
+            if not tokens:
+                token = token.lstrip()
+            if token:
+                tokens.append(token)
+                yield stream_event({"type": "token", "content": token})
+            if chunk.get("done"):
+                context = chunk.get("context")
+                break
     except Exception as e:
-        print(f"Health check main error: {e}")
-        return {
-            "status": "degraded",
-            "ollama": "unknown",
-            "database": "unknown",
-            "model": MODEL_NAME,  # Assuming MODEL_NAME is globally available
+        # Headers are already sent, so the failure goes out as an event
+        error = chat_error(e)
+        yield stream_event(
+            {"type": "error", "status": error.status_code, "detail": error.detail}
+        )
+        return
+
+    ai_response = "".join(tokens).strip()
+    if not ai_response:
+        yield stream_event({"type": "token", "content": NO_RESPONSE_TEXT})
+    elif cache_key:
+        llm_cache.set(cache_key, ai_response)
+
+    session_id = None
+    if session is not None:
+        session.remember_context(context)
+        session.record(request.message, ai_response or NO_RESPONSE_TEXT)
+        session_id = session.session_id
+
+    yield stream_event(
+        {
+            "type": "done",
+            "suggestions": get_suggestions(request.message),
+            "session_id": session_id,
         }
+    )
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Streaming chat endpoint that sends NDJSON events as tokens arrive"""
+    try:
+        session = open_session(request)
+        data_response = await answer_from_data(request)
+    except Exception as e:
+        raise chat_error(e)
+
+    if data_response is not None:
+        return StreamingResponse(
+            stream_data_events(finish_turn(request, session, data_response)),
+            media_type="application/x-ndjson",
+        )
+
+    request = with_session_history(request, session)
+    cache_key = reply_cache_key(request, session)
+    cached = llm_cache.get(cache_key) if cache_key else None
+    if cached is not None:
+        cached_response = finish_turn(
+            request,
+            session,
+            ChatResponse(response=cached, suggestions=get_suggestions(request.message)),
+        )
+        return StreamingResponse(
+            stream_data_events(cached_response), media_type="application/x-ndjson"
+        )
+
+    # Admit before sending headers, so a full queue can still answer 429
+    try:
+        slot = await llm_admission.acquire()
+    except AdmissionRejected as e:
+        raise chat_error(e)
+
+    return StreamingResponse(
+        stream_llm_events(request, session, cache_key, slot),
+        media_type="application/x-ndjson",
+        # Frees the slot even if the client left before the stream started
+        background=BackgroundTask(slot.release),
+    )
+
+
+@app.post("/sessions")
+async def create_session():
+    """Start a server-side conversation session"""
+    return {"session_id": chat_sessions.create().session_id}
+
+
+@app.delete("/sessions/{session_id}")
+async def end_session(session_id: str):
+    """End a conversation session and free its context"""
+    if not chat_sessions.end(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"session_id": session_id, "ended": True}
+
+
+@app.get("/health")
+async def health_check():
+    """Health check endpoint, answered from the background prober's cache"""
+    return {
+        **health_prober.snapshot(),
+        "model": MODEL_NAME,
+        "model_state": model_state(),
+    }
+
+
+def model_state() -> str:
+    """Load state of the model, or "unmanaged" when warm-up is off"""
+    return model_warmer.state if MODEL_WARMUP_ENABLED else "unmanaged"
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness probe: passes once the model is loaded"""
+    ready = model_warmer.is_ready() or not MODEL_WARMUP_ENABLED
+    return ORJSONResponse(
+        {"ready": ready, "model": MODEL_NAME, "model_state": model_state()},
+        status_code=200 if ready else 503,
+    )
+
+
+@app.get("/stats")
+async def stats():
+    """Runtime statistics for the in-process caches"""
+    return {
+        "llm_cache": llm_cache.stats(),
+        "llm_single_flight": llm_flights.stats(),
+        "llm_admission": llm_admission.stats(),
+        "model_warmup": model_warmer.stats(),
+        "sessions": chat_sessions.stats(),
+        "property_index": property_index.stats(),
+        "semantic_index": semantic_index.stats(),
+        "facets": facet_index.stats(),
+        "availability_index": availability_index.stats(),
+        "change_feeds": {
+            "properties": property_feed.stats(),
+            "bookings": booking_feed.stats(),
+        },
+        "indexes": index_bootstrapper.stats(),
+        "user_resolver": user_resolver.stats(),
+        "pools": pools.stats(),
+    }
+
+
+@app.post("/cache/users/invalidate")
+async def invalidate_user_cache(body: UserCacheInvalidation):
+    """Forget cached email -> user id lookups, e.g. after a signup or email change"""
+    if body.emails is None:
+        user_resolver.invalidate()
+        return {"invalidated": "all"}
+    for email in body.emails:
+        user_resolver.invalidate(email)
+    return {"invalidated": body.emails}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus metrics in the text exposition format"""
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 
 @app.get("/")
@@ -723,7 +1399,14 @@ async def root():
         ],
         "endpoints": {
             "chat": "/chat (POST)",
+            "chat_stream": "/chat/stream (POST)",
+            "chat_batch": "/chat/batch (POST)",
+            "sessions": "/sessions (POST), /sessions/{session_id} (DELETE)",
             "health": "/health (GET)",
+            "ready": "/health/ready (GET)",
+            "stats": "/stats (GET)",
+            "user_cache": "/cache/users/invalidate (POST)",
+            "metrics": "/metrics (GET)",
             "docs": "/docs (GET)",
         },
     }
@@ -737,5 +1420,9 @@ if __name__ == "__main__":
     print(f"📍 http://localhost:{PORT}")
     print(f"🧠 Model: {MODEL_NAME}")
     print(f"💾 Database: {DB_CONFIG['database']}")
+    print(f"👷 Workers: {WORKERS}")
     print("=" * 60)
-    uvicorn.run(app, host="0.0.0.0", port=PORT, log_level="info")
+    # An import string, so each worker process imports the app for itself
+    uvicorn.run(
+        "main:app", host="0.0.0.0", port=PORT, log_level="info", workers=WORKERS
+    )